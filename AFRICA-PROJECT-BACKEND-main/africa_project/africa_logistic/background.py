@@ -0,0 +1,52 @@
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+from africa_logistic.configs import BACKGROUND_QUEUE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=BACKGROUND_QUEUE_MAX_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run():
+    while True:
+        func, args, kwargs = _queue.get()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Échec de la tâche de fond %s", getattr(func, '__name__', func))
+        finally:
+            # Le thread garde sa propre connexion : on la libère si elle est trop ancienne ou en erreur
+            close_old_connections()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        with _worker_lock:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(target=_run, name='africa-logistic-background', daemon=True)
+                _worker.start()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Exécute func(*args, **kwargs) dans le thread de fond du processus.
+    File pleine : la tâche est exécutée immédiatement (dégradation sans perte).
+    """
+    _ensure_worker()
+    try:
+        _queue.put_nowait((func, args, kwargs))
+    except queue.Full:
+        func(*args, **kwargs)
+
+
+def wait_idle():
+    """Attend la fin des tâches en file (scripts et commandes)."""
+    _queue.join()
@@ -38,3 +38,140 @@ password_validator = RegexValidator(regex=PASSWORD_REGEX, message="Le mot de pas
 CODE_VALIDITY_MINUTES = 10  # Code de vérification valable pendant 10 minutes
 PHONE_REGEX = r'^\+?1?\d{9,15}$'
 phone_validator = RegexValidator(regex=PHONE_REGEX, message="Le numéro de téléphone doit être au format : '+999999999'. Jusqu'à 15 chiffres autorisés.")
+
+# Cache de résolution des sessions (token -> utilisateur) utilisé par is_logged_in
+# Le cache mémoire est propre à chaque worker : la durée de vie courte borne le retard
+# d'invalidation entre workers. Le cache partagé (optionnel) est configuré via SESSION_CACHE_ALIAS.
+SESSION_CACHE_TTL_SECONDS = 30
+SESSION_CACHE_MAX_SIZE = 10000
+SESSION_SHARED_CACHE_TTL_SECONDS = 300
+
+# Pagination par curseur des listes (?limit=&cursor=)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Taille des lots lus en base pour les réponses en flux (NDJSON, exports)
+STREAM_CHUNK_SIZE = 500
+
+# Rapports asynchrones : un rapport identique terminé depuis moins de REPORT_CACHE_MINUTES est réutilisé
+REPORT_CACHE_MINUTES = 15
+REPORT_WORKER_POLL_SECONDS = 5
+# Un rapport RUNNING depuis plus de REPORT_JOB_TIMEOUT_MINUTES est considéré abandonné (worker arrêté)
+# et repris ; les rapports terminés depuis plus de REPORT_RETENTION_DAYS sont supprimés avec leur fichier
+REPORT_JOB_TIMEOUT_MINUTES = 30
+REPORT_RETENTION_DAYS = 7
+REPORT_PRUNE_INTERVAL_SECONDS = 3600
+
+# Rollup KPI : les lignes journalières plus anciennes que KPI_HISTORY_DAYS sont compactées par rollup_kpis
+KPI_HISTORY_DAYS = 90
+
+# Notifications en masse (ex : tous les admins) envoyées hors du chemin de la requête par un thread local
+ASYNC_NOTIFICATIONS = True
+BACKGROUND_QUEUE_MAX_SIZE = 10000
+
+# Nombre d'essais de génération de slug en cas de collision sur l'index unique
+SLUG_MAX_ATTEMPTS = 3
+
+# Idempotency-Key : durée de conservation des réponses rejouables et cache mémoire local
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_CACHE_MAX_SIZE = 10000
+
+# Recherche : configuration plein texte PostgreSQL et répertoire des villes du Bénin (nom canonique : variantes)
+SEARCH_CONFIG = 'french'
+BENIN_CITIES = {
+    'Cotonou': ('ctn',),
+    'Porto-Novo': ('porto novo', 'portonovo', 'pn'),
+    'Abomey-Calavi': ('calavi', 'abomey calavi', 'godomey'),
+    'Parakou': (),
+    'Djougou': (),
+    'Bohicon': (),
+    'Natitingou': ('nati',),
+    'Kandi': (),
+    'Lokossa': (),
+    'Ouidah': ('ouida', 'whydah'),
+    'Abomey': (),
+    'Savè': ('save',),
+    'Malanville': (),
+    'Dassa-Zoumè': ('dassa', 'dassa zoume'),
+    'Savalou': (),
+    'Pobè': ('pobe',),
+    'Kétou': ('ketou',),
+    'Sèmè-Kpodji': ('seme', 'seme podji', 'seme-podji'),
+    'Allada': (),
+    'Comè': ('come',),
+    'Grand-Popo': ('grand popo',),
+    'Aplahoué': ('aplahoue',),
+    'Bembèrèkè': ('bembereke',),
+    'Nikki': (),
+    'Tchaourou': (),
+    'Tanguiéta': ('tanguieta',),
+    'Bassila': (),
+}
+
+# Géolocalisation : précision du geohash stocké (9 caractères ~ 5 m) et rayon du filtre ?near= (km)
+GEOHASH_PRECISION = 9
+NEAR_DEFAULT_RADIUS_KM = 25
+NEAR_MAX_RADIUS_KM = 300
+
+# Matching transporteur / demande : cache des profils de capacité, distance au-delà de laquelle
+# la proximité ne rapporte plus rien (km), pondération du score et marchandises acceptées par type de véhicule
+MATCHING_CACHE_TTL_SECONDS = 300
+MATCHING_CACHE_MAX_SIZE = 5000
+MATCHING_DISTANCE_KM = 200
+MATCHING_WEIGHTS = {
+    'capacity': 0.30,
+    'compliance': 0.25,
+    'distance': 0.35,
+    'priority': 0.10,
+}
+MATCHING_PRIORITY_BONUS = {'URGENT': 1.0, 'HIGH': 0.6, 'NORMAL': 0.2, 'LOW': 0.0}
+VEHICLE_MERCHANDISE = {
+    'TRUCK': ('GENERAL', 'FRAGILE', 'PERISHABLE', 'DANGEROUS', 'ELECTRONIC', 'FURNITURE', 'FOOD', 'OTHER'),
+    'VAN': ('GENERAL', 'FRAGILE', 'PERISHABLE', 'ELECTRONIC', 'FURNITURE', 'FOOD', 'OTHER'),
+    'CAR': ('GENERAL', 'FRAGILE', 'ELECTRONIC', 'FOOD', 'OTHER'),
+    'MOTORBIKE': ('GENERAL', 'ELECTRONIC', 'FOOD', 'OTHER'),
+    'OTHER': ('GENERAL', 'OTHER'),
+}
+
+# Suivi GPS : taille max d'un lot de positions, avance tolérée de l'horloge des trackers (s),
+# cache mémoire des dernières positions, partitions mensuelles créées à l'avance et durée de conservation
+TRACKER_MAX_BATCH = 5000
+TRACKER_MAX_CLOCK_SKEW_SECONDS = 300
+TRACKER_HOT_TTL_SECONDS = 30
+TRACKER_HOT_MAX_SIZE = 50000
+TRACKER_PARTITION_MONTHS_AHEAD = 2
+TRACKER_RETENTION_MONTHS = 12
+
+# Serveur TCP GT06 (run_tracker_server) : port d'écoute, file bornée vers la base,
+# positions écrites par lot, déconnexion des terminaux muets (s) et rechargement des IMEI autorisés (s)
+TRACKER_SERVER_PORT = 5023
+TRACKER_SERVER_QUEUE_SIZE = 20000
+TRACKER_SERVER_BATCH_SIZE = 2000
+TRACKER_SERVER_IDLE_SECONDS = 600
+TRACKER_SERVER_ALLOWLIST_REFRESH_SECONDS = 30
+
+# Traces de trajet : tolérance de simplification à l'archivage (m), tolérance par défaut et maximale
+# des réponses (m), nombre de traces archivées simplifiées gardées en mémoire
+TRACK_ARCHIVE_TOLERANCE_M = 5
+TRACK_DEFAULT_TOLERANCE_M = 10
+TRACK_MAX_TOLERANCE_M = 5000
+TRACK_CACHE_MAX_SIZE = 500
+
+# Géorepérage : rayon des zones de collecte / livraison (m), positions consécutives dans la zone
+# avant de changer le statut, taille des cellules de la grille (degrés, au moins le diamètre d'une zone)
+# et intervalle de rechargement des zones actives depuis la base (s)
+GEOFENCE_RADIUS_M = 500
+GEOFENCE_CONFIRM_FIXES = 2
+GEOFENCE_CELL_DEGREES = 0.01
+GEOFENCE_REFRESH_SECONDS = 30
+
+# Estimation d'arrivée (ETA) : durée de cache par demande (s), historique utilisé pour les profils
+# de vitesse par corridor (jours), trajets minimum pour retenir un corridor, vitesse par défaut et
+# vitesses plausibles (km/h à vol d'oiseau), rechargement de la table des profils (s)
+ETA_CACHE_TTL_SECONDS = 30
+ETA_CACHE_MAX_SIZE = 10000
+ETA_PROFILE_DAYS = 180
+ETA_MIN_TRIPS = 5
+ETA_DEFAULT_SPEED_KMH = 35
+ETA_SPEED_RANGE_KMH = (2, 110)
+ETA_PROFILE_RELOAD_SECONDS = 3600
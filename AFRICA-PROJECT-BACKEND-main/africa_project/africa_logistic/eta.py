@@ -0,0 +1,163 @@
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import (
+    ETA_CACHE_MAX_SIZE, ETA_CACHE_TTL_SECONDS, ETA_DEFAULT_SPEED_KMH, ETA_MIN_TRIPS, ETA_PROFILE_DAYS,
+    ETA_PROFILE_RELOAD_SECONDS, ETA_SPEED_RANGE_KMH,
+)
+from africa_logistic.geo import distance_km
+from africa_logistic.models import CorridorSpeedProfile, RequestStatusHistory, assign_slugs
+from africa_logistic.tracking import trip_position
+from africa_logistic.tracks import trip_window
+
+GLOBAL_CORRIDOR = ('', '')
+
+
+# ---------- Profils de vitesse (calcul nocturne) ----------
+
+def trip_speeds(since):
+    """
+    Vitesse effective de chaque trajet livré depuis since : distance collecte -> livraison à vol d'oiseau
+    divisée par la durée IN_PROGRESS -> DELIVERED. Retourne {(ville collecte, ville livraison): [km/h, ...]}.
+    """
+    rows = RequestStatusHistory.objects.filter(
+        new_status__in=['IN_PROGRESS', 'DELIVERED'],
+        created_at__gte=since,
+        transport_request__status='DELIVERED',
+        transport_request__pickup_lat__isnull=False,
+        transport_request__delivery_lat__isnull=False,
+    ).order_by('created_at').values_list(
+        'transport_request_id', 'new_status', 'created_at',
+        'transport_request__pickup_city_key', 'transport_request__delivery_city_key',
+        'transport_request__pickup_lat', 'transport_request__pickup_lon',
+        'transport_request__delivery_lat', 'transport_request__delivery_lon',
+    )
+    started = {}
+    delivered = {}
+    for request_id, status, changed_at, *trip in rows.iterator(chunk_size=5000):
+        target = started if status == 'IN_PROGRESS' else delivered
+        target.setdefault(request_id, (changed_at, trip))
+
+    low, high = ETA_SPEED_RANGE_KMH
+    speeds = {}
+    for request_id, (start, trip) in started.items():
+        end = delivered.get(request_id)
+        if end is None:
+            continue
+        hours = (end[0] - start).total_seconds() / 3600
+        pickup_key, delivery_key, pickup_lat, pickup_lon, delivery_lat, delivery_lon = trip
+        if hours <= 0:
+            continue
+        speed = distance_km(pickup_lat, pickup_lon, delivery_lat, delivery_lon) / hours
+        # Statut oublié puis rattrapé, livraison saisie en avance : hors des vitesses plausibles
+        if low <= speed <= high:
+            speeds.setdefault((pickup_key, delivery_key), []).append(speed)
+    return speeds
+
+
+def profile(speeds):
+    """(trajets, vitesse médiane, premier quartile)."""
+    slow = statistics.quantiles(speeds, n=4)[0] if len(speeds) > 1 else speeds[0]
+    return len(speeds), statistics.median(speeds), slow
+
+
+def compute_profiles(days=ETA_PROFILE_DAYS, min_trips=ETA_MIN_TRIPS):
+    """Recalcule toute la table des profils (corridors avec assez de trajets + profil global)."""
+    speeds = trip_speeds(timezone.now() - timedelta(days=days))
+    profiles = []
+    every = []
+    for (pickup_key, delivery_key), values in speeds.items():
+        every.extend(values)
+        if len(values) >= min_trips and pickup_key and delivery_key:
+            trips, speed, slow = profile(values)
+            profiles.append(CorridorSpeedProfile(pickup_city_key=pickup_key, delivery_city_key=delivery_key, trip_count=trips, speed_kmh=speed, slow_speed_kmh=slow))
+    if every:
+        trips, speed, slow = profile(every)
+        profiles.append(CorridorSpeedProfile(pickup_city_key='', delivery_city_key='', trip_count=trips, speed_kmh=speed, slow_speed_kmh=slow))
+    with transaction.atomic():
+        CorridorSpeedProfile.objects.all_with_deleted().hard_delete()
+        CorridorSpeedProfile.objects.bulk_create(assign_slugs(profiles), batch_size=500)
+    return len(profiles)
+
+
+# ---------- Table de recherche en mémoire ----------
+
+_profiles = None
+_profiles_loaded_at = 0.0
+_profiles_lock = threading.Lock()
+
+
+def get_profiles():
+    """{(ville collecte, ville livraison): (vitesse, vitesse lente, trajets)}, relue toutes les ETA_PROFILE_RELOAD_SECONDS."""
+    global _profiles, _profiles_loaded_at
+    if _profiles is not None and time.monotonic() - _profiles_loaded_at < ETA_PROFILE_RELOAD_SECONDS:
+        return _profiles
+    with _profiles_lock:
+        if _profiles is None or time.monotonic() - _profiles_loaded_at >= ETA_PROFILE_RELOAD_SECONDS:
+            rows = CorridorSpeedProfile.objects.values_list('pickup_city_key', 'delivery_city_key', 'speed_kmh', 'slow_speed_kmh', 'trip_count')
+            _profiles = {(pickup_key, delivery_key): (speed, slow, trips) for pickup_key, delivery_key, speed, slow, trips in rows}
+            _profiles_loaded_at = time.monotonic()
+    return _profiles
+
+
+def corridor_speed(pickup_key, delivery_key):
+    """(vitesse, vitesse lente, trajets, portée) : corridor, sinon profil global, sinon vitesse par défaut."""
+    profiles = get_profiles()
+    found = profiles.get((pickup_key, delivery_key))
+    if found is not None:
+        return found + ('corridor',)
+    found = profiles.get(GLOBAL_CORRIDOR)
+    if found is not None:
+        return found + ('global',)
+    return ETA_DEFAULT_SPEED_KMH, ETA_DEFAULT_SPEED_KMH, 0, 'default'
+
+
+# ---------- Estimation par demande ----------
+
+_estimates = LRUCache(max_size=ETA_CACHE_MAX_SIZE, ttl=ETA_CACHE_TTL_SECONDS)
+
+
+def estimate(transport_request):
+    """
+    Heure d'arrivée estimée d'une demande IN_PROGRESS dont la livraison a des coordonnées :
+    distance restante depuis la dernière position du tracker sur ce trajet (à défaut, depuis la collecte
+    au début du trajet) divisée par la vitesse du corridor. Mis en cache ETA_CACHE_TTL_SECONDS par demande.
+    """
+    cached = _estimates.get(transport_request.pk)
+    if cached is not None:
+        return cached
+
+    speed, slow_speed, trips, scope = corridor_speed(transport_request.pickup_city_key, transport_request.delivery_city_key)
+    # Seule une position prise depuis le début du trajet compte (l'IMEI a pu servir à un trajet précédent)
+    position = trip_position(transport_request) if transport_request.tracker_imei else None
+    if position is not None:
+        origin, since, source = (position.lat, position.lon), position.ts, 'tracker'
+    else:
+        if transport_request.pickup_lat is None:
+            return None
+        origin, since, source = (transport_request.pickup_lat, transport_request.pickup_lon), trip_window(transport_request)[0], 'pickup'
+
+    now = timezone.now()
+    remaining = distance_km(origin[0], origin[1], transport_request.delivery_lat, transport_request.delivery_lon)
+    # Depuis la position (ou le départ), le camion a continué de rouler : l'arrivée ne peut pas être passée
+    eta = max(since + timedelta(hours=remaining / speed), now)
+    eta_late = max(since + timedelta(hours=remaining / slow_speed), eta)
+    result = {
+        'eta': eta.isoformat(),
+        'eta_late': eta_late.isoformat(),
+        'remaining_km': round(remaining, 1),
+        'remaining_minutes': round((eta - now).total_seconds() / 60),
+        'speed_kmh': round(speed, 1),
+        'source': source,
+        'position_at': since.isoformat(),
+        'profile': {'scope': scope, 'trips': trips},
+        'computed_at': now.isoformat(),
+    }
+    _estimates.set(transport_request.pk, result)
+    return result
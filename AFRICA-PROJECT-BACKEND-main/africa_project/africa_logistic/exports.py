@@ -0,0 +1,140 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+from africa_logistic.configs import STREAM_CHUNK_SIZE
+
+
+class Echo:
+    """
+    Pseudo-fichier : csv.writer renvoie directement la ligne formatée au lieu de la stocker.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_rows(rows, columns, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Génère les lignes CSV (en-tête compris) d'un queryset lu par lots.
+    Sur PostgreSQL, iterator() utilise un curseur nommé côté serveur :
+    la mémoire reste constante quel que soit le nombre de lignes.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    if hasattr(rows, 'iterator'):
+        rows = rows.iterator(chunk_size=chunk_size)
+    for obj in rows:
+        yield writer.writerow([value(obj) for _, value in columns])
+
+
+def write_csv(fileobj, rows, columns, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Écrit le CSV dans un fichier binaire ouvert (UTF-8), ligne par ligne.
+    Retourne le nombre de lignes de données écrites.
+    """
+    count = -1
+    for line in csv_rows(rows, columns, chunk_size):
+        fileobj.write(line.encode('utf-8'))
+        count += 1
+    return count
+
+
+def stream_csv(rows, columns, filename):
+    response = StreamingHttpResponse(csv_rows(rows, columns), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def presentation_or_na(user):
+    return user.presentation() if user else "N/A"
+
+
+def yes_no(value):
+    return "Oui" if value else "Non"
+
+
+def active_label(value):
+    return "Actif" if value else "Inactif"
+
+
+# Spécification des colonnes par rapport : (en-tête, fonction de valeur)
+
+CLIENT_REQUESTS_COLUMNS = [
+    ('ID', lambda r: r.slug),
+    ('Titre', lambda r: r.title),
+    ('Type', lambda r: r.merchandise_type),
+    ('Poids', lambda r: r.weight),
+    ('Statut', lambda r: r.status),
+    ('Date Collecte', lambda r: r.preferred_pickup_date),
+    ('Lieu Collecte', lambda r: r.pickup_address),
+    ('Lieu Livraison', lambda r: r.delivery_address),
+]
+
+TRANSPORTER_MISSIONS_COLUMNS = [
+    ('ID', lambda m: m.slug),
+    ('Titre', lambda m: m.title),
+    ('Client', lambda m: m.client.presentation()),
+    ('Statut', lambda m: m.status),
+    ('Date Collecte', lambda m: m.preferred_pickup_date),
+    ('Lieu Collecte', lambda m: m.pickup_address),
+    ('Lieu Livraison', lambda m: m.delivery_address),
+]
+
+ADMIN_REQUESTS_COLUMNS = [
+    ('ID', lambda r: r.slug),
+    ('Client', lambda r: r.client.presentation()),
+    ('Transporteur', lambda r: presentation_or_na(r.assigned_transporter)),
+    ('Titre', lambda r: r.title),
+    ('Statut', lambda r: r.status),
+    ('Date Création', lambda r: r.created_at),
+    ('Prix Estimé', lambda r: r.estimated_price),
+]
+
+REVENUE_COLUMNS = [
+    ('ID', lambda tx: tx.slug),
+    ('Utilisateur', lambda tx: tx.wallet.user.presentation()),
+    ('Type', lambda tx: tx.tx_type),
+    ('Montant', lambda tx: tx.amount),
+    ('Description', lambda tx: tx.description),
+    ('Référence', lambda tx: tx.reference),
+    ('Date', lambda tx: tx.created_at),
+]
+
+TRANSPORTERS_COLUMNS = [
+    ('ID', lambda t: t.slug),
+    ('Nom Complet', lambda t: t.presentation()),
+    ('Email', lambda t: t.email),
+    ('Téléphone', lambda t: t.telephone),
+    ('Vérifié', lambda t: yes_no(t.is_verified)),
+    ('Approuvé', lambda t: yes_no(t.is_approved)),
+    ('Statut', lambda t: active_label(t.is_active)),
+    ('Date Création', lambda t: t.created_at),
+]
+
+GEOGRAPHIC_COLUMNS = [
+    ('ID', lambda r: r.slug),
+    ('Ville Collecte', lambda r: r.pickup_city),
+    ('Ville Livraison', lambda r: r.delivery_city),
+    ('Client', lambda r: r.client.presentation()),
+    ('Statut', lambda r: r.status),
+    ('Date Création', lambda r: r.created_at),
+]
+
+DISPUTES_COLUMNS = [
+    ('ID', None),
+    ('Demandeur', None),
+    ('Sujet', None),
+    ('Statut', None),
+    ('Date Création', None),
+]
+
+USERS_COLUMNS = [
+    ('ID', lambda u: u.slug),
+    ('Nom Complet', lambda u: u.presentation()),
+    ('Email', lambda u: u.email),
+    ('Téléphone', lambda u: u.telephone),
+    ('Rôle', lambda u: u.role),
+    ('Vérifié', lambda u: yes_no(u.is_verified)),
+    ('Statut', lambda u: active_label(u.is_active)),
+    ('Date Création', lambda u: u.created_at),
+]
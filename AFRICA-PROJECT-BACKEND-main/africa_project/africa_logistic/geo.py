@@ -0,0 +1,131 @@
+import math
+import re
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+from africa_logistic.configs import GEOHASH_PRECISION
+
+EARTH_RADIUS_KM = 6371.0088
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_COORDINATES = re.compile(r'^\s*([-+]?\d+(?:\.\d+)?)\s*[,; ]\s*([-+]?\d+(?:\.\d+)?)\s*$')
+
+
+def parse_coordinates(text):
+    """'6.3654, 2.4183' -> (6.3654, 2.4183). None si le texte n'est pas un couple lat,lon valide."""
+    match = _COORDINATES.match(text or '')
+    if not match:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    """Geohash base32 : deux points proches partagent un préfixe, ce qui permet une recherche par index B-tree."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(hauteur, largeur) en degrés d'une cellule geohash de cette précision."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(lat, lon, radius_km):
+    """(lat_min, lat_max, lon_min, lon_max) du carré contenant le cercle de rayon radius_km."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Près des pôles le cercle couvre toutes les longitudes
+    cos_lat = math.cos(math.radians(min(abs(lat) + delta_lat, 90.0)))
+    delta_lon = 180.0 if cos_lat < 1e-9 else min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0), max(lon - delta_lon, -180.0), min(lon + delta_lon, 180.0)
+
+
+def covering_cells(lat, lon, radius_km):
+    """
+    Préfixes geohash recouvrant le cercle : la plus grande précision dont une cellule est au moins
+    aussi grande que le carré englobant, soit au plus 2 x 2 cellules à parcourir.
+    """
+    lat_min, lat_max, lon_min, lon_max = bounding_box(lat, lon, radius_km)
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        height, width = cell_size(precision)
+        if height >= lat_max - lat_min and width >= lon_max - lon_min:
+            break
+        precision -= 1
+    height, width = cell_size(precision)
+    cells = set()
+    row = lat_min
+    while True:
+        column = lon_min
+        while True:
+            cells.add(geohash(min(row, lat_max), min(column, lon_max), precision))
+            if column >= lon_max:
+                break
+            column += width
+        if row >= lat_max:
+            break
+        row += height
+    return sorted(cells)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (haversine) en kilomètres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lon, prefix='pickup'):
+    """Même calcul que distance_km(), en SQL, entre (lat, lon) et les colonnes <prefix>_lat / <prefix>_lon."""
+    lat_column = Radians(F(f'{prefix}_lat'))
+    lon_column = Radians(F(f'{prefix}_lon'))
+    phi = Value(math.radians(lat), output_field=FloatField())
+    lam = Value(math.radians(lon), output_field=FloatField())
+    a = Power(Sin((lat_column - phi) / 2), 2) + Cos(phi) * Cos(lat_column) * Power(Sin((lon_column - lam) / 2), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0, output_field=FloatField())))
+
+
+def filter_near(queryset, lat, lon, radius_km, prefix='pickup'):
+    """
+    Demandes dont le point <prefix> est à moins de radius_km de (lat, lon), annotées de 'distance_km'
+    et triées de la plus proche à la plus éloignée.
+    Les préfixes geohash (index <prefix>_geohash) limitent la lecture aux cellules voisines ;
+    le carré englobant puis la distance exacte ne sont évalués que sur ces lignes.
+    """
+    cells = Q()
+    for cell in covering_cells(lat, lon, radius_km):
+        cells |= Q(**{f'{prefix}_geohash__startswith': cell})
+    lat_min, lat_max, lon_min, lon_max = bounding_box(lat, lon, radius_km)
+    return (
+        queryset.filter(cells)
+        .filter(**{
+            f'{prefix}_lat__gte': lat_min, f'{prefix}_lat__lte': lat_max,
+            f'{prefix}_lon__gte': lon_min, f'{prefix}_lon__lte': lon_max,
+        })
+        .annotate(distance_km=distance_expression(lat, lon, prefix))
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', '-created_at', '-id')
+    )
@@ -0,0 +1,212 @@
+import logging
+import math
+import threading
+import time
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from africa_logistic.configs import GEOFENCE_CELL_DEGREES, GEOFENCE_CONFIRM_FIXES, GEOFENCE_RADIUS_M, GEOFENCE_REFRESH_SECONDS
+from africa_logistic.geo import EARTH_RADIUS_KM
+from africa_logistic.kpis import record_request_change, request_state
+from africa_logistic.matching import invalidate_capability
+from africa_logistic.models import RequestStatusHistory, TransportRequest
+from africa_logistic.tracks import schedule_archive
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM * 1000
+
+# Statut surveillé -> (zone à atteindre, statut suivant, libellé)
+TRANSITIONS = {
+    'ASSIGNED': ('pickup', 'IN_PROGRESS', 'collecte'),
+    'IN_PROGRESS': ('delivery', 'DELIVERED', 'livraison'),
+}
+
+
+class Fence:
+    """
+    Zone circulaire d'une demande active, liée au tracker de la demande.
+    La zone de livraison n'est armée qu'après une position hors de la zone : un trajet dont
+    la livraison est proche de la collecte ne passe pas à DELIVERED dès le chargement.
+    """
+    __slots__ = ('request_id', 'imei', 'status', 'lat', 'lon', 'scale_x', 'armed', 'hits', 'last_seq', 'fired')
+
+    def __init__(self, request_id, imei, status, lat, lon):
+        self.request_id = request_id
+        self.imei = imei
+        self.status = status
+        self.lat = lat
+        self.lon = lon
+        self.scale_x = METERS_PER_DEGREE * math.cos(math.radians(lat))
+        self.armed = status == 'ASSIGNED'
+        self.hits = 0
+        self.last_seq = -1
+        self.fired = False
+
+    def distance2(self, lat, lon):
+        """Carré de la distance en mètres (projection équirectangulaire, exacte à l'échelle d'une zone)."""
+        dx = (lon - self.lon) * self.scale_x
+        dy = (lat - self.lat) * METERS_PER_DEGREE
+        return dx * dx + dy * dy
+
+
+class FenceIndex:
+    """
+    Grille en mémoire : (imei, ligne, colonne) -> zones qui touchent la cellule.
+    Une position coûte un calcul de cellule et une recherche de dictionnaire ; la distance
+    n'est calculée que pour les zones de sa cellule.
+    """
+
+    def __init__(self, fences, cell_degrees=GEOFENCE_CELL_DEGREES, radius_m=GEOFENCE_RADIUS_M):
+        self.fences = fences
+        self.inverse = 1 / cell_degrees
+        self.radius2 = radius_m * radius_m
+        self.grid = {}
+        self.unarmed = {}
+        self.imeis = set()
+        self.seq = {}
+        delta_lat = radius_m / METERS_PER_DEGREE
+        for fence in fences.values():
+            self.imeis.add(fence.imei)
+            delta_lon = radius_m / fence.scale_x if fence.scale_x > 1 else 180.0
+            for row in range(math.floor((fence.lat - delta_lat) * self.inverse), math.floor((fence.lat + delta_lat) * self.inverse) + 1):
+                for column in range(math.floor((fence.lon - delta_lon) * self.inverse), math.floor((fence.lon + delta_lon) * self.inverse) + 1):
+                    self.grid.setdefault((fence.imei, row, column), []).append(fence)
+            if not fence.armed:
+                self.unarmed.setdefault(fence.imei, []).append(fence)
+
+    def evaluate(self, imei, lat, lon):
+        """Zones confirmées par cette position (GEOFENCE_CONFIRM_FIXES positions consécutives dans la zone)."""
+        seq = self.seq[imei] = self.seq.get(imei, 0) + 1
+        radius2 = self.radius2
+        pending = self.unarmed.get(imei)
+        if pending:
+            outside = [fence for fence in pending if fence.distance2(lat, lon) > radius2]
+            for fence in outside:
+                fence.armed = True
+                pending.remove(fence)
+        fences = self.grid.get((imei, math.floor(lat * self.inverse), math.floor(lon * self.inverse)))
+        if not fences:
+            return []
+        confirmed = []
+        for fence in fences:
+            if not fence.armed or fence.fired or fence.distance2(lat, lon) > radius2:
+                continue
+            fence.hits = fence.hits + 1 if fence.last_seq == seq - 1 else 1
+            fence.last_seq = seq
+            if fence.hits >= GEOFENCE_CONFIRM_FIXES:
+                fence.fired = True
+                confirmed.append(fence)
+        return confirmed
+
+
+def load_fences(previous=None):
+    """
+    Zones des demandes suivies par un tracker : collecte si ASSIGNED, livraison si IN_PROGRESS.
+    L'état (armement, positions consécutives) des zones déjà connues est conservé.
+    """
+    rows = TransportRequest.objects.filter(
+        status__in=TRANSITIONS, assigned_transporter__isnull=False, tracker_imei__isnull=False,
+    ).exclude(tracker_imei='').values_list('pk', 'tracker_imei', 'status', 'pickup_lat', 'pickup_lon', 'delivery_lat', 'delivery_lon')
+    fences = {}
+    for pk, imei, status, pickup_lat, pickup_lon, delivery_lat, delivery_lon in rows:
+        lat, lon = (pickup_lat, pickup_lon) if status == 'ASSIGNED' else (delivery_lat, delivery_lon)
+        if lat is None or lon is None:
+            continue
+        fence = Fence(pk, imei, status, lat, lon)
+        old = previous.get((pk, status)) if previous else None
+        if old is not None and old.imei == imei and (old.lat, old.lon) == (lat, lon):
+            fence.armed, fence.hits, fence.last_seq, fence.fired = old.armed, old.hits, old.last_seq, old.fired
+        fences[(pk, status)] = fence
+    return fences
+
+
+_index = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index(force=False):
+    """Index du processus, rechargé toutes les GEOFENCE_REFRESH_SECONDS (un seul thread recharge)."""
+    global _index, _loaded_at
+    if not force and _index is not None and time.monotonic() - _loaded_at < GEOFENCE_REFRESH_SECONDS:
+        return _index
+    with _lock:
+        if force or _index is None or time.monotonic() - _loaded_at >= GEOFENCE_REFRESH_SECONDS:
+            previous = _index
+            # Les compteurs de séquence restent ceux du processus : la continuité des positions est préservée
+            _index = FenceIndex(load_fences(previous.fences if previous else None))
+            if previous is not None:
+                _index.seq = previous.seq
+            _loaded_at = time.monotonic()
+    return _index
+
+
+def advance(fence):
+    """
+    Passe la demande au statut suivant : UPDATE conditionnel sur le statut et le tracker surveillés,
+    historique et KPI dans la même transaction. Retourne (ancien, nouveau) statut ou None.
+    """
+    _, new_status, label = TRANSITIONS[fence.status]
+    transport_request = TransportRequest.objects.select_related('client').filter(pk=fence.request_id).first()
+    if transport_request is None or transport_request.status != fence.status or transport_request.tracker_imei != fence.imei:
+        return None
+    kpi_before = request_state(transport_request)
+    now = timezone.now()
+    with transaction.atomic():
+        won = TransportRequest.objects.filter(
+            pk=fence.request_id,
+            status=fence.status,
+            tracker_imei=fence.imei,
+        ).update(status=new_status, updated_at=now)
+        if not won:
+            return None
+        
+        transport_request.status = new_status
+        transport_request.updated_at = now
+        record_request_change(kpi_before, transport_request)
+        
+        RequestStatusHistory.objects.create(
+            transport_request=transport_request,
+            old_status=fence.status,
+            new_status=new_status,
+            changed_by_id=transport_request.assigned_transporter_id,
+            comment=f"Statut mis à jour automatiquement : tracker {fence.imei} dans la zone de {label}"
+        )
+        if new_status == 'DELIVERED':
+            invalidate_capability(transport_request.assigned_transporter_id)
+            schedule_archive(transport_request.pk)
+    return fence.status, new_status
+
+
+def check(rows):
+    """
+    Évalue un lot de positions (imei, ts, lat, lon, ...) contre les zones actives et applique
+    les changements de statut. Retourne la liste des (demande, ancien statut, nouveau statut).
+    """
+    index = get_index()
+    candidates = [row for row in rows if row[0] in index.imeis]
+    if not candidates:
+        return []
+    # Lots presque toujours déjà triés : le tri est linéaire
+    candidates.sort(key=itemgetter(1))
+    confirmed = []
+    for row in candidates:
+        confirmed.extend(index.evaluate(row[0], row[2], row[3]))
+    
+    transitions = []
+    for fence in confirmed:
+        try:
+            change = advance(fence)
+        except Exception:
+            fence.fired = False
+            logger.exception("Échec du changement de statut automatique de la demande %s", fence.request_id)
+            continue
+        if change:
+            transitions.append((fence.request_id,) + change)
+    if transitions:
+        # La zone suivante (livraison) doit être surveillée sans attendre le rechargement périodique
+        get_index(force=True)
+    return transitions
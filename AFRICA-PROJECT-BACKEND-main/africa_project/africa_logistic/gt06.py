@@ -0,0 +1,170 @@
+"""
+Codec du protocole binaire GT06 (Concox et compatibles).
+Trame : 0x78 0x78 | longueur (1 octet) | protocole | contenu | numéro de série (2) | CRC-ITU (2) | 0x0D 0x0A
+(0x79 0x79 et longueur sur 2 octets pour les trames étendues). Le CRC couvre de la longueur au numéro de série.
+"""
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+LOGIN = 0x01
+LOCATION = 0x12
+HEARTBEAT = 0x13
+ALARM = 0x16
+LOCATION_4G = 0x22
+LOCATION_PROTOCOLS = frozenset([LOCATION, ALARM, LOCATION_4G])
+
+START = b'\x78\x78'
+START_EXTENDED = b'\x79\x79'
+STOP = b'\r\n'
+MIN_LENGTH = 5  # protocole + série + CRC
+MAX_BUFFER = 4096
+
+Frame = namedtuple('Frame', 'protocol content serial')
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc_itu(data):
+    """CRC-ITU (CRC-16/X-25) utilisé par les trames GT06."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc ^ 0xFFFF
+
+
+class FrameDecoder:
+    """
+    Découpe un flux TCP en trames. Les octets parasites sont ignorés jusqu'au prochain en-tête,
+    les trames au CRC invalide sont comptées dans errors et sautées.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        while True:
+            start = _find_start(buffer)
+            if start < 0:
+                # Conserver un éventuel premier octet d'en-tête coupé entre deux lectures
+                del buffer[:max(len(buffer) - 1, 0)]
+                break
+            del buffer[:start]
+            extended = buffer[0] == 0x79
+            header = 4 if extended else 3
+            if len(buffer) < header:
+                break
+            length = int.from_bytes(buffer[2:4], 'big') if extended else buffer[2]
+            total = header + length + 2
+            if length < MIN_LENGTH:
+                self.errors += 1
+                del buffer[:2]
+                continue
+            if len(buffer) < total:
+                if total > MAX_BUFFER:
+                    self.errors += 1
+                    del buffer[:2]
+                    continue
+                break
+            crc = int.from_bytes(buffer[total - 4:total - 2], 'big')
+            if buffer[total - 2:total] != STOP or crc_itu(buffer[2:total - 4]) != crc:
+                self.errors += 1
+                del buffer[:2]
+                continue
+            frames.append(Frame(
+                buffer[header],
+                bytes(buffer[header + 1:total - 6]),
+                int.from_bytes(buffer[total - 6:total - 4], 'big'),
+            ))
+            del buffer[:total]
+        return frames
+
+
+def _find_start(buffer):
+    positions = [position for position in (buffer.find(START), buffer.find(START_EXTENDED)) if position >= 0]
+    return min(positions) if positions else -1
+
+
+def encode_frame(protocol, content, serial):
+    body = bytes([len(content) + MIN_LENGTH, protocol]) + content + (serial & 0xFFFF).to_bytes(2, 'big')
+    return START + body + crc_itu(body).to_bytes(2, 'big') + STOP
+
+
+def response(frame):
+    """Accusé de réception d'une trame : même protocole et même numéro de série, sans contenu."""
+    return encode_frame(frame.protocol, b'', frame.serial)
+
+
+def parse_login(content):
+    """IMEI (15 chiffres) du terminal, codé en BCD sur 8 octets."""
+    digits = content[:8].hex()
+    return digits[1:] if digits.startswith('0') else digits
+
+
+def parse_location(content):
+    """
+    (ts, lat, lon, speed, course) d'un paquet de localisation, ou None si le GPS n'est pas positionné.
+    Coordonnées en 1/1 800 000 de degré ; drapeaux du cap : bit 12 positionné, bit 11 ouest, bit 10 nord.
+    """
+    if len(content) < 18:
+        return None
+    year, month, day, hour, minute, second = content[:6]
+    try:
+        ts = datetime(2000 + year, month, day, hour, minute, second, tzinfo=dt_timezone.utc)
+    except ValueError:
+        return None
+    lat = int.from_bytes(content[7:11], 'big') / 1800000
+    lon = int.from_bytes(content[11:15], 'big') / 1800000
+    speed = content[15]
+    flags = int.from_bytes(content[16:18], 'big')
+    if not flags & 0x1000:
+        return None
+    if not flags & 0x0400:
+        lat = -lat
+    if flags & 0x0800:
+        lon = -lon
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return ts, lat, lon, float(speed), float(flags & 0x03FF)
+
+
+# ---------- Encodage côté terminal (simulateurs et tests) ----------
+
+def encode_login(imei, serial):
+    return encode_frame(LOGIN, bytes.fromhex(imei.rjust(16, '0')), serial)
+
+
+def encode_heartbeat(serial, voltage=4, signal=4):
+    return encode_frame(HEARTBEAT, bytes([0x44, voltage, signal, 0x00, 0x02]), serial)
+
+
+def encode_location(ts, lat, lon, speed, course, serial):
+    flags = 0x1000 | (int(course) & 0x03FF)
+    if lat >= 0:
+        flags |= 0x0400
+    if lon < 0:
+        flags |= 0x0800
+    content = (
+        bytes([ts.year - 2000, ts.month, ts.day, ts.hour, ts.minute, ts.second, 0xC9])
+        + round(abs(lat) * 1800000).to_bytes(4, 'big')
+        + round(abs(lon) * 1800000).to_bytes(4, 'big')
+        + bytes([min(int(speed), 255)])
+        + flags.to_bytes(2, 'big')
+        # LBS : MCC, MNC, LAC, Cell ID (Bénin : 616)
+        + (616).to_bytes(2, 'big') + bytes([1]) + (0x1234).to_bytes(2, 'big') + (0x00ABCD).to_bytes(3, 'big')
+    )
+    return encode_frame(LOCATION, content, serial)
@@ -0,0 +1,110 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_KEY_TTL_HOURS
+from africa_logistic.models import IdempotencyKey
+
+# Réponses terminées du processus : un rejeu ne coûte alors aucune requête SQL
+_hot_responses = LRUCache(IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_KEY_TTL_HOURS * 3600)
+
+
+class KeyReused(Exception):
+    """Même Idempotency-Key envoyée avec une requête différente."""
+
+
+class RequestInProgress(Exception):
+    """La requête originale n'a pas encore répondu."""
+
+
+def fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def reference(key):
+    """Référence de mouvement dérivée d'une Idempotency-Key : longueur fixe quelle que soit la clé."""
+    return 'idem-' + hashlib.sha256(key.encode()).hexdigest()[:64]
+
+
+def expires_at(record):
+    return record.created_at + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def replay(stored):
+    request_hash, status_code, content_type, body, _ = stored
+    response = HttpResponse(body, status=status_code, content_type=content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _stored(record):
+    return (record.request_hash, record.status_code, record.content_type, record.response_body, expires_at(record))
+
+
+def begin(user, key, request):
+    """
+    Réserve la clé pour cette requête.
+    Retourne (record, None) si la requête doit être exécutée, ou (None, réponse enregistrée) pour un rejeu.
+    Lève KeyReused ou RequestInProgress.
+    """
+    request_hash = fingerprint(request)
+    stored = _hot_responses.get((user.pk, key))
+    if stored is not None and stored[4] <= timezone.now():
+        # Expirée : la base décide (suppression puis nouvelle exécution)
+        _hot_responses.delete((user.pk, key))
+        stored = None
+    if stored is None:
+        # Un renvoi ne coûte qu'une lecture sur l'index unique (user, key)
+        record = IdempotencyKey.objects.all_with_deleted().filter(user=user, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user=user, key=key, endpoint=request.path, request_hash=request_hash)
+                return record, None
+            except IntegrityError:
+                # Renvoi simultané : l'autre requête a réservé la clé en premier
+                record = IdempotencyKey.objects.all_with_deleted().filter(user=user, key=key).first()
+        if record is None:
+            # Supprimée entre-temps (échec de la requête originale) : le client peut réessayer
+            raise RequestInProgress()
+        if expires_at(record) <= timezone.now():
+            # Clé expirée : elle est libérée pour une nouvelle exécution
+            record.hard_delete()
+            return begin(user, key, request)
+        if record.status_code is None:
+            if record.request_hash != request_hash:
+                raise KeyReused()
+            raise RequestInProgress()
+        stored = _stored(record)
+        _hot_responses.set((user.pk, key), stored)
+
+    if stored[0] != request_hash:
+        raise KeyReused()
+    return None, stored
+
+
+def complete(record, response):
+    """
+    Enregistre la réponse de la requête originale.
+    Les erreurs serveur (5xx) libèrent la clé pour que le client puisse réessayer.
+    """
+    if response.status_code >= 500 or response.streaming:
+        record.hard_delete()
+        return
+    record.status_code = response.status_code
+    record.content_type = response.get('Content-Type')
+    record.response_body = response.content.decode('utf-8')
+    record.save(update_fields=['status_code', 'content_type', 'response_body', 'updated_at'])
+    _hot_responses.set((record.user_id, record.key), _stored(record))
+
+
+def release(record):
+    record.hard_delete()
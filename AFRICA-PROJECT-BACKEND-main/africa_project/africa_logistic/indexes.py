@@ -0,0 +1,64 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndexConcurrently
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+from africa_logistic.search import search_vector
+
+AVAILABLE_CONDITION = models.Q(is_active=True, assigned_transporter__isnull=True, status__in=['PENDING', 'OFFERS_RECEIVED'])
+
+
+class AddIndexConcurrently(PostgresAddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY sur PostgreSQL : les écritures sur la table continuent pendant la construction
+    (migration atomic = False). AddIndex classique sur les autres bases.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+# Index propres à PostgreSQL (pg_trgm, tsvector, varchar_pattern_ops) : ils ne figurent pas dans
+# TransportRequest.Meta.indexes (les autres bases ne savent pas les créer, même lors d'une reconstruction
+# de table) et sont créés par les migrations 0010 et 0011 sur PostgreSQL seulement.
+
+def search_indexes():
+    """Recherche partielle sur les villes (trigram sur UPPER(ville)) et plein texte (?q=)."""
+    return [
+        GinIndex(OpClass(Upper('pickup_city'), name='gin_trgm_ops'), name='treq_pickup_city_trgm_idx'),
+        GinIndex(OpClass(Upper('delivery_city'), name='gin_trgm_ops'), name='treq_delivery_city_trgm_idx'),
+        GinIndex(search_vector(), name='treq_search_idx'),
+    ]
+
+
+def geohash_indexes():
+    """Filtre ?near= : préfixes geohash (LIKE 'abc%') sur les demandes disponibles et les livraisons."""
+    return [
+        models.Index(fields=['pickup_geohash'], name='treq_available_geohash_idx', opclasses=['varchar_pattern_ops'], condition=AVAILABLE_CONDITION),
+        models.Index(fields=['delivery_geohash'], name='treq_delivery_geohash_idx', opclasses=['varchar_pattern_ops'], condition=models.Q(is_active=True)),
+    ]
+
+
+def create_postgres_indexes(schema_editor, model, indexes):
+    """Crée les index (CONCURRENTLY hors transaction) ; rien à faire sur les autres bases."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    concurrently = not schema_editor.connection.in_atomic_block
+    for index in indexes:
+        schema_editor.add_index(model, index, concurrently=concurrently)
+
+
+def drop_postgres_indexes(schema_editor, model, indexes):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index in indexes:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}')
@@ -0,0 +1,174 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from africa_logistic.models import KpiSnapshot, TransportRequest, Wallet, assign_slugs
+
+ZERO = Decimal('0.00')
+DELTA_FIELDS = ('request_count', 'created_count', 'revenue', 'balance')
+
+
+def _bump(day, role, status, city, **deltas):
+    """
+    Ajoute des deltas à la ligne (jour, rôle, statut, ville), créée au besoin.
+    UPDATE ... SET x = x + delta : pas de lecture préalable, sûr en concurrence.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    bucket = {'day': day, 'role': role or '', 'status': status or '', 'city': city or ''}
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if KpiSnapshot.objects.filter(**bucket).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            KpiSnapshot.objects.create(**bucket, **deltas)
+    except IntegrityError:
+        # Ligne créée entre-temps par une requête concurrente
+        KpiSnapshot.objects.filter(**bucket).update(**updates)
+
+
+def request_state(transport_request):
+    """
+    État KPI d'une demande, à capturer avant modification puis à passer à record_request_change().
+    None si la demande n'est pas comptée (supprimée ou pas encore créée).
+    """
+    if transport_request.pk is None or not transport_request.is_active:
+        return None
+    price = transport_request.estimated_price
+    delivered = (transport_request.status or '').upper() == 'DELIVERED'
+    revenue = Decimal(str(price)) if delivered and price is not None else ZERO
+    return (
+        transport_request.client.role,
+        transport_request.status,
+        transport_request.pickup_city,
+        revenue,
+        timezone.localdate(transport_request.created_at),
+    )
+
+
+def record_request_change(before, transport_request):
+    """
+    Répercute dans le rollup du jour le passage d'une demande de l'état before à son état actuel
+    (création, changement de statut/ville/prix, suppression, restauration).
+    """
+    after = request_state(transport_request)
+    if before == after:
+        return
+    today = timezone.localdate()
+    if before:
+        role, status, city, revenue, created_day = before
+        _bump(today, role, status, city, request_count=-1, revenue=-revenue, created_count=-1 if created_day == today else 0)
+    if after:
+        role, status, city, revenue, created_day = after
+        _bump(today, role, status, city, request_count=1, revenue=revenue, created_count=1 if created_day == today else 0)
+
+
+def record_wallet_movement(wallet, amount):
+    """Mouvement de solde d'un portefeuille (positif pour un crédit, négatif pour un débit)."""
+    _bump(timezone.localdate(), wallet.user.role, '', '', balance=Decimal(str(amount)))
+
+
+def record_role_change(user, old_role):
+    """
+    Changement de rôle d'un utilisateur : son solde et ses demandes sont comptés par rôle dans le rollup,
+    ils passent du seau de l'ancien rôle à celui du nouveau. À appeler dans la transaction qui enregistre le rôle.
+    """
+    if old_role == user.role:
+        return
+    today = timezone.localdate()
+    # Verrou du portefeuille : un mouvement concurrent est compté avant ou après le transfert, jamais perdu
+    wallet = Wallet.objects.select_for_update().filter(user=user).first()
+    if wallet is not None:
+        _bump(today, old_role, '', '', balance=-wallet.balance)
+        _bump(today, user.role, '', '', balance=wallet.balance)
+
+    requests = (
+        TransportRequest.objects.filter(client=user)
+        .values_list('status', 'pickup_city')
+        .annotate(
+            n=Count('pk'),
+            created_today=Count('pk', filter=Q(created_at__date=today)),
+            delivered=Sum('estimated_price', filter=Q(status__iexact='DELIVERED')),
+        )
+        .order_by()
+    )
+    for status, city, n, created_today, delivered in requests:
+        revenue = delivered or ZERO
+        _bump(today, old_role, status, city, request_count=-n, revenue=-revenue, created_count=-created_today)
+        _bump(today, user.role, status, city, request_count=n, revenue=revenue, created_count=created_today)
+
+
+def rollup_buckets(requests, wallets):
+    """
+    Lignes du rollup calculées depuis les tables sources : {(jour, rôle, statut, ville): valeurs}.
+    Les totaux sont rattachés au jour de création de chaque demande / portefeuille.
+    Prend les querysets en paramètre pour servir aussi à la migration (modèles historiques).
+    """
+    buckets = {}
+
+    def bucket(day, role, status, city):
+        key = (day, role or '', status or '', city or '')
+        if key not in buckets:
+            buckets[key] = dict.fromkeys(DELTA_FIELDS, 0)
+        return buckets[key]
+
+    requests = (
+        requests.annotate(day=TruncDate('created_at'))
+        .values_list('day', 'client__role', 'status', 'pickup_city')
+        .annotate(n=Count('pk'), delivered=Sum('estimated_price', filter=Q(status__iexact='DELIVERED')))
+        .order_by()
+    )
+    for day, role, status, city, n, delivered in requests:
+        row = bucket(day, role, status, city)
+        row['request_count'] += n
+        row['created_count'] += n
+        row['revenue'] += delivered or ZERO
+
+    wallets = (
+        wallets.annotate(day=TruncDate('created_at'))
+        .values_list('day', 'user__role')
+        .annotate(total=Sum('balance'))
+        .order_by()
+    )
+    for day, role, total in wallets:
+        bucket(day, role, '', '')['balance'] += total or ZERO
+    return buckets
+
+
+def rebuild():
+    """Recalcule entièrement le rollup depuis les tables sources (initialisation ou réconciliation)."""
+    buckets = rollup_buckets(TransportRequest.objects.all(), Wallet.objects.all())
+    with transaction.atomic():
+        KpiSnapshot.objects.all_with_deleted().hard_delete()
+        KpiSnapshot.objects.bulk_create(assign_slugs([
+            KpiSnapshot(day=day, role=role, status=status, city=city, **values)
+            for (day, role, status, city), values in buckets.items()
+        ]), batch_size=1000)
+    return len(buckets)
+
+
+def compact(before_day):
+    """
+    Fusionne les lignes antérieures à before_day en une ligne par (rôle, statut, ville) datée de la veille :
+    les totaux sont conservés et le nombre de lignes lues par le dashboard ne croît plus avec l'historique.
+    """
+    baseline = before_day - timedelta(days=1)
+    with transaction.atomic():
+        old = KpiSnapshot.objects.filter(day__lt=before_day)
+        rows = list(
+            old.values_list('role', 'status', 'city')
+            .annotate(n=Sum('request_count'), rev=Sum('revenue'), bal=Sum('balance'))
+            .order_by()
+        )
+        removed = old.hard_delete()[0]
+        KpiSnapshot.objects.bulk_create(assign_slugs([
+            KpiSnapshot(day=baseline, role=role, status=status, city=city, request_count=n, revenue=rev, balance=bal)
+            for role, status, city, n, rev, bal in rows
+            if n or rev or bal
+        ]), batch_size=1000)
+    return removed, len(rows)
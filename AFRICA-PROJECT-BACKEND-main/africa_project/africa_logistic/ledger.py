@@ -0,0 +1,211 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from africa_logistic.kpis import record_wallet_movement
+from africa_logistic.models import Wallet, WalletCheckpoint, WalletTransaction, assign_slugs
+
+ZERO = Decimal('0.00')
+REFERENCE_MAX_LENGTH = WalletTransaction._meta.get_field('reference').max_length
+
+
+class InsufficientFunds(Exception):
+    """Solde insuffisant pour effectuer un débit."""
+
+
+def _post(user, tx_type, amount, description=None, reference=None):
+    """
+    Écrit un mouvement dans le portefeuille de l'utilisateur, dans une transaction :
+    - la ligne Wallet est verrouillée (SELECT ... FOR UPDATE) : les mouvements concurrents sont sérialisés
+    - le solde est mis à jour par F() et la WalletTransaction est créée dans la même transaction
+    - avec une reference, un mouvement déjà enregistré (même portefeuille, type et référence) est renvoyé tel quel
+    Retourne (wallet, wallet_transaction, created).
+    """
+    amount = Decimal(str(amount))
+    if amount <= 0:
+        raise ValueError("Le montant doit être supérieur à 0.")
+    reference = reference or None
+
+    with transaction.atomic():
+        wallet, _ = Wallet.objects.select_for_update().get_or_create(user=user)
+
+        if reference:
+            existing = WalletTransaction.objects.all_with_deleted().filter(wallet=wallet, tx_type=tx_type, reference=reference).first()
+            if existing:
+                return wallet, existing, False
+
+        if tx_type == 'DEBIT' and wallet.balance < amount:
+            raise InsufficientFunds(f"Solde insuffisant : {wallet.balance} < {amount}")
+
+        signed = amount if tx_type == 'CREDIT' else -amount
+        Wallet.objects.filter(pk=wallet.pk).update(balance=F('balance') + signed, updated_at=timezone.now())
+        wallet.refresh_from_db(fields=['balance', 'updated_at'])
+        wallet_transaction = WalletTransaction.objects.create(
+            wallet=wallet,
+            tx_type=tx_type,
+            amount=amount,
+            description=description,
+            reference=reference,
+            balance_after=wallet.balance,
+        )
+        _update_checkpoint(wallet, wallet_transaction, signed)
+        record_wallet_movement(wallet, signed)
+    return wallet, wallet_transaction, True
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _update_checkpoint(wallet, wallet_transaction, signed):
+    """
+    Met à jour le relevé du mois du mouvement (appelé sous le verrou du portefeuille).
+    """
+    amount = wallet_transaction.amount
+    period = month_start(timezone.localdate(wallet_transaction.created_at))
+    credits = amount if wallet_transaction.tx_type == 'CREDIT' else ZERO
+    debits = amount if wallet_transaction.tx_type == 'DEBIT' else ZERO
+    updated = WalletCheckpoint.objects.filter(wallet=wallet, period=period).update(
+        closing_balance=wallet_transaction.balance_after,
+        credits=F('credits') + credits,
+        debits=F('debits') + debits,
+        tx_count=F('tx_count') + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        WalletCheckpoint.objects.create(
+            wallet=wallet,
+            period=period,
+            opening_balance=wallet_transaction.balance_after - signed,
+            closing_balance=wallet_transaction.balance_after,
+            credits=credits,
+            debits=debits,
+            tx_count=1,
+        )
+
+
+def credit(user, amount, description=None, reference=None):
+    return _post(user, 'CREDIT', amount, description, reference)
+
+
+def debit(user, amount, description=None, reference=None):
+    """Lève InsufficientFunds si le solde (lu sous verrou) ne couvre pas le montant."""
+    return _post(user, 'DEBIT', amount, description, reference)
+
+
+def ledger_balance(wallet):
+    """Solde recalculé depuis l'historique : somme des crédits - somme des débits."""
+    totals = WalletTransaction.objects.all_with_deleted().filter(wallet=wallet).aggregate(
+        credits=Sum('amount', filter=Q(tx_type='CREDIT')),
+        debits=Sum('amount', filter=Q(tx_type='DEBIT')),
+    )
+    return (totals['credits'] or ZERO) - (totals['debits'] or ZERO)
+
+
+def find_discrepancies():
+    """
+    Invariant du grand livre : Wallet.balance == crédits - débits.
+    Retourne la liste des (wallet, solde attendu) qui ne le respectent pas, en une requête.
+    """
+    wallets = Wallet.objects.all_with_deleted().select_related('user').annotate(
+        credits=Sum('transactions__amount', filter=Q(transactions__tx_type='CREDIT')),
+        debits=Sum('transactions__amount', filter=Q(transactions__tx_type='DEBIT')),
+    )
+    discrepancies = []
+    for wallet in wallets:
+        expected = (wallet.credits or ZERO) - (wallet.debits or ZERO)
+        if wallet.balance != expected:
+            discrepancies.append((wallet, expected))
+    return discrepancies
+
+
+def period_bounds(period):
+    """Début et fin (exclue) du mois, en heure locale."""
+    start = timezone.make_aware(datetime.combine(period, time.min))
+    next_month = (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, timezone.make_aware(datetime.combine(next_month, time.min))
+
+
+def balance_at(wallet, moment):
+    """
+    Solde à une date : balance_after du dernier mouvement antérieur (une lecture sur l'index (wallet, created_at)).
+    Repli sur la somme de l'historique pour les mouvements antérieurs à balance_after (avant backfill).
+    """
+    transactions = WalletTransaction.objects.all_with_deleted().filter(wallet=wallet, created_at__lte=moment)
+    last = transactions.order_by('-created_at', '-id').values_list('balance_after', flat=True)[:1]
+    if not last:
+        return ZERO
+    if last[0] is not None:
+        return last[0]
+    totals = transactions.aggregate(
+        credits=Sum('amount', filter=Q(tx_type='CREDIT')),
+        debits=Sum('amount', filter=Q(tx_type='DEBIT')),
+    )
+    return (totals['credits'] or ZERO) - (totals['debits'] or ZERO)
+
+
+def statement(wallet, period):
+    """
+    Relevé d'un mois : lu depuis WalletCheckpoint, ou calculé par balance_at() pour un mois sans mouvement.
+    Retourne (résumé, queryset des mouvements du mois).
+    """
+    start, end = period_bounds(period)
+    checkpoint = WalletCheckpoint.objects.filter(wallet=wallet, period=period).first()
+    if checkpoint:
+        summary = {
+            'opening_balance': float(checkpoint.opening_balance),
+            'closing_balance': float(checkpoint.closing_balance),
+            'credits': float(checkpoint.credits),
+            'debits': float(checkpoint.debits),
+            'tx_count': checkpoint.tx_count,
+        }
+    else:
+        opening = float(balance_at(wallet, start - timedelta(microseconds=1)))
+        summary = {'opening_balance': opening, 'closing_balance': opening, 'credits': 0.0, 'debits': 0.0, 'tx_count': 0}
+    summary['period'] = period.strftime('%Y-%m')
+    transactions = WalletTransaction.objects.all_with_deleted().filter(wallet=wallet, created_at__gte=start, created_at__lt=end)
+    return summary, transactions
+
+
+def statement_line(wallet_transaction):
+    """Ligne de relevé : montants en nombres (as_dict() ne sérialise pas les Decimal)."""
+    data = wallet_transaction.as_dict()
+    data['amount'] = float(wallet_transaction.amount)
+    data['balance_after'] = float(wallet_transaction.balance_after) if wallet_transaction.balance_after is not None else None
+    return data
+
+
+def backfill_wallet(wallet):
+    """
+    Recalcule balance_after de chaque mouvement et les relevés mensuels d'un portefeuille,
+    sous le verrou du grand livre. Retourne le nombre de mouvements traités.
+    """
+    with transaction.atomic():
+        Wallet.objects.select_for_update().filter(pk=wallet.pk).first()
+        running = ZERO
+        changed = []
+        checkpoints = {}
+        transactions = WalletTransaction.objects.all_with_deleted().filter(wallet=wallet).order_by('created_at', 'id')
+        for wallet_transaction in transactions.iterator(chunk_size=1000):
+            signed = wallet_transaction.amount if wallet_transaction.tx_type == 'CREDIT' else -wallet_transaction.amount
+            period = month_start(timezone.localdate(wallet_transaction.created_at))
+            checkpoint = checkpoints.get(period)
+            if checkpoint is None:
+                checkpoint = checkpoints[period] = WalletCheckpoint(wallet=wallet, period=period, opening_balance=running)
+            running += signed
+            if wallet_transaction.tx_type == 'CREDIT':
+                checkpoint.credits += wallet_transaction.amount
+            else:
+                checkpoint.debits += wallet_transaction.amount
+            checkpoint.tx_count += 1
+            checkpoint.closing_balance = running
+            if wallet_transaction.balance_after != running:
+                wallet_transaction.balance_after = running
+                changed.append(wallet_transaction)
+        WalletTransaction.objects.bulk_update(changed, ['balance_after'], batch_size=1000)
+        WalletCheckpoint.objects.all_with_deleted().filter(wallet=wallet).hard_delete()
+        WalletCheckpoint.objects.bulk_create(assign_slugs(list(checkpoints.values())), batch_size=1000)
+    return sum(checkpoint.tx_count for checkpoint in checkpoints.values())
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from africa_logistic.models import TransportRequest
+from africa_logistic.tracks import archive_trip
+
+
+class Command(BaseCommand):
+    help = "Archive les traces GPS des demandes livrées qui n'en ont pas encore (reprise de l'existant)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Reconstruit aussi les traces déjà archivées")
+
+    def handle(self, *args, **options):
+        requests = TransportRequest.objects.filter(status='DELIVERED').exclude(tracker_imei__isnull=True).exclude(tracker_imei='')
+        if not options['rebuild']:
+            requests = requests.filter(trip_track__isnull=True)
+        archived = skipped = 0
+        for pk in requests.values_list('pk', flat=True).iterator():
+            if archive_trip(pk) is None:
+                skipped += 1
+            else:
+                archived += 1
+        self.stdout.write(f"{archived} trace(s) archivée(s), {skipped} demande(s) sans position")
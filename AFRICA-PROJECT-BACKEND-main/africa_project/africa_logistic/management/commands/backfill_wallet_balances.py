@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from africa_logistic.ledger import backfill_wallet
+from africa_logistic.models import Wallet
+
+
+class Command(BaseCommand):
+    help = "Calcule balance_after des mouvements existants et les relevés mensuels (WalletCheckpoint) de chaque portefeuille"
+
+    def handle(self, *args, **options):
+        wallets = 0
+        transactions = 0
+        for wallet in Wallet.objects.all_with_deleted().iterator():
+            transactions += backfill_wallet(wallet)
+            wallets += 1
+        self.stdout.write(f"{wallets} portefeuilles, {transactions} mouvements traités")
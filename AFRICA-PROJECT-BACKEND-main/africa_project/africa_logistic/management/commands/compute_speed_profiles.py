@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from africa_logistic.configs import ETA_MIN_TRIPS, ETA_PROFILE_DAYS
+from africa_logistic.eta import compute_profiles
+
+
+class Command(BaseCommand):
+    help = "Recalcule les profils de vitesse par corridor utilisés pour l'ETA (à lancer chaque nuit)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ETA_PROFILE_DAYS, help="Nombre de jours d'historique utilisés")
+        parser.add_argument('--min-trips', type=int, default=ETA_MIN_TRIPS, help="Trajets minimum pour retenir un corridor")
+
+    def handle(self, *args, **options):
+        count = compute_profiles(options['days'], options['min_trips'])
+        self.stdout.write(f"{count} profil(s) de vitesse enregistré(s)")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from africa_logistic.configs import TRACKER_PARTITION_MONTHS_AHEAD, TRACKER_RETENTION_MONTHS
+from africa_logistic.tracking import add_months, drop_partitions_before, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = "Crée à l'avance les partitions mensuelles des positions GPS et supprime celles qui dépassent la rétention"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=TRACKER_PARTITION_MONTHS_AHEAD, help="Nombre de mois créés après le mois courant")
+        parser.add_argument('--retention', type=int, default=TRACKER_RETENTION_MONTHS, help="Nombre de mois conservés (0 : pas de suppression)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write("Partitionnement disponible uniquement sur PostgreSQL : rien à faire.")
+            return
+        created = ensure_partitions(connection, options['months_ahead'])
+        self.stdout.write(f"Partitions créées : {', '.join(created) or 'aucune'}")
+        if options['retention'] > 0:
+            cutoff = add_months(timezone.now().date().replace(day=1), -options['retention'])
+            dropped = drop_partitions_before(connection, cutoff)
+            self.stdout.write(f"Partitions antérieures à {cutoff:%Y-%m} supprimées : {', '.join(dropped) or 'aucune'}")
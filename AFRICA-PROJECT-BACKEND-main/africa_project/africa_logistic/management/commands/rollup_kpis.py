@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from africa_logistic.configs import KPI_HISTORY_DAYS
+from africa_logistic.kpis import compact, rebuild
+
+
+class Command(BaseCommand):
+    help = "Compacte le rollup KPI (KpiSnapshot) ; --rebuild le recalcule depuis les tables sources"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Recalcule tout le rollup depuis les tables sources (réconciliation)")
+        parser.add_argument('--days', type=int, default=KPI_HISTORY_DAYS, help="Nombre de jours conservés en détail")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(f"Rollup reconstruit : {rebuild()} lignes")
+        before_day = timezone.localdate() - timedelta(days=options['days'])
+        removed, kept = compact(before_day)
+        self.stdout.write(f"Compactage avant le {before_day} : {removed} lignes fusionnées en {kept}")
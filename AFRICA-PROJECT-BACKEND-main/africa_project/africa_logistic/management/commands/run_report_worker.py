@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from africa_logistic.configs import REPORT_PRUNE_INTERVAL_SECONDS, REPORT_RETENTION_DAYS, REPORT_WORKER_POLL_SECONDS
+from africa_logistic.reports import claim_next_job, prune_reports, run_job
+
+
+class Command(BaseCommand):
+    help = "Génère les rapports CSV en attente (ReportJob) dans MEDIA_ROOT/reports/ et supprime les anciens"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Traite les rapports en attente puis s'arrête")
+        parser.add_argument('--interval', type=float, default=REPORT_WORKER_POLL_SECONDS, help="Délai entre deux scrutations (secondes)")
+        parser.add_argument('--retention-days', type=int, default=REPORT_RETENTION_DAYS, help="Durée de conservation des rapports terminés (jours)")
+
+    def handle(self, *args, **options):
+        last_prune = None
+        while True:
+            if last_prune is None or time.monotonic() - last_prune >= REPORT_PRUNE_INTERVAL_SECONDS:
+                pruned = prune_reports(options['retention_days'])
+                if pruned:
+                    self.stdout.write(f"{pruned} rapport(s) expiré(s) supprimé(s)")
+                last_prune = time.monotonic()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            run_job(job)
+            self.stdout.write(f"{job.slug} {job.report_type} : {job.status} ({job.row_count} lignes)")
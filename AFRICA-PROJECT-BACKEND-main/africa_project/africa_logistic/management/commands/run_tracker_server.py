@@ -0,0 +1,158 @@
+import asyncio
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from africa_logistic import gt06
+from africa_logistic.configs import (
+    TRACKER_MAX_CLOCK_SKEW_SECONDS, TRACKER_SERVER_ALLOWLIST_REFRESH_SECONDS, TRACKER_SERVER_BATCH_SIZE,
+    TRACKER_SERVER_IDLE_SECONDS, TRACKER_SERVER_PORT, TRACKER_SERVER_QUEUE_SIZE,
+)
+from africa_logistic.tracking import IMEI_PATTERN, active_tracker_imeis, store_positions
+
+
+class TrackerServer:
+    """
+    Serveur asyncio mono-thread : une coroutine par terminal, accusés de réception immédiats.
+    Les positions passent par une file bornée ; un seul thread les écrit en base par lots
+    (quand la file est pleine, la lecture des sockets est suspendue : contrôle de flux TCP).
+    Seuls les IMEI associés à une demande en cours sont acceptés ; la liste est rechargée périodiquement.
+    """
+
+    def __init__(self, stdout, stderr, batch_size, queue_size, idle_seconds):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.batch_size = batch_size
+        self.idle_seconds = idle_seconds
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Un seul thread : une seule connexion à la base, écritures dans l'ordre d'arrivée
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tracker-db')
+        self.connections = 0
+        self.frames = 0
+        self.stored = 0
+        self.errors = 0
+        self.rejected = 0
+        self.allowed = frozenset()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        decoder = gt06.FrameDecoder()
+        imei = None
+        try:
+            while True:
+                data = await asyncio.wait_for(reader.read(4096), timeout=self.idle_seconds)
+                if not data:
+                    break
+                latest_allowed = timezone.now() + timedelta(seconds=TRACKER_MAX_CLOCK_SKEW_SECONDS)
+                for frame in decoder.feed(data):
+                    self.frames += 1
+                    if frame.protocol == gt06.LOGIN:
+                        imei = gt06.parse_login(frame.content)
+                        if not IMEI_PATTERN.match(imei) or imei not in self.allowed:
+                            # Terminal inconnu ou sans demande en cours : connexion fermée sans réponse
+                            self.rejected += 1
+                            return
+                    elif imei is None or imei not in self.allowed:
+                        # Le protocole impose la connexion (login) avant tout autre paquet ;
+                        # un terminal retiré de la liste (demande terminée) est déconnecté
+                        return
+                    elif frame.protocol in gt06.LOCATION_PROTOCOLS:
+                        fix = gt06.parse_location(frame.content)
+                        if fix is not None and fix[0] <= latest_allowed:
+                            await self.queue.put((imei,) + fix)
+                    elif frame.protocol != gt06.HEARTBEAT:
+                        continue
+                    writer.write(gt06.response(frame))
+                self.errors += decoder.errors
+                decoder.errors = 0
+                await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def load_allowlist(self):
+        close_old_connections()
+        return frozenset(active_tracker_imeis())
+
+    async def allowlist_loop(self, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.allowed = await loop.run_in_executor(self.executor, self.load_allowlist)
+            except Exception as error:
+                # En cas d'échec, la liste précédente reste en vigueur
+                self.stderr.write(f"Échec du rechargement des IMEI autorisés : {error}")
+
+    def write(self, rows):
+        close_old_connections()
+        try:
+            store_positions(rows)
+        except Exception as error:
+            self.stderr.write(f"Échec d'écriture de {len(rows)} positions : {error}")
+            return 0
+        return len(rows)
+
+    async def writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Pendant une écriture la file se remplit : le lot suivant grossit avec la charge
+            rows = [await self.queue.get()]
+            while len(rows) < self.batch_size and not self.queue.empty():
+                rows.append(self.queue.get_nowait())
+            self.stored += await loop.run_in_executor(self.executor, self.write, rows)
+
+    async def stats_loop(self, interval):
+        previous, started = self.stored, time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{self.connections} terminaux connectés | {self.frames} trames | {self.stored} positions écrites "
+                f"({(self.stored - previous) / elapsed:.0f}/s) | file {self.queue.qsize()} | {self.errors} trames invalides "
+                f"| {self.rejected} connexions refusées"
+            )
+            previous, started = self.stored, time.monotonic()
+
+    async def serve(self, host, port, stats_interval, allowlist_interval):
+        loop = asyncio.get_running_loop()
+        self.allowed = await loop.run_in_executor(self.executor, self.load_allowlist)
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        tasks = [asyncio.create_task(self.writer_loop()), asyncio.create_task(self.allowlist_loop(allowlist_interval))]
+        if stats_interval:
+            tasks.append(asyncio.create_task(self.stats_loop(stats_interval)))
+        self.stdout.write(f"Serveur GT06 à l'écoute sur {host}:{port} ({len(self.allowed)} IMEI autorisés)")
+        async with server:
+            await server.serve_forever()
+
+
+class Command(BaseCommand):
+    help = "Serveur TCP asyncio pour les trackers GT06 (connexion, battement de cœur, positions)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=TRACKER_SERVER_PORT)
+        parser.add_argument('--batch-size', type=int, default=TRACKER_SERVER_BATCH_SIZE, help="Positions max par écriture en base")
+        parser.add_argument('--queue-size', type=int, default=TRACKER_SERVER_QUEUE_SIZE, help="Positions en attente avant de suspendre la lecture")
+        parser.add_argument('--idle', type=int, default=TRACKER_SERVER_IDLE_SECONDS, help="Déconnexion après ce nombre de secondes sans données")
+        parser.add_argument('--allowlist-refresh', type=int, default=TRACKER_SERVER_ALLOWLIST_REFRESH_SECONDS,
+                            help="Intervalle de rechargement des IMEI autorisés (s)")
+        parser.add_argument('--stats', type=int, default=60, help="Intervalle d'affichage des statistiques (0 : désactivé)")
+
+    def handle(self, *args, **options):
+        # Plusieurs milliers de sockets : relever la limite de descripteurs au maximum autorisé
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard != resource.RLIM_INFINITY and soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        server = TrackerServer(self.stdout, self.stderr, options['batch_size'], options['queue_size'], options['idle'])
+        try:
+            asyncio.run(server.serve(options['host'], options['port'], options['stats'], options['allowlist_refresh']))
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du serveur GT06")
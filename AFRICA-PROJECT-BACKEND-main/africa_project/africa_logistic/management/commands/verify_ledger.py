@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from africa_logistic.ledger import find_discrepancies
+
+
+class Command(BaseCommand):
+    help = "Vérifie que le solde de chaque portefeuille est égal à la somme de ses transactions"
+
+    def handle(self, *args, **options):
+        discrepancies = find_discrepancies()
+        for wallet, expected in discrepancies:
+            self.stdout.write(f"{wallet.slug} ({wallet.user.presentation()}) : solde {wallet.balance}, transactions {expected}")
+        if discrepancies:
+            raise CommandError(f"{len(discrepancies)} portefeuille(s) incohérent(s)")
+        self.stdout.write("Grand livre cohérent.")
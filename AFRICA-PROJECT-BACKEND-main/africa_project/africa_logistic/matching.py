@@ -0,0 +1,140 @@
+import math
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import (
+    MATCHING_CACHE_MAX_SIZE, MATCHING_CACHE_TTL_SECONDS, MATCHING_DISTANCE_KM, MATCHING_PRIORITY_BONUS,
+    MATCHING_WEIGHTS, VEHICLE_MERCHANDISE,
+)
+from africa_logistic.geo import EARTH_RADIUS_KM
+from africa_logistic.models import TransportRequest, Vehicle
+
+# Profil de capacité d'un transporteur :
+# - by_merchandise : type de marchandise -> (capacités triées, conformité assurance/visite de chaque véhicule)
+# - lat, lon, city_key : point de la dernière livraison (None / '' si inconnu)
+# - cos_lat : cosinus de la latitude de ce point, pour la distance équirectangulaire
+Capability = namedtuple('Capability', 'by_merchandise lat lon city_key cos_lat')
+
+_capabilities = LRUCache(max_size=MATCHING_CACHE_MAX_SIZE, ttl=MATCHING_CACHE_TTL_SECONDS)
+
+# Le poids est lu en float par la base : pas de Decimal à construire pour chaque ligne
+CANDIDATE_COLUMNS = ('id', 'weight_kg', 'merchandise_type', 'priority', 'pickup_lat', 'pickup_lon', 'pickup_city_key')
+
+
+def build_capability(user_id, today=None):
+    today = today or timezone.localdate()
+    fleet = {}
+    vehicles = Vehicle.objects.filter(owner_id=user_id, status='ACTIVE').values_list('type', 'capacity_kg', 'insurance_expiry', 'inspection_expiry')
+    for vehicle_type, capacity, insurance, inspection in vehicles:
+        compliant = bool(insurance and insurance >= today and inspection and inspection >= today)
+        for merchandise in VEHICLE_MERCHANDISE.get(vehicle_type, ()):
+            fleet.setdefault(merchandise, []).append((float(capacity), compliant))
+    by_merchandise = {}
+    for merchandise, entries in fleet.items():
+        entries.sort()
+        by_merchandise[merchandise] = (tuple(c for c, _ in entries), tuple(ok for _, ok in entries))
+
+    last = (
+        TransportRequest.objects.filter(assigned_transporter_id=user_id, status='DELIVERED')
+        .order_by('-updated_at')
+        .values_list('delivery_lat', 'delivery_lon', 'delivery_city_key')
+        .first()
+    )
+    lat, lon, city_key = last or (None, None, '')
+    cos_lat = math.cos(math.radians(lat)) if lat is not None else 1.0
+    return Capability(by_merchandise, lat, lon, city_key or '', cos_lat)
+
+
+def get_capability(user_id):
+    """Profil du transporteur, recalculé au plus une fois par TTL (et par jour, pour les dates d'expiration)."""
+    key = (user_id, timezone.localdate())
+    capability = _capabilities.get(key)
+    if capability is None:
+        capability = build_capability(user_id, key[1])
+        _capabilities.set(key, capability)
+    return capability
+
+
+def invalidate_capability(user_id):
+    """À appeler quand la flotte du transporteur ou sa dernière livraison change."""
+    _capabilities.delete((user_id, timezone.localdate()))
+
+
+def capability_filter(capability):
+    """Filtre SQL des demandes transportables : type de marchandise accepté et poids <= plus grande capacité."""
+    condition = Q(pk__in=[])
+    for merchandise, (capacities, _) in capability.by_merchandise.items():
+        condition |= Q(merchandise_type=merchandise, weight__lte=capacities[-1])
+    return condition
+
+
+def score(capability, weight, merchandise, priority, lat, lon, city_key):
+    """
+    Score dans [0, 1] d'une demande pour ce transporteur, avec le véhicule retenu :
+    le plus petit véhicule conforme qui peut la porter, sinon le plus petit non conforme.
+    Retourne (score, capacité du véhicule, conforme, distance en km ou None), ou None si intransportable.
+    La distance est l'approximation équirectangulaire (écart < 0,5 % à l'échelle du pays).
+    """
+    capacities, compliance = capability.by_merchandise.get(merchandise, ((), ()))
+    start = bisect_left(capacities, weight)
+    if start == len(capacities):
+        return None
+    chosen = start
+    for index in range(start, len(capacities)):
+        if compliance[index]:
+            chosen = index
+            break
+    capacity, compliant = capacities[chosen], compliance[chosen]
+
+    distance = None
+    if capability.lat is not None and lat is not None:
+        dx = (lon - capability.lon) * capability.cos_lat
+        dy = lat - capability.lat
+        distance = _KM_PER_DEGREE * math.sqrt(dx * dx + dy * dy)
+        proximity = 1 - distance / MATCHING_DISTANCE_KM if distance < MATCHING_DISTANCE_KM else 0.0
+    elif capability.city_key and city_key:
+        proximity = 1.0 if capability.city_key == city_key else 0.0
+    else:
+        proximity = 0.5
+
+    value = (
+        _CAPACITY_WEIGHT * weight / capacity
+        + _COMPLIANCE_WEIGHT * compliant
+        + _DISTANCE_WEIGHT * proximity
+        + _PRIORITY_SCORES.get(priority, 0.0)
+    )
+    return value, capacity, compliant, distance
+
+
+_KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+_CAPACITY_WEIGHT = MATCHING_WEIGHTS['capacity']
+_COMPLIANCE_WEIGHT = MATCHING_WEIGHTS['compliance']
+_DISTANCE_WEIGHT = MATCHING_WEIGHTS['distance']
+_PRIORITY_SCORES = {priority: MATCHING_WEIGHTS['priority'] * bonus for priority, bonus in MATCHING_PRIORITY_BONUS.items()}
+
+
+def rank_requests(user_id, queryset):
+    """
+    Demandes du queryset transportables par le transporteur, de la meilleure à la moins bonne correspondance.
+    Seules les colonnes utiles au score sont lues ; retourne une liste de (id, score, capacité, conforme, distance).
+    """
+    capability = get_capability(user_id)
+    if not capability.by_merchandise:
+        return []
+    candidates = (
+        queryset.filter(capability_filter(capability))
+        .annotate(weight_kg=Cast('weight', FloatField()))
+        .values_list(*CANDIDATE_COLUMNS)
+    )
+    ranked = []
+    for pk, weight, merchandise, priority, lat, lon, city_key in candidates:
+        result = score(capability, weight, merchandise, priority, lat, lon, city_key)
+        if result is not None:
+            ranked.append((pk,) + result)
+    ranked.sort(key=lambda row: (-row[1], -row[0]))
+    return ranked
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0002_remove_passwordresettoken_token_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userconnect',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['slug'], include=('user',), name='userconnect_active_token_idx'),
+        ),
+    ]
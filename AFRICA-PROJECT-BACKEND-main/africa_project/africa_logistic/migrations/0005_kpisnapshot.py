@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:25
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def fill_kpis(apps, schema_editor):
+    # Rollup initial : sans lui le dashboard n'afficherait que les variations postérieures à la migration
+    from africa_logistic.kpis import rollup_buckets
+    from africa_logistic.models import assign_slugs
+
+    TransportRequest = apps.get_model('africa_logistic', 'TransportRequest')
+    Wallet = apps.get_model('africa_logistic', 'Wallet')
+    KpiSnapshot = apps.get_model('africa_logistic', 'KpiSnapshot')
+    buckets = rollup_buckets(TransportRequest.objects.filter(is_active=True), Wallet.objects.filter(is_active=True))
+    KpiSnapshot.objects.bulk_create(assign_slugs([
+        KpiSnapshot(day=day, role=role, status=status, city=city, **values)
+        for (day, role, status, city), values in buckets.items()
+    ]), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0004_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KpiSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(blank=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('day', models.DateField()),
+                ('role', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(blank=True, default='', max_length=20)),
+                ('city', models.CharField(blank=True, default='', max_length=100)),
+                ('request_count', models.IntegerField(default=0, help_text='Variation du nombre de demandes actives')),
+                ('created_count', models.IntegerField(default=0, help_text='Demandes créées ce jour (encore actives)')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Variation du prix estimé des demandes livrées', max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Variation des soldes des portefeuilles', max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Snapshot KPI',
+                'verbose_name_plural': 'Snapshots KPI',
+                'constraints': [models.UniqueConstraint(fields=('day', 'role', 'status', 'city'), name='kpisnapshot_unique_bucket')],
+            },
+        ),
+        migrations.RunPython(fill_kpis, migrations.RunPython.noop),
+    ]
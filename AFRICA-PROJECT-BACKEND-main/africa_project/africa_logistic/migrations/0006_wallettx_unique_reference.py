@@ -0,0 +1,39 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+def deduplicate_references(apps, schema_editor):
+    """
+    Les références vides deviennent NULL ; les doublons historiques (même portefeuille, type et référence)
+    sont suffixés par leur id pour permettre la contrainte d'unicité.
+    """
+    WalletTransaction = apps.get_model('africa_logistic', 'WalletTransaction')
+    WalletTransaction.objects.filter(reference='').update(reference=None)
+    seen = set()
+    for tx in WalletTransaction.objects.exclude(reference=None).order_by('created_at', 'id').only('id', 'wallet_id', 'tx_type', 'reference'):
+        key = (tx.wallet_id, tx.tx_type, tx.reference)
+        if key in seen:
+            WalletTransaction.objects.filter(pk=tx.pk).update(reference=f"{tx.reference[:88]}#dup-{tx.pk}")
+        else:
+            seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0005_kpisnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='reference',
+            field=models.CharField(blank=True, help_text="Clé d'idempotence : un seul mouvement par (portefeuille, type, référence)", max_length=100, null=True),
+        ),
+        migrations.RunPython(deduplicate_references, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wallettransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference__isnull', False)), fields=('wallet', 'tx_type', 'reference'), name='wallettx_unique_reference'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:32
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0007_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(blank=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('period', models.DateField(help_text='Premier jour du mois')),
+                ('opening_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('credits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('tx_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Relevé mensuel',
+                'verbose_name_plural': 'Relevés mensuels',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='balance_after',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Solde du portefeuille après ce mouvement (calculé sous le verrou du grand livre)', max_digits=14, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'created_at'], name='wallettx_wallet_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='africa_logistic.wallet'),
+        ),
+        migrations.AddConstraint(
+            model_name='walletcheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'period'), name='walletcheckpoint_unique_period'),
+        ),
+    ]
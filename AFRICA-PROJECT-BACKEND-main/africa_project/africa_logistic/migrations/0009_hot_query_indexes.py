@@ -0,0 +1,50 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:33
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from africa_logistic.indexes import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Tables chargées en production : index construits sans bloquer les écritures (CREATE INDEX CONCURRENTLY)
+    atomic = False
+
+    dependencies = [
+        ('africa_logistic', '0008_wallet_balance_checkpoints'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-created_at'], name='notif_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'is_read'], name='notif_user_read_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['client', '-created_at', '-id'], name='treq_client_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['assigned_transporter', 'status'], name='treq_transporter_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['status', 'priority'], name='treq_status_priority_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='treq_active_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('assigned_transporter__isnull', True), ('is_active', True), ('status__in', ['PENDING', 'OFFERS_RECEIVED'])), fields=['-created_at', '-id'], name='treq_available_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('role'), models.F('is_approved'), condition=models.Q(('is_active', True)), name='user_role_approved_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:36
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from africa_logistic.indexes import AddIndexConcurrently
+
+
+def fill_city_keys(apps, schema_editor):
+    from africa_logistic.search import normalize_city
+
+    TransportRequest = apps.get_model('africa_logistic', 'TransportRequest')
+    batch = []
+    for transport_request in TransportRequest.objects.only('id', 'pickup_city', 'delivery_city').iterator(chunk_size=2000):
+        transport_request.pickup_city_key = normalize_city(transport_request.pickup_city)
+        transport_request.delivery_city_key = normalize_city(transport_request.delivery_city)
+        batch.append(transport_request)
+        if len(batch) >= 2000:
+            TransportRequest.objects.bulk_update(batch, ['pickup_city_key', 'delivery_city_key'])
+            batch = []
+    TransportRequest.objects.bulk_update(batch, ['pickup_city_key', 'delivery_city_key'])
+
+
+def create_search_indexes(apps, schema_editor):
+    from africa_logistic.indexes import create_postgres_indexes, search_indexes
+
+    create_postgres_indexes(schema_editor, apps.get_model('africa_logistic', 'TransportRequest'), search_indexes())
+
+
+def drop_search_indexes(apps, schema_editor):
+    from africa_logistic.indexes import drop_postgres_indexes, search_indexes
+
+    drop_postgres_indexes(schema_editor, apps.get_model('africa_logistic', 'TransportRequest'), search_indexes())
+
+
+class Migration(migrations.Migration):
+    # Index construits sans bloquer les écritures (CREATE INDEX CONCURRENTLY)
+    atomic = False
+
+    dependencies = [
+        ('africa_logistic', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='delivery_city_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='pickup_city_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_city_keys, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['pickup_city_key', '-created_at'], name='treq_pickup_city_key_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transportrequest',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['delivery_city_key', '-created_at'], name='treq_delivery_city_key_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:39
+
+from django.db import migrations, models
+
+
+def fill_locations(apps, schema_editor):
+    from africa_logistic.geo import geohash, parse_coordinates
+
+    TransportRequest = apps.get_model('africa_logistic', 'TransportRequest')
+    fields = ['pickup_lat', 'pickup_lon', 'pickup_geohash', 'delivery_lat', 'delivery_lon', 'delivery_geohash']
+    batch = []
+    queryset = TransportRequest.objects.filter(models.Q(pickup_coordinates__gt='') | models.Q(delivery_coordinates__gt=''))
+    for transport_request in queryset.only('id', 'pickup_coordinates', 'delivery_coordinates').iterator(chunk_size=2000):
+        for prefix in ('pickup', 'delivery'):
+            point = parse_coordinates(getattr(transport_request, f'{prefix}_coordinates'))
+            if point:
+                setattr(transport_request, f'{prefix}_lat', point[0])
+                setattr(transport_request, f'{prefix}_lon', point[1])
+                setattr(transport_request, f'{prefix}_geohash', geohash(*point))
+        batch.append(transport_request)
+        if len(batch) >= 2000:
+            TransportRequest.objects.bulk_update(batch, fields)
+            batch = []
+    TransportRequest.objects.bulk_update(batch, fields)
+
+
+def create_geohash_indexes(apps, schema_editor):
+    from africa_logistic.indexes import create_postgres_indexes, geohash_indexes
+
+    create_postgres_indexes(schema_editor, apps.get_model('africa_logistic', 'TransportRequest'), geohash_indexes())
+
+
+def drop_geohash_indexes(apps, schema_editor):
+    from africa_logistic.indexes import drop_postgres_indexes, geohash_indexes
+
+    drop_postgres_indexes(schema_editor, apps.get_model('africa_logistic', 'TransportRequest'), geohash_indexes())
+
+
+class Migration(migrations.Migration):
+    # Index construits sans bloquer les écritures (CREATE INDEX CONCURRENTLY)
+    atomic = False
+
+    dependencies = [
+        ('africa_logistic', '0010_request_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transportrequest',
+            name='delivery_geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='delivery_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='delivery_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='pickup_geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='pickup_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='pickup_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_locations, migrations.RunPython.noop, atomic=True),
+        migrations.RunPython(create_geohash_indexes, drop_geohash_indexes),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+def create_tracker_table(apps, schema_editor):
+    from africa_logistic.configs import TRACKER_PARTITION_MONTHS_AHEAD
+    from africa_logistic.tracking import create_table, ensure_partitions
+
+    create_table(schema_editor, apps.get_model('africa_logistic', 'TrackerPosition'))
+    ensure_partitions(schema_editor.connection, TRACKER_PARTITION_MONTHS_AHEAD)
+
+
+def drop_tracker_table(apps, schema_editor):
+    from africa_logistic.tracking import drop_table
+
+    drop_table(schema_editor, apps.get_model('africa_logistic', 'TrackerPosition'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0011_request_geo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackerPosition',
+            fields=[
+                ('pk', models.CompositePrimaryKey('imei', 'ts', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('imei', models.CharField(max_length=20)),
+                ('ts', models.DateTimeField()),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('speed', models.FloatField(blank=True, help_text='Vitesse en km/h', null=True)),
+                ('course', models.FloatField(blank=True, help_text='Cap en degrés', null=True)),
+            ],
+            options={
+                'verbose_name': 'Position GPS',
+                'verbose_name_plural': 'Positions GPS',
+                'db_table': 'africa_logistic_trackerposition',
+                'managed': False,
+            },
+        ),
+        # Modèle non géré : la table (partitionnée sur PostgreSQL) est créée ici
+        migrations.RunPython(create_tracker_table, drop_tracker_table),
+    ]
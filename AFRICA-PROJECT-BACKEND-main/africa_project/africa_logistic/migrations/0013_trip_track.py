@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0012_tracker_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(blank=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('imei', models.CharField(max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('raw_point_count', models.PositiveIntegerField(default=0, help_text='Positions reçues sur le trajet')),
+                ('point_count', models.PositiveIntegerField(default=0, help_text='Points conservés après simplification')),
+                ('distance_km', models.FloatField(default=0)),
+                ('data', models.BinaryField()),
+                ('transport_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trip_track', to='africa_logistic.transportrequest')),
+            ],
+            options={
+                'verbose_name': 'Trace de trajet',
+                'verbose_name_plural': 'Traces de trajet',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('africa_logistic', '0013_trip_track'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorridorSpeedProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(blank=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('pickup_city_key', models.CharField(blank=True, default='', max_length=100)),
+                ('delivery_city_key', models.CharField(blank=True, default='', max_length=100)),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('speed_kmh', models.FloatField(help_text='Vitesse médiane')),
+                ('slow_speed_kmh', models.FloatField(help_text='Premier quartile (trajets lents)')),
+            ],
+            options={
+                'verbose_name': 'Profil de vitesse par corridor',
+                'verbose_name_plural': 'Profils de vitesse par corridor',
+                'constraints': [models.UniqueConstraint(fields=('pickup_city_key', 'delivery_city_key'), name='corridor_profile_unique')],
+            },
+        ),
+    ]
@@ -1,11 +1,17 @@
 from django.conf import settings
-from django.db import models
+import os
+import time
+from django.db import IntegrityError, models, router, transaction
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import date, datetime
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from africa_logistic.configs import *
+from africa_logistic.serializers import serialize_instance
+from africa_logistic.geo import geohash, parse_coordinates
+from africa_logistic.search import normalize_city
 # Create your models here.
 
 
@@ -43,6 +49,33 @@ class SoftManager(models.Manager):
     def inactive(self):
         return self.get_queryset().filter(is_active=False)
 
+# Alphabet base32 de Crockford (sans i, l, o, u), en minuscules pour rester un slug lisible
+_SLUG_ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+
+
+def generate_slug():
+    """
+    Slug ordonné dans le temps (type ULID) : 'obj-' + 26 caractères base32,
+    48 bits d'horodatage en millisecondes puis 80 bits aléatoires.
+    L'aléa suffit à rendre la vérification préalable inutile, et les insertions dans l'index
+    sur slug se font en fin d'arbre.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    chars = []
+    for _ in range(26):
+        chars.append(_SLUG_ALPHABET[value & 31])
+        value >>= 5
+    return 'obj-' + ''.join(reversed(chars))
+
+
+def assign_slugs(objs):
+    """Attribue un slug aux objets qui n'en ont pas, avant un bulk_create()."""
+    for obj in objs:
+        if not obj.slug:
+            obj.slug = generate_slug()
+    return objs
+
+
 class BaseModel(models.Model):
     # id = models.BigAutoField(primary_key=True)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
@@ -57,15 +90,26 @@ class BaseModel(models.Model):
         abstract = True
         
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Generate random unique string for slug
-            import uuid
-            self.slug = str(uuid.uuid4())[:16]  # Use first 8 characters of UUID as slug
-            # Ensure slug is unique
-            while self.__class__.objects.filter(slug='obj-'+self.slug).exists():
-                self.slug = str(uuid.uuid4())[:16]
-            self.slug = 'obj-' + self.slug  # Prefix slug with 'obj-'
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        # Pas de requête de vérification : l'index unique sur slug signale une éventuelle collision
+        self.slug = generate_slug()
+        attempts = 1
+        while True:
+            try:
+                super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Nouvel essai seulement si c'est bien le slug qui collisionne, et hors transaction
+                # (dans un bloc atomic, la transaction est déjà invalidée par l'erreur)
+                using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+                if (attempts >= SLUG_MAX_ATTEMPTS
+                        or transaction.get_connection(using).in_atomic_block
+                        or not self.__class__._base_manager.using(using).filter(slug=self.slug).exists()):
+                    raise
+                self.slug = generate_slug()
+                attempts += 1
 
     def delete(self, using=None, keep_parents=False):
         # Soft delete individuel
@@ -82,48 +126,9 @@ class BaseModel(models.Model):
         Retourne un dict de l'objet.
         - include_related=True : inclut les FK (id par défaut sinon dict si possible)
         - exclude=["champ1", "champ2"] : permet d'exclure certains champs
+        Le parcours des champs est précalculé une fois par modèle (voir serializers.py).
         """
-        data = {}
-        exclude = exclude or []
-
-        for field in self._meta.get_fields():
-            field_name = field.name
-
-            if field_name in exclude:
-                continue
-
-            if hasattr(field, "attname"):
-                value = getattr(self, field_name, None)
-
-                # Dates
-                if isinstance(value, (datetime, date)):
-                    data[field_name] = value.isoformat() if value else None
-                # ForeignKey
-                elif field.is_relation and not field.many_to_many and not field.one_to_many:
-                    if include_related and hasattr(value, "as_dict"):
-                        data[field_name] = value.as_dict()
-                    else:
-                        data[field_name] = value.pk if value else None
-                # Fichiers (ImageField, FileField, etc.)
-                elif isinstance(field, (models.FileField, models.ImageField)):
-                    if value and hasattr(value, "url"):
-                        # Précède l'URL du serveur de façon dynamique
-                        request = getattr(self, '_request', None)
-                        if request:
-                            data[field_name] = request.build_absolute_uri(value.url)
-                        else:
-                            # Construire l'URL complète avec le domaine
-                            media_url = value.url if value.url.startswith('http') else f"http://localhost:8000/{settings.MEDIA_URL}{value.name}"
-                            data[field_name] = media_url if value and value.name else None
-                    else:
-                        data[field_name] = None
-                    
-                elif isinstance(value, (str, int, float, bool)):
-                    data[field_name] = value
-                else:
-                    data[field_name] = None
-
-        return data
+        return serialize_instance(self, include_related, exclude)
 
 class User(BaseModel):
     firstname = models.CharField(max_length=30, blank=True, null=True)
@@ -141,6 +146,12 @@ class User(BaseModel):
     approved_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_transporters', limit_choices_to={'role__in': ['ADMIN', 'DATA ADMIN']})
     approved_at = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # role__iexact (transporteurs à approuver, exports) : index sur UPPER(role)
+            models.Index(Upper('role'), 'is_approved', name='user_role_approved_idx', condition=models.Q(is_active=True)),
+        ]
+    
     def save(self, *args, **kwargs):
         # Si le password n'est pas déjà hashé
         if self.password and not self.password.startswith('pbkdf2_'):
@@ -205,17 +216,52 @@ class WalletTransaction(BaseModel):
     tx_type = models.CharField(max_length=10, choices=TX_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     description = models.CharField(max_length=255, blank=True, null=True)
-    reference = models.CharField(max_length=100, blank=True, null=True)
+    reference = models.CharField(max_length=100, blank=True, null=True, help_text="Clé d'idempotence : un seul mouvement par (portefeuille, type, référence)")
+    balance_after = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, help_text="Solde du portefeuille après ce mouvement (calculé sous le verrou du grand livre)")
     
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Transaction portefeuille"
         verbose_name_plural = "Transactions portefeuille"
+        indexes = [
+            models.Index(fields=['wallet', 'created_at'], name='wallettx_wallet_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'tx_type', 'reference'],
+                condition=models.Q(reference__isnull=False),
+                name='wallettx_unique_reference',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.tx_type} {self.amount} on {self.wallet.user.presentation()}"
 
 
+class WalletCheckpoint(BaseModel):
+    """
+    Relevé mensuel d'un portefeuille (soldes d'ouverture/clôture et totaux), tenu à jour par le grand livre
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    period = models.DateField(help_text="Premier jour du mois")
+    opening_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    tx_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-period"]
+        verbose_name = "Relevé mensuel"
+        verbose_name_plural = "Relevés mensuels"
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'period'], name='walletcheckpoint_unique_period'),
+        ]
+
+    def __str__(self):
+        return f"Relevé {self.period:%Y-%m} ({self.wallet_id}) : {self.closing_balance}"
+
+
 class Notification(BaseModel):
     """
     Notifications simples (texte) pour les utilisateurs
@@ -230,6 +276,10 @@ class Notification(BaseModel):
         ordering = ["-created_at"]
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['user', 'is_read'], name='notif_user_read_idx', condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return f"Notification({self.user.presentation()}): {self.title}"
@@ -304,9 +354,30 @@ class PasswordResetToken(BaseModel):
             self.save()
         return b
 
+class UserConnectManager(SoftManager):
+    def get_user_for_token(self, token):
+        """
+        Retourne l'utilisateur associé au token en une seule requête (jointure sur User).
+        Lève UserConnect.DoesNotExist si le token est invalide.
+        """
+        return self.get_queryset().select_related('user').get(slug=token).user
+
 class UserConnect(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='connections')
 
+    objects = UserConnectManager()
+
+    class Meta:
+        indexes = [
+            # Index couvrant pour la résolution des tokens actifs (is_logged_in)
+            models.Index(
+                fields=['slug'],
+                include=['user'],
+                condition=models.Q(is_active=True),
+                name='userconnect_active_token_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Connection for {self.user.email} - Expires at {self.expires_at}"
 
@@ -417,6 +488,18 @@ class TransportRequest(BaseModel):
     delivery_city = models.CharField(max_length=100)
     delivery_coordinates = models.CharField(max_length=50, blank=True, null=True)
     
+    # Villes normalisées (répertoire BENIN_CITIES), calculées à l'enregistrement
+    pickup_city_key = models.CharField(max_length=100, blank=True, default='', editable=False)
+    delivery_city_key = models.CharField(max_length=100, blank=True, default='', editable=False)
+    
+    # Coordonnées extraites de *_coordinates ("lat,lon"), calculées à l'enregistrement
+    pickup_lat = models.FloatField(blank=True, null=True, editable=False)
+    pickup_lon = models.FloatField(blank=True, null=True, editable=False)
+    pickup_geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+    delivery_lat = models.FloatField(blank=True, null=True, editable=False)
+    delivery_lon = models.FloatField(blank=True, null=True, editable=False)
+    delivery_geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+    
     # Dates
     preferred_pickup_date = models.DateTimeField(help_text="Date souhaitée de collecte")
     preferred_delivery_date = models.DateTimeField(
@@ -465,6 +548,55 @@ class TransportRequest(BaseModel):
         ordering = ['-created_at']
         verbose_name = "Demande de transport"
         verbose_name_plural = "Demandes de transport"
+        # Index partiels sur is_active=True : SoftManager ajoute ce filtre à toutes les requêtes
+        # L'ordre (-created_at, -id) est celui de la pagination par curseur
+        indexes = [
+            models.Index(fields=['client', '-created_at', '-id'], name='treq_client_created_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['assigned_transporter', 'status'], name='treq_transporter_status_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['status', 'priority'], name='treq_status_priority_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['-created_at', '-id'], name='treq_active_created_idx', condition=models.Q(is_active=True)),
+            # get_available_requests : demandes non assignées en attente
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='treq_available_idx',
+                condition=models.Q(is_active=True, assigned_transporter__isnull=True, status__in=['PENDING', 'OFFERS_RECEIVED']),
+            ),
+            # Recherche : ville exacte (clés normalisées) ; les index trigram et plein texte,
+            # propres à PostgreSQL, sont créés par la migration 0010 (indexes.search_indexes)
+            models.Index(fields=['pickup_city_key', '-created_at'], name='treq_pickup_city_key_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['delivery_city_key', '-created_at'], name='treq_delivery_city_key_idx', condition=models.Q(is_active=True)),
+            # Filtre ?near= : les index de préfixes geohash (varchar_pattern_ops, propres à PostgreSQL)
+            # sont créés par la migration 0011 (indexes.geohash_indexes)
+        ]
+    
+    # Champ saisi -> champs dérivés recalculés par save()
+    DERIVED_FIELDS = {
+        'pickup_city': ('pickup_city_key',),
+        'delivery_city': ('delivery_city_key',),
+        'pickup_coordinates': ('pickup_lat', 'pickup_lon', 'pickup_geohash'),
+        'delivery_coordinates': ('delivery_lat', 'delivery_lon', 'delivery_geohash'),
+    }
+    
+    def set_location(self, prefix):
+        point = parse_coordinates(getattr(self, f'{prefix}_coordinates'))
+        lat, lon = point or (None, None)
+        setattr(self, f'{prefix}_lat', lat)
+        setattr(self, f'{prefix}_lon', lon)
+        setattr(self, f'{prefix}_geohash', geohash(lat, lon) if point else '')
+    
+    def save(self, *args, **kwargs):
+        self.pickup_city_key = normalize_city(self.pickup_city)
+        self.delivery_city_key = normalize_city(self.delivery_city)
+        self.set_location('pickup')
+        self.set_location('delivery')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for source, derived in self.DERIVED_FIELDS.items():
+                if source in update_fields:
+                    update_fields.update(derived)
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.title} - {self.client.presentation()} ({self.status})"
@@ -690,3 +822,166 @@ class NotificationPreference(BaseModel):
     def __str__(self):
         return f"Prefs for {self.user.presentation()}"
 
+
+class ReportJob(BaseModel):
+    """
+    Génération asynchrone des rapports CSV volumineux (admin)
+    Le fichier est produit par la commande run_report_worker dans MEDIA_ROOT/reports/
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échec'),
+    ]
+
+    report_type = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64, help_text="Empreinte (type + paramètres) pour réutiliser un rapport récent")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    file = models.FileField(upload_to='reports/', blank=True, null=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Rapport"
+        verbose_name_plural = "Rapports"
+        indexes = [
+            models.Index(fields=['params_hash', 'status'], name='reportjob_hash_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} ({self.status})"
+
+
+class KpiSnapshot(BaseModel):
+    """
+    Rollup journalier des KPI du dashboard admin (deltas par jour, rôle, statut et ville)
+    Maintenu incrémentalement par africa_logistic.kpis ; la somme de toutes les lignes donne les totaux courants.
+    """
+    day = models.DateField()
+    role = models.CharField(max_length=20, blank=True, default='')
+    status = models.CharField(max_length=20, blank=True, default='')
+    city = models.CharField(max_length=100, blank=True, default='')
+
+    request_count = models.IntegerField(default=0, help_text="Variation du nombre de demandes actives")
+    created_count = models.IntegerField(default=0, help_text="Demandes créées ce jour (encore actives)")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), help_text="Variation du prix estimé des demandes livrées")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), help_text="Variation des soldes des portefeuilles")
+
+    class Meta:
+        verbose_name = "Snapshot KPI"
+        verbose_name_plural = "Snapshots KPI"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'role', 'status', 'city'], name='kpisnapshot_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"KPI {self.day} {self.role}/{self.status}/{self.city}"
+
+
+class IdempotencyKey(BaseModel):
+    """
+    Réponse enregistrée pour un en-tête Idempotency-Key (rejouée telle quelle si le client renvoie la requête)
+    status_code vide : requête originale encore en cours de traitement
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text="Empreinte (méthode, chemin, corps) de la requête originale")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
+    response_body = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotencykey_unique_user_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.endpoint})"
+
+
+class TrackerPosition(models.Model):
+    """
+    Position GPS reçue d'un tracker : série temporelle en ajout seul, clé (imei, ts).
+    Sur PostgreSQL la table est partitionnée par mois sur ts avec un index BRIN (migration 0012,
+    commande create_tracker_partitions) : pas de slug ni de suppression logique.
+    """
+    pk = models.CompositePrimaryKey('imei', 'ts')
+    imei = models.CharField(max_length=20)
+    ts = models.DateTimeField()
+    lat = models.FloatField()
+    lon = models.FloatField()
+    speed = models.FloatField(null=True, blank=True, help_text="Vitesse en km/h")
+    course = models.FloatField(null=True, blank=True, help_text="Cap en degrés")
+
+    class Meta:
+        managed = False
+        db_table = 'africa_logistic_trackerposition'
+        verbose_name = "Position GPS"
+        verbose_name_plural = "Positions GPS"
+
+    def __str__(self):
+        return f"{self.imei} @ {self.ts}"
+
+    def as_dict(self):
+        return {
+            'imei': self.imei,
+            'ts': self.ts.isoformat(),
+            'lat': self.lat,
+            'lon': self.lon,
+            'speed': self.speed,
+            'course': self.course,
+        }
+
+
+class TripTrack(BaseModel):
+    """
+    Trace archivée d'un trajet livré : points (lat, lon, ts) encodés en écarts successifs
+    et compressés (tracks.encode_track), relus en un seul accès au lieu d'un parcours des positions.
+    """
+    transport_request = models.OneToOneField(TransportRequest, on_delete=models.CASCADE, related_name='trip_track')
+    imei = models.CharField(max_length=20)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    raw_point_count = models.PositiveIntegerField(default=0, help_text="Positions reçues sur le trajet")
+    point_count = models.PositiveIntegerField(default=0, help_text="Points conservés après simplification")
+    distance_km = models.FloatField(default=0)
+    data = models.BinaryField()
+
+    class Meta:
+        verbose_name = "Trace de trajet"
+        verbose_name_plural = "Traces de trajet"
+
+    def __str__(self):
+        return f"Trace {self.imei} - {self.transport_request.title}"
+
+
+class CorridorSpeedProfile(BaseModel):
+    """
+    Vitesse effective (km/h à vol d'oiseau, de IN_PROGRESS à DELIVERED) des trajets livrés d'un corridor
+    ville de collecte -> ville de livraison, recalculée chaque nuit (compute_speed_profiles).
+    Les clés vides désignent le profil global, utilisé pour les corridors sans assez de trajets.
+    """
+    pickup_city_key = models.CharField(max_length=100, blank=True, default='')
+    delivery_city_key = models.CharField(max_length=100, blank=True, default='')
+    trip_count = models.PositiveIntegerField(default=0)
+    speed_kmh = models.FloatField(help_text="Vitesse médiane")
+    slow_speed_kmh = models.FloatField(help_text="Premier quartile (trajets lents)")
+
+    class Meta:
+        verbose_name = "Profil de vitesse par corridor"
+        verbose_name_plural = "Profils de vitesse par corridor"
+        constraints = [
+            models.UniqueConstraint(fields=['pickup_city_key', 'delivery_city_key'], name='corridor_profile_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.pickup_city_key or '*'} -> {self.delivery_city_key or '*'} : {self.speed_kmh:.0f} km/h"
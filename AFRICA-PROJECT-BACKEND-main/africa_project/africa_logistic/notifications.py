@@ -0,0 +1,36 @@
+from django.db import transaction
+
+from africa_logistic.background import submit
+from africa_logistic.configs import ASYNC_NOTIFICATIONS
+from africa_logistic.models import Notification, User, assign_slugs
+
+ADMIN_ROLES = ["ADMIN", "DATA ADMIN"]
+
+
+def notify_users(user_ids, title, message, type=None):
+    """
+    Crée une notification par utilisateur en un seul INSERT (slugs pré-générés).
+    """
+    notifications = assign_slugs([
+        Notification(user_id=user_id, title=title, message=message, type=type)
+        for user_id in user_ids
+    ])
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    return len(notifications)
+
+
+def notify_admins(title, message, type=None):
+    """Notification à tous les admins : 1 SELECT des ids + 1 INSERT groupé."""
+    admin_ids = list(User.objects.filter(role__in=ADMIN_ROLES).values_list('id', flat=True))
+    return notify_users(admin_ids, title, message, type)
+
+
+def fan_out_admins(title, message, type=None):
+    """
+    Notifie les admins hors du chemin de la requête (thread de fond) une fois la transaction validée,
+    ou immédiatement si ASYNC_NOTIFICATIONS est désactivé.
+    """
+    if not ASYNC_NOTIFICATIONS:
+        notify_admins(title, message, type)
+        return
+    transaction.on_commit(lambda: submit(notify_admins, title, message, type))
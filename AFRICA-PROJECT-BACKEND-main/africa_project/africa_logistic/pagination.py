@@ -0,0 +1,100 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+
+from africa_logistic.configs import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_CHUNK_SIZE
+
+KEYSET_ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    raw = json.dumps([obj.created_at.isoformat(), obj.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(pk)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def apply_cursor(queryset, cursor):
+    """
+    Trie sur (created_at, id) décroissants et ne garde que les lignes situées après le curseur.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Retourne (objets, curseur_suivant). Le curseur suivant vaut None sur la dernière page.
+    """
+    rows = list(apply_cursor(queryset, cursor)[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def ndjson_response(queryset, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Réponse en flux NDJSON (un objet JSON par ligne), lue en base par lots.
+    """
+    def lines():
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield json.dumps(serialize(obj), cls=DjangoJSONEncoder) + '\n'
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+def list_response(request, queryset, key, message, serialize=lambda obj: obj.as_dict(), default_limit=None, extra=None):
+    """
+    Réponse commune des listes :
+    - ?format=ndjson : flux NDJSON, la liste n'est jamais entièrement en mémoire
+    - ?limit=N et/ou ?cursor=... : pagination par curseur sur (created_at, id), avec 'next_cursor'
+    - sans paramètre : liste complète (comportement historique), limitée à default_limit lignes si fourni
+    - extra : champs ajoutés à la réponse JSON (ex : résumé d'un relevé)
+    """
+    extra = extra or {}
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    try:
+        if limit is not None:
+            limit = int(limit)
+            if limit <= 0:
+                raise ValueError(limit)
+            limit = min(limit, MAX_PAGE_SIZE)
+        if request.GET.get('format') == 'ndjson':
+            queryset = apply_cursor(queryset, cursor)
+            if limit is not None:
+                queryset = queryset[:limit]
+            return ndjson_response(queryset, serialize)
+        if limit is None and not cursor:
+            if default_limit is not None:
+                queryset = apply_cursor(queryset, None)[:default_limit]
+            return JsonResponse({
+                'message': message,
+                **extra,
+                key: [serialize(obj) for obj in queryset]
+            }, status=200)
+        rows, next_cursor = keyset_page(queryset, cursor, limit or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres de pagination invalides (limit ou cursor).'}, status=400)
+    return JsonResponse({
+        'message': message,
+        **extra,
+        key: [serialize(obj) for obj in rows],
+        'next_cursor': next_cursor,
+    }, status=200)
@@ -0,0 +1,88 @@
+import inspect
+
+from django.conf import settings
+
+from africa_logistic.serializers import FILE, FOREIGN_KEY, MANY, VALUE, convert_value, get_plan
+
+_DEFAULT_EXCLUDES = {}
+
+
+def default_exclude(model):
+    """
+    Exclusions par défaut de model.as_dict() (ex : ['password'] pour User),
+    utilisées pour les objets liés imbriqués.
+    """
+    if model not in _DEFAULT_EXCLUDES:
+        default = inspect.signature(model.as_dict).parameters['exclude'].default
+        _DEFAULT_EXCLUDES[model] = tuple(default or ())
+    return _DEFAULT_EXCLUDES[model]
+
+
+def _file_url(storage, name):
+    if not name:
+        return None
+    url = storage.url(name)
+    return url if url.startswith('http') else f"http://localhost:8000/{settings.MEDIA_URL}{name}"
+
+
+def _columns(model, plan, prefix=''):
+    """
+    Colonnes à lire via values_list() et convertisseur (index, type, stockage) par champ du plan.
+    """
+    columns = []
+    steps = []
+    for name, attname, kind in plan:
+        if kind == MANY:
+            steps.append((name, None, MANY, None))
+            continue
+        columns.append(prefix + name)
+        storage = model._meta.get_field(name).storage if kind == FILE else None
+        steps.append((name, len(columns) - 1, kind, storage))
+    return columns, steps
+
+
+def _build(row, steps, offset=0):
+    data = {}
+    for name, index, kind, storage in steps:
+        if kind == VALUE:
+            data[name] = convert_value(row[offset + index])
+        elif kind == FOREIGN_KEY:
+            data[name] = row[offset + index]
+        elif kind == FILE:
+            data[name] = _file_url(storage, row[offset + index])
+        else:
+            data[name] = None
+    return data
+
+
+def project(queryset, include_related=False, exclude=None):
+    """
+    Construit la même liste de dicts que [obj.as_dict(include_related, exclude) for obj in queryset]
+    directement depuis values_list(), sans instancier les modèles.
+    - exclude=None : exclusions par défaut de as_dict() (ex : password pour User)
+    - include_related=True : les FK sont lues par jointure dans la même requête
+    """
+    model = queryset.model
+    if exclude is None:
+        exclude = default_exclude(model)
+    columns, steps = _columns(model, get_plan(model, exclude))
+
+    related = []
+    if include_related:
+        for position, (name, index, kind, storage) in enumerate(steps):
+            if kind != FOREIGN_KEY:
+                continue
+            related_model = model._meta.get_field(name).related_model
+            rel_columns, rel_steps = _columns(related_model, get_plan(related_model, default_exclude(related_model)), prefix=name + '__')
+            related.append((position, len(columns), rel_steps))
+            columns.extend(rel_columns)
+
+    results = []
+    for row in queryset.values_list(*columns).iterator():
+        data = _build(row, steps)
+        for position, offset, rel_steps in related:
+            name, index = steps[position][0], steps[position][1]
+            if row[index] is not None:
+                data[name] = _build(row, rel_steps, offset)
+        results.append(data)
+    return results
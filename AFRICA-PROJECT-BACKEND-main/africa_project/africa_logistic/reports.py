@@ -0,0 +1,141 @@
+import hashlib
+import json
+import tempfile
+from datetime import date, timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from africa_logistic.configs import REPORT_CACHE_MINUTES, REPORT_JOB_TIMEOUT_MINUTES, REPORT_RETENTION_DAYS
+from africa_logistic.exports import ADMIN_REQUESTS_COLUMNS, REVENUE_COLUMNS, USERS_COLUMNS, write_csv
+from africa_logistic.models import ReportJob, TransportRequest, User, WalletTransaction
+
+# Paramètres acceptés par tous les rapports : bornes de date (AAAA-MM-JJ) sur created_at
+ALLOWED_PARAMS = ('date_from', 'date_to')
+
+
+def _admin_requests():
+    return TransportRequest.objects.all_with_deleted().select_related('client', 'assigned_transporter')
+
+
+def _users():
+    return User.objects.all_with_deleted()
+
+
+def _revenue():
+    return WalletTransaction.objects.all().select_related('wallet__user').order_by('-created_at')
+
+
+# type de rapport -> (queryset, colonnes, nom du fichier)
+REPORTS = {
+    'admin_requests': (_admin_requests, ADMIN_REQUESTS_COLUMNS, 'all-requests-report'),
+    'users': (_users, USERS_COLUMNS, 'all-users-report'),
+    'revenue': (_revenue, REVENUE_COLUMNS, 'revenue-report'),
+}
+
+
+def clean_params(params):
+    """
+    Valide et normalise les paramètres d'un rapport.
+    Lève ValueError si un paramètre est inconnu ou une date invalide.
+    """
+    cleaned = {}
+    for key, value in (params or {}).items():
+        if key not in ALLOWED_PARAMS:
+            raise ValueError(f"Paramètre inconnu : {key}")
+        if value in (None, ''):
+            continue
+        cleaned[key] = date.fromisoformat(str(value)).isoformat()
+    return cleaned
+
+
+def params_hash(report_type, params):
+    payload = json.dumps([report_type, params], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_queryset(report_type, params):
+    queryset = REPORTS[report_type][0]()
+    if params.get('date_from'):
+        queryset = queryset.filter(created_at__date__gte=params['date_from'])
+    if params.get('date_to'):
+        queryset = queryset.filter(created_at__date__lte=params['date_to'])
+    return queryset
+
+
+def request_report(report_type, params, user):
+    """
+    Retourne (job, reused) pour un rapport.
+    Un rapport identique terminé dans la fenêtre de fraîcheur, ou déjà en file, est réutilisé
+    au lieu d'être recalculé. Un rapport RUNNING au-delà du délai maximal n'est pas réutilisé.
+    """
+    digest = params_hash(report_type, params)
+    now = timezone.now()
+    fresh_since = now - timedelta(minutes=REPORT_CACHE_MINUTES)
+    existing = ReportJob.objects.filter(params_hash=digest).filter(
+        Q(status='PENDING')
+        | Q(status='RUNNING', started_at__gte=now - timedelta(minutes=REPORT_JOB_TIMEOUT_MINUTES))
+        | Q(status='DONE', finished_at__gte=fresh_since)
+    ).order_by('-created_at').first()
+    if existing:
+        return existing, True
+
+    job = ReportJob.objects.create(report_type=report_type, params=params, params_hash=digest, requested_by=user)
+    return job, False
+
+
+def claim_next_job():
+    """
+    Réserve le prochain rapport en attente (PENDING -> RUNNING), ou reprend un rapport RUNNING
+    abandonné (worker arrêté pendant la génération) au-delà du délai maximal.
+    skip_locked permet de lancer plusieurs workers sans qu'ils prennent le même rapport.
+    """
+    stale_before = timezone.now() - timedelta(minutes=REPORT_JOB_TIMEOUT_MINUTES)
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='PENDING') | Q(status='RUNNING', started_at__lt=stale_before)
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def run_job(job):
+    """
+    Génère le CSV du rapport dans MEDIA_ROOT/reports/ via un fichier temporaire.
+    """
+    try:
+        _, columns, filename = REPORTS[job.report_type]
+        with tempfile.TemporaryFile() as tmp:
+            job.row_count = write_csv(tmp, build_queryset(job.report_type, job.params), columns)
+            tmp.seek(0)
+            job.file.save(f"{filename}-{job.slug}.csv", File(tmp), save=False)
+        job.status = 'DONE'
+        job.error = None
+    except Exception as e:
+        job.status = 'FAILED'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'row_count', 'status', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def prune_reports(retention_days=REPORT_RETENTION_DAYS):
+    """
+    Supprime les rapports terminés (ou en échec) depuis plus de retention_days, fichiers compris.
+    Retourne le nombre de rapports supprimés.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    jobs = ReportJob.objects.all_with_deleted().filter(status__in=['DONE', 'FAILED'], finished_at__lt=cutoff)
+    pruned = 0
+    for job in jobs.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.hard_delete()
+        pruned += 1
+    return pruned
@@ -0,0 +1,91 @@
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Q
+from django.http import JsonResponse
+
+from africa_logistic.configs import BENIN_CITIES, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SEARCH_CONFIG
+
+
+def city_slug(name):
+    """'  Sèmè Kpodji ' -> 'seme-kpodji' : sans accents, minuscules, séparateurs unifiés."""
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+# Variante normalisée -> clé canonique
+_CITY_KEYS = {}
+for _canonical, _aliases in BENIN_CITIES.items():
+    for _name in (_canonical,) + tuple(_aliases):
+        _CITY_KEYS[city_slug(_name)] = city_slug(_canonical)
+KNOWN_CITY_KEYS = frozenset(_CITY_KEYS.values())
+
+
+def normalize_city(name):
+    """Clé de ville stockée dans pickup_city_key / delivery_city_key (canonique si la ville est au répertoire)."""
+    key = city_slug(name)
+    return _CITY_KEYS.get(key, key)
+
+
+def filter_city(queryset, city):
+    """
+    Filtre ?city= : recherche partielle icontains (servie par les index trigram sur UPPER(ville)).
+    Pour une ville du répertoire, l'égalité sur les clés normalisées s'y ajoute : les variantes
+    ("Kotonou", "COTONOU ") sont trouvées en plus de tout ce que trouvait icontains.
+    """
+    condition = Q(pickup_city__icontains=city) | Q(delivery_city__icontains=city)
+    key = normalize_city(city)
+    if key in KNOWN_CITY_KEYS:
+        condition |= Q(pickup_city_key=key) | Q(delivery_city_key=key)
+    return queryset.filter(condition)
+
+
+def search_vector():
+    """
+    Document plein texte d'une demande, pondéré : titre (A), villes (B), description et adresses (C).
+    L'index GIN treq_search_idx porte exactement cette expression.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('pickup_city', 'delivery_city', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('merchandise_description', 'pickup_address', 'delivery_address', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def search_requests(queryset, text):
+    """Demandes correspondant à ?q= (syntaxe websearch : mots, "expression", -exclusion), triées par pertinence."""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    vector = search_vector()
+    return (
+        queryset.annotate(document=vector)
+        .filter(document=query)
+        .annotate(rank=SearchRank(vector, query))
+        .order_by('-rank', '-created_at', '-id')
+    )
+
+
+def ranked_response(request, queryset, key, message, serialize=lambda obj: obj.as_dict(), score='rank'):
+    """
+    Résultats triés par score (pertinence, distance...) : ?limit (défaut DEFAULT_PAGE_SIZE) et ?offset.
+    Chaque objet reçoit la valeur de son annotation `score`.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.GET.get('offset', 0))
+        if limit <= 0 or offset < 0:
+            raise ValueError(limit)
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres de pagination invalides (limit ou offset).'}, status=400)
+    rows = list(queryset[offset:offset + limit + 1])
+    results = []
+    for obj in rows[:limit]:
+        data = serialize(obj)
+        data[score] = getattr(obj, score)
+        results.append(data)
+    return JsonResponse({
+        'message': message,
+        key: results,
+        'next_offset': offset + limit if len(rows) > limit else None,
+    }, status=200)
@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import models
+
+# Types de champs du plan de sérialisation
+VALUE = 0
+FOREIGN_KEY = 1
+FILE = 2
+MANY = 3
+
+_PASSTHROUGH_TYPES = frozenset([str, int, float, bool])
+_MISSING = object()
+
+_PLANS = {}
+
+
+def get_plan(model, exclude=()):
+    """
+    Plan de sérialisation d'une classe de modèle, calculé une seule fois par (modèle, exclusions) :
+    tuple de (nom, attname, type) dans l'ordre de _meta.get_fields().
+    """
+    key = (model, tuple(exclude))
+    plan = _PLANS.get(key)
+    if plan is None:
+        entries = []
+        for field in model._meta.get_fields():
+            # Les relations inverses n'ont pas d'attname et ne sont pas sérialisées
+            if not hasattr(field, "attname") or field.name in exclude:
+                continue
+            if field.is_relation and not field.many_to_many and not field.one_to_many:
+                entries.append((field.name, field.attname, FOREIGN_KEY))
+            elif field.is_relation:
+                entries.append((field.name, field.attname, MANY))
+            elif isinstance(field, (models.FileField, models.ImageField)):
+                entries.append((field.name, field.attname, FILE))
+            else:
+                entries.append((field.name, field.attname, VALUE))
+        plan = _PLANS[key] = tuple(entries)
+    return plan
+
+
+def convert_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # Les Decimal (et autres types) valent None, comme l'implémentation historique de as_dict
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return None
+
+
+def file_url(value, request=None):
+    if value and hasattr(value, "url"):
+        # Précède l'URL du serveur de façon dynamique
+        if request:
+            return request.build_absolute_uri(value.url)
+        # Construire l'URL complète avec le domaine
+        media_url = value.url if value.url.startswith('http') else f"http://localhost:8000/{settings.MEDIA_URL}{value.name}"
+        return media_url if value and value.name else None
+    return None
+
+
+def serialize_instance(obj, include_related=False, exclude=None):
+    """
+    Équivalent de BaseModel.as_dict basé sur le plan précalculé du modèle.
+    - include_related=True : les FK sont remplacées par le as_dict() de l'objet lié
+    - sinon l'id de la FK est lu directement (pas de requête sur l'objet lié)
+    """
+    data = {}
+    values = obj.__dict__
+
+    for name, attname, kind in get_plan(obj.__class__, exclude or ()):
+        if kind == VALUE:
+            value = values.get(attname, _MISSING)
+            if value is _MISSING:
+                # Champ différé (only/defer) : chargement via le descripteur
+                value = getattr(obj, attname)
+            value_type = type(value)
+            if value_type in _PASSTHROUGH_TYPES:
+                data[name] = value
+            elif value_type is datetime or value_type is date:
+                data[name] = value.isoformat()
+            else:
+                data[name] = convert_value(value)
+        elif kind == FOREIGN_KEY:
+            if include_related:
+                value = getattr(obj, name, None)
+                if hasattr(value, "as_dict"):
+                    data[name] = value.as_dict()
+                else:
+                    data[name] = value.pk if value else None
+            else:
+                data[name] = getattr(obj, attname)
+        elif kind == FILE:
+            data[name] = file_url(getattr(obj, name), getattr(obj, '_request', None))
+        else:
+            data[name] = None
+
+    return data
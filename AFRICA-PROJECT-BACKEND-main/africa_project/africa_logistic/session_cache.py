@@ -0,0 +1,53 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import SESSION_CACHE_TTL_SECONDS, SESSION_CACHE_MAX_SIZE, SESSION_SHARED_CACHE_TTL_SECONDS
+from africa_logistic.models import UserConnect
+
+SHARED_KEY_PREFIX = "africa_logistic:session:"
+
+_local_sessions = LRUCache(max_size=SESSION_CACHE_MAX_SIZE, ttl=SESSION_CACHE_TTL_SECONDS)
+
+
+def _shared_cache():
+    alias = getattr(settings, "SESSION_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def get_session_user(token):
+    """
+    Retourne l'utilisateur associé au token de session.
+    Ordre de résolution : cache mémoire, cache partagé (si configuré), base de données.
+    Lève UserConnect.DoesNotExist si le token est invalide.
+    """
+    user = _local_sessions.get(token)
+    if user is None:
+        shared = _shared_cache()
+        if shared is not None:
+            user = shared.get(SHARED_KEY_PREFIX + token)
+        if user is None:
+            user = UserConnect.objects.get_user_for_token(token)
+            if shared is not None:
+                shared.set(SHARED_KEY_PREFIX + token, user, SESSION_SHARED_CACHE_TTL_SECONDS)
+        _local_sessions.set(token, user)
+    # Copie pour que les modifications faites par une vue ne polluent pas le cache
+    return copy.copy(user)
+
+
+def invalidate_token(token):
+    _local_sessions.delete(token)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(SHARED_KEY_PREFIX + token)
+
+
+def invalidate_user(user):
+    """
+    Invalide toutes les sessions en cache d'un utilisateur
+    (déconnexion, blocage, suppression, changement de rôle...)
+    """
+    for token in UserConnect.objects.filter(user=user).values_list("slug", flat=True):
+        invalidate_token(token)
@@ -0,0 +1,32 @@
+from django.db.models import Count, Q, Sum
+
+
+def count_if(**lookups):
+    """COUNT(*) FILTER (WHERE ...) : compte conditionnel calculé dans la même requête."""
+    return Count('pk', filter=Q(**lookups))
+
+
+def sum_if(field, condition):
+    """SUM(field) FILTER (WHERE condition)"""
+    return Sum(field, filter=condition)
+
+
+def choice_counts(field, choices):
+    """Un compte conditionnel par valeur de choix (ex : un par statut)."""
+    return {f'{field}_{code}': count_if(**{field: code}) for code, _ in choices}
+
+
+def choice_breakdown(row, field, choices):
+    """Remet en forme les comptes de choice_counts() : {code: {'label', 'count'}}."""
+    return {code: {'label': str(label), 'count': row[f'{field}_{code}']} for code, label in choices}
+
+
+def compute(queryset, **metrics):
+    """
+    Calcule toutes les métriques d'un queryset en une seule requête agrégée (un seul parcours de la table).
+    metrics : {nom: Count(...) / Sum(...)}, ex : count_if(status='DELIVERED'), sum_if('estimated_price', Q(...))
+    """
+    row = queryset.aggregate(**metrics)
+    # SUM sur zéro ligne renvoie NULL
+    return {name: (0 if value is None else value) for name, value in row.items()}
+
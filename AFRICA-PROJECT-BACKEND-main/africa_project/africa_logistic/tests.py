@@ -1,3 +1,855 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import random
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from africa_logistic import eta, geofence, gt06, idempotency, kpis, ledger, matching, reports, session_cache, tracking, tracks
+from africa_logistic.configs import GEOFENCE_RADIUS_M, IDEMPOTENCY_KEY_TTL_HOURS, REPORT_JOB_TIMEOUT_MINUTES, REPORT_RETENTION_DAYS
+from africa_logistic.geo import covering_cells, distance_km, filter_near, geohash, parse_coordinates
+from africa_logistic.projections import project
+from africa_logistic.management.commands.run_tracker_server import TrackerServer
+from africa_logistic.models import (
+    CorridorSpeedProfile, KpiSnapshot, Notification, ReportJob, RequestStatusHistory, TrackerPosition, TransportRequest, TripTrack, User, UserConnect, Vehicle,
+    Wallet, WalletCheckpoint, WalletTransaction, assign_slugs,
+)
+from africa_logistic.search import filter_city, normalize_city
+
+API = '/api/africa_logistic/'
+
+
+def clear_process_caches():
+    """Caches mémoire du processus : les ids réutilisés d'un test à l'autre ne doivent rien y retrouver."""
+    session_cache._local_sessions.clear()
+    idempotency._hot_responses.clear()
+    matching._capabilities.clear()
+    tracking._last_positions.clear()
+    tracks._simplified_archives.clear()
+    eta._estimates.clear()
+    eta._profiles = None
+    geofence._index = None
+
+
+class ApiTestCase(TestCase):
+    """Utilisateurs, demandes et appels authentifiés (Bearer = slug de UserConnect)."""
+
+    def setUp(self):
+        clear_process_caches()
+        self.client = Client(HTTP_HOST='localhost')
+
+    def make_user(self, email, role='PME', **kwargs):
+        return User.objects.create(email=email, role=role, is_verified=True, is_approved=True, **kwargs)
+
+    def auth(self, user):
+        token = UserConnect.objects.create(user=user).slug
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def make_request(self, client, **kwargs):
+        fields = dict(
+            client=client, title='Sacs de maïs', merchandise_description='Maïs', weight=Decimal('100'), volume=Decimal('1'),
+            pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2', delivery_city='Parakou',
+            preferred_pickup_date=timezone.now() + timedelta(days=1), recipient_name='Koffi', recipient_phone='+22990000000',
+        )
+        fields.update(kwargs)
+        return TransportRequest.objects.create(**fields)
+
+    def get(self, path, user, **kwargs):
+        return self.client.get(API + path, **kwargs, **self.auth(user))
+
+    def post(self, path, user, data, **kwargs):
+        return self.client.post(API + path, json.dumps(data), content_type='application/json', **kwargs, **self.auth(user))
+
+
+# ==================== RECHERCHE PAR VILLE ====================
+
+class CityNormalizationTests(SimpleTestCase):
+    def test_aliases_and_accents_map_to_canonical_key(self):
+        self.assertEqual(normalize_city('  PORTO NOVO '), 'porto-novo')
+        self.assertEqual(normalize_city('ctn'), 'cotonou')
+        self.assertEqual(normalize_city('Sèmè Kpodji'), 'seme-kpodji')
+
+
+class CityFilterTests(ApiTestCase):
+    def test_known_city_matches_aliases_and_partial_names(self):
+        client = self.make_user('client@example.com')
+        exact = self.make_request(client, pickup_city='Cotonou')
+        alias = self.make_request(client, pickup_city='CTN')
+        district = self.make_request(client, pickup_city='Cotonou, Akpakpa')
+        other = self.make_request(client, pickup_city='Bohicon', delivery_city='Djougou')
+
+        found = set(filter_city(TransportRequest.objects.all(), 'Cotonou'))
+        self.assertEqual(found, {exact, alias, district})
+        self.assertNotIn(other, found)
+
+    def test_unknown_city_falls_back_to_icontains(self):
+        client = self.make_user('client@example.com')
+        match = self.make_request(client, pickup_city='Village de Zinvié')
+        self.make_request(client)
+        self.assertEqual(list(filter_city(TransportRequest.objects.all(), 'zinvi')), [match])
+
+
+# ==================== PROXIMITÉ ====================
+
+class GeohashTests(SimpleTestCase):
+    def test_reference_geohash_and_coordinates_parsing(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(parse_coordinates(' 6.3654 ; -2.4183 '), (6.3654, -2.4183))
+        for text in ('', 'Cotonou', '91,2', '6.3,181'):
+            self.assertIsNone(parse_coordinates(text), text)
+
+    def test_covering_cells_contain_every_point_of_the_circle(self):
+        rng = random.Random(0)
+        for lat, lon, radius_km in ((6.3654, 2.4183, 25), (0.001, -0.001, 5), (9.3372, 2.6303, 300), (12.0, 1.0, 0.5)):
+            cells = covering_cells(lat, lon, radius_km)
+            self.assertLessEqual(len(cells), 4)
+            for _ in range(500):
+                # Point aléatoire dans le cercle (approximation locale en degrés)
+                bearing, distance = rng.uniform(0, 2 * math.pi), radius_km * rng.random()
+                point_lat = lat + distance / 111.195 * math.cos(bearing)
+                point_lon = lon + distance / (111.195 * math.cos(math.radians(point_lat))) * math.sin(bearing)
+                if distance_km(lat, lon, point_lat, point_lon) > radius_km:
+                    continue
+                self.assertTrue(any(geohash(point_lat, point_lon).startswith(cell) for cell in cells), (lat, lon, point_lat, point_lon))
+
+
+class NearFilterTests(ApiTestCase):
+    def test_matches_a_full_distance_scan(self):
+        rng = random.Random(1)
+        customer = self.make_user('client@example.com')
+        for _ in range(200):
+            self.make_request(customer, pickup_coordinates=f'{rng.uniform(6.0, 7.0):.5f},{rng.uniform(1.9, 2.9):.5f}')
+        self.make_request(customer)  # sans coordonnées
+        center, radius_km = (6.3654, 2.4183), 20
+        expected = sorted(
+            (distance_km(*center, r.pickup_lat, r.pickup_lon), r.pk)
+            for r in TransportRequest.objects.exclude(pickup_lat=None) if distance_km(*center, r.pickup_lat, r.pickup_lon) <= radius_km
+        )
+        found = filter_near(TransportRequest.objects.all(), *center, radius_km)
+        self.assertGreater(len(expected), 5)
+        self.assertEqual([r.pk for r in found], [pk for _, pk in expected])
+        for (distance, _), r in zip(expected, found):
+            self.assertAlmostEqual(r.distance_km, distance, places=6)
+
+
+# ==================== PROJECTIONS ====================
+
+class ProjectionParityTests(ApiTestCase):
+    """project() doit produire exactement [obj.as_dict(...) for obj in queryset]."""
+
+    def setUp(self):
+        super().setUp()
+        admin = self.make_user('admin@example.com', role='ADMIN')
+        self.transporter = self.make_user(
+            'transporteur@example.com', role='TRANSPORTEUR', firstname='Koffi', photo='users_photo/koffi.jpg',
+            approved_by=admin, approved_at=timezone.now(),
+        )
+        customer = self.make_user('client@example.com')
+        Wallet.objects.create(user=customer, balance=Decimal('1500.50'))
+        Wallet.objects.create(user=self.transporter)
+        Vehicle.objects.create(
+            owner=self.transporter, brand='Toyota', model='Dyna', plate_number='AB-1234-RB', capacity_kg=Decimal('3500.00'),
+            insurance_expiry=timezone.now().date(), photo='vehicles/dyna.jpg',
+        )
+        Vehicle.objects.create(owner=self.transporter, brand='Isuzu', model='NPR', plate_number='CD-5678-RB', capacity_kg=Decimal('5000'))
+        self.make_request(customer, assigned_transporter=self.transporter, estimated_price=Decimal('25000'), pickup_lat=6.37, pickup_lon=2.39)
+
+    def assertParity(self, queryset, **kwargs):
+        self.assertEqual(project(queryset, **kwargs), [obj.as_dict(**kwargs) for obj in queryset])
+
+    def test_default_excludes_and_value_conversions(self):
+        users = User.objects.all().order_by('id')
+        self.assertParity(users)
+        self.assertNotIn('password', project(users)[0])
+        self.assertParity(Vehicle.objects.all().order_by('id'))
+        self.assertParity(TransportRequest.objects.all())
+
+    def test_related_objects_and_explicit_exclude(self):
+        self.assertParity(Wallet.objects.all().order_by('id'), include_related=True)
+        self.assertParity(Vehicle.objects.all().order_by('id'), include_related=True)
+        self.assertParity(TransportRequest.objects.all(), include_related=True)
+        self.assertParity(User.objects.all().order_by('id'), exclude=['email', 'photo'])
+
+
+# ==================== EXPORTS CSV ====================
+
+class ExportQueryCountTests(ApiTestCase):
+    """Le nombre de requêtes d'un export ne dépend pas du nombre de lignes (pas de N+1 sur les utilisateurs liés)."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user('admin@example.com', role='ADMIN')
+        self.transporter = self.make_user('transporteur@example.com', role='TRANSPORTEUR')
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            customer = self.make_user(f'client-{self.rows}@example.com', firstname=f'Client {self.rows}')
+            self.make_request(customer, assigned_transporter=self.transporter)
+            ledger.credit(customer, Decimal('1000'))
+
+    def count_queries(self, path, user):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(path, user)
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), content.count(b'\n') - 1
+
+    def test_exports_run_a_constant_number_of_queries(self):
+        exports = [
+            ('reports/transporter/my-missions.csv', self.transporter),
+            ('reports/admin/requests.csv', self.admin),
+            ('reports/admin/revenue.csv', self.admin),
+            ('reports/admin/geographic.csv', self.admin),
+        ]
+        self.add_rows(2)
+        for path, user in exports:
+            self.count_queries(path, user)  # authentification mise en cache
+        counts = [self.count_queries(path, user) for path, user in exports]
+        self.add_rows(5)
+        for (path, user), (queries, rows) in zip(exports, counts):
+            with self.subTest(path):
+                self.assertEqual(self.count_queries(path, user), (queries, rows + 5))
+
+    def test_wallet_transactions_list_runs_a_constant_number_of_queries(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get('wallet/transactions/', self.transporter)
+            return len(queries), len(response.json()['transactions'])
+
+        ledger.credit(self.transporter, Decimal('1000'))
+        count()
+        queries, rows = count()
+        for _ in range(5):
+            ledger.credit(self.transporter, Decimal('1000'))
+        self.assertEqual(count(), (queries, rows + 5))
+
+
+# ==================== PORTEFEUILLE ====================
+
+class LedgerTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('client@example.com')
+
+    def test_movements_update_balance_history_and_checkpoint(self):
+        ledger.credit(self.user, Decimal('5000'))
+        wallet, movement, created = ledger.debit(self.user, Decimal('1200'))
+        self.assertTrue(created)
+        self.assertEqual(wallet.balance, Decimal('3800'))
+        self.assertEqual(movement.balance_after, Decimal('3800'))
+        self.assertEqual(ledger.ledger_balance(wallet), wallet.balance)
+        checkpoint = WalletCheckpoint.objects.get(wallet=wallet)
+        self.assertEqual((checkpoint.closing_balance, checkpoint.credits, checkpoint.debits, checkpoint.tx_count), (Decimal('3800'), Decimal('5000'), Decimal('1200'), 2))
+        self.assertEqual(ledger.find_discrepancies(), [])
+
+    def test_debit_beyond_balance_is_refused(self):
+        ledger.credit(self.user, Decimal('100'))
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.debit(self.user, Decimal('101'))
+        self.assertEqual(Wallet.objects.get(user=self.user).balance, Decimal('100'))
+
+    def test_same_reference_is_posted_once(self):
+        ledger.credit(self.user, Decimal('100'), reference='paiement-1')
+        _, _, created = ledger.credit(self.user, Decimal('100'), reference='paiement-1')
+        self.assertFalse(created)
+        self.assertEqual(Wallet.objects.get(user=self.user).balance, Decimal('100'))
+
+    def test_non_positive_amount_is_refused(self):
+        with self.assertRaises(ValueError):
+            ledger.credit(self.user, Decimal('0'))
+
+
+class RequestPaymentTests(ApiTestCase):
+    def create(self, user, price):
+        return self.post('demandes/create/', user, {
+            'title': 'Sacs de maïs', 'merchandise_description': 'Maïs', 'weight': '100', 'volume': '1',
+            'pickup_address': 'Rue 1', 'pickup_city': 'Cotonou', 'delivery_address': 'Rue 2', 'delivery_city': 'Parakou',
+            'preferred_pickup_date': (timezone.now() + timedelta(days=2)).isoformat(),
+            'recipient_name': 'Koffi', 'recipient_phone': '+22990000000', 'estimated_price': price,
+        })
+
+    def test_price_is_debited_from_wallet(self):
+        user = self.make_user('client@example.com')
+        ledger.credit(user, Decimal('5000'))
+        response = self.create(user, '3000')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Wallet.objects.get(user=user).balance, Decimal('2000'))
+        self.assertEqual(WalletTransaction.objects.get(tx_type='DEBIT').reference, response.json()['transport_request']['slug'])
+
+    def test_zero_price_creates_request_without_movement(self):
+        user = self.make_user('client@example.com')
+        self.assertEqual(self.create(user, '0').status_code, 201)
+        self.assertFalse(WalletTransaction.objects.exists())
+
+    def test_insufficient_balance_is_payment_required(self):
+        user = self.make_user('client@example.com')
+        self.assertEqual(self.create(user, '3000').status_code, 402)
+        self.assertFalse(TransportRequest.objects.exists())
+
+
+# ==================== KPI DU DASHBOARD ====================
+
+class KpiRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user('admin@example.com', role='ADMIN')
+        self.data_admin = self.make_user('data@example.com', role='DATA ADMIN')
+        self.customer = self.make_user('client@example.com')
+        ledger.credit(self.customer, Decimal('5000'))
+        self.make_request(self.customer, status='DELIVERED', estimated_price=Decimal('1200'))
+        self.transport_request = self.make_request(self.customer)
+        kpis.rebuild()
+
+    def assertRollupMatchesSources(self):
+        by_role = {}
+        for (day, role, status, city), values in kpis.rollup_buckets(TransportRequest.objects.all(), Wallet.objects.all()).items():
+            totals = by_role.setdefault(role, [0, 0, 0])
+            totals[0] += values['request_count']
+            totals[1] += values['revenue']
+            totals[2] += values['balance']
+        rollup = {
+            role: [n, revenue, balance]
+            for role, n, revenue, balance in KpiSnapshot.objects.values_list('role').annotate(Sum('request_count'), Sum('revenue'), Sum('balance'))
+            if n or revenue or balance
+        }
+        self.assertEqual(rollup, by_role)
+
+    def test_role_change_moves_balance_and_requests(self):
+        response = self.client.patch(
+            API + f'data-admin/user/{self.customer.slug}/alter/', json.dumps({'role': 'TRANSPORTEUR'}),
+            content_type='application/json', **self.auth(self.data_admin),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRollupMatchesSources()
+
+        ledger.debit(User.objects.get(pk=self.customer.pk), Decimal('1000'))
+        result = self.get('admin/kpis/', self.admin).json()
+        self.assertEqual((result['total_client_balance'], result['total_transporter_balance']), (0, 4000))
+        self.assertEqual(result['total_requests'], 2)
+        self.assertRollupMatchesSources()
+
+    def test_failed_status_change_leaves_request_and_rollup_untouched(self):
+        url = API + f'demandes/{self.transport_request.slug}/annuler/'
+        with mock.patch.object(RequestStatusHistory.objects, 'create', side_effect=RuntimeError('historique')):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(url, json.dumps({}), content_type='application/json', **self.auth(self.customer))
+        self.transport_request.refresh_from_db()
+        self.assertEqual(self.transport_request.status, 'PENDING')
+        self.assertRollupMatchesSources()
+
+
+# ==================== IDEMPOTENCE ====================
+
+class IdempotencyTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('client@example.com')
+
+    def topup(self, key, amount=5000, **data):
+        return self.post('wallet/topup/', self.user, dict(amount=amount, **data), HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_resend_replays_first_response_without_second_credit(self):
+        first = self.topup('cle-1')
+        second = self.topup('cle-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(WalletTransaction.objects.filter(wallet__user=self.user).count(), 1)
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.topup('cle-1')
+        self.assertEqual(self.topup('cle-1', amount=9000).status_code, 422)
+
+    def test_long_key_becomes_fixed_length_reference(self):
+        key = 'k' * 200
+        self.assertEqual(self.topup(key).status_code, 200)
+        transaction = WalletTransaction.objects.get(wallet__user=self.user)
+        self.assertEqual(transaction.reference, idempotency.reference(key))
+        self.assertLessEqual(len(transaction.reference), 100)
+
+    def test_reference_longer_than_column_is_rejected(self):
+        self.assertEqual(self.topup('cle-1', reference='r' * 101).status_code, 400)
+
+    def test_expired_key_is_not_replayed_from_process_cache(self):
+        self.topup('cle-1')
+        later = timezone.now() + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS + 1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            response = self.topup('cle-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        # La référence dérivée de la clé évite tout de même un second crédit
+        self.assertEqual(WalletTransaction.objects.filter(wallet__user=self.user).count(), 1)
+
+
+# ==================== RAPPORTS ====================
+
+class ReportJobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.admin = self.make_user('admin@example.com', role='ADMIN')
+
+    def running_since(self, minutes):
+        job, reused = reports.request_report('users', {}, self.admin)
+        ReportJob.objects.filter(pk=job.pk).update(status='RUNNING', started_at=timezone.now() - timedelta(minutes=minutes))
+        return job
+
+    def test_running_job_is_reused_until_timeout(self):
+        job = self.running_since(1)
+        self.assertEqual(reports.request_report('users', {}, self.admin), (job, True))
+
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=REPORT_JOB_TIMEOUT_MINUTES + 1))
+        new_job, reused = reports.request_report('users', {}, self.admin)
+        self.assertFalse(reused)
+        self.assertNotEqual(new_job.pk, job.pk)
+
+    def test_worker_reclaims_abandoned_jobs_only(self):
+        self.running_since(1)
+        self.assertIsNone(reports.claim_next_job())
+
+        ReportJob.objects.update(started_at=timezone.now() - timedelta(minutes=REPORT_JOB_TIMEOUT_MINUTES + 1))
+        job = reports.run_job(reports.claim_next_job())
+        self.assertEqual(job.status, 'DONE')
+        self.assertGreaterEqual(job.row_count, 1)
+
+    def test_prune_removes_old_jobs_and_their_files(self):
+        reports.request_report('users', {}, self.admin)
+        old = reports.run_job(reports.claim_next_job())
+        storage, name = old.file.storage, old.file.name
+        ReportJob.objects.filter(pk=old.pk).update(finished_at=timezone.now() - timedelta(days=REPORT_RETENTION_DAYS + 1))
+        recent, _ = reports.request_report('revenue', {}, self.admin)
+        reports.run_job(reports.claim_next_job())
+
+        self.assertEqual(reports.prune_reports(), 1)
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(list(ReportJob.objects.all_with_deleted()), [recent])
+
+
+# ==================== SUIVI GPS ====================
+
+IMEI = '359710049000001'
+
+
+class FixParsingTests(SimpleTestCase):
+    def setUp(self):
+        self.latest = timezone.now() + timedelta(minutes=5)
+
+    def test_epoch_and_iso_timestamps(self):
+        ts, lat, lon, speed, course = tracking.parse_fix({'ts': 1700000000, 'lat': '6.37', 'lon': 2.39, 'speed': 42}, self.latest)
+        self.assertEqual((ts.timestamp(), lat, lon, speed, course), (1700000000, 6.37, 2.39, 42.0, None))
+        self.assertEqual(tracking.parse_fix({'ts': '2024-01-01T10:00:00', 'lat': 0, 'lon': 0}, self.latest)[0].utcoffset(), timedelta(0))
+
+    def test_invalid_fixes_are_rejected(self):
+        for raw in ({'ts': 1700000000, 'lat': 91, 'lon': 0}, {'ts': True, 'lat': 0, 'lon': 0}, {'lat': 0, 'lon': 0}, {'ts': 'hier', 'lat': 0, 'lon': 0}):
+            self.assertIsNone(tracking.parse_fix(raw, self.latest), raw)
+        future = (timezone.now() + timedelta(hours=1)).timestamp()
+        self.assertIsNone(tracking.parse_fix({'ts': future, 'lat': 0, 'lon': 0}, self.latest))
+
+
+@override_settings(TRACKER_INGEST_TOKEN='secret-tracker')
+class TrackerIngestTests(ApiTestCase):
+    def ingest(self, body, token='secret-tracker'):
+        return self.client.post(API + 'tracking/positions/', json.dumps(body), content_type='application/json', HTTP_X_TRACKER_TOKEN=token)
+
+    def test_valid_fixes_are_stored_and_invalid_ones_counted(self):
+        now = timezone.now()
+        response = self.ingest({'imei': IMEI, 'fixes': [
+            {'ts': now.isoformat(), 'lat': 6.37, 'lon': 2.39},
+            {'ts': (now - timedelta(seconds=10)).isoformat(), 'lat': 6.36, 'lon': 2.38},
+            {'ts': now.isoformat(), 'lat': 200, 'lon': 2.39},
+        ]})
+        self.assertEqual(response.json()['accepted'], 2)
+        self.assertEqual(response.json()['rejected'], 1)
+        self.assertEqual(TrackerPosition.objects.filter(imei=IMEI).count(), 2)
+        self.assertEqual(tracking.last_position(IMEI).lat, 6.37)
+
+    def test_token_and_body_are_validated(self):
+        self.assertEqual(self.ingest({'imei': IMEI, 'fixes': []}, token='faux').status_code, 401)
+        self.assertEqual(self.ingest([]).status_code, 400)
+        self.assertEqual(self.ingest({'imei': 'abc', 'fixes': []}).status_code, 400)
+        self.assertEqual(self.ingest({'imei': IMEI, 'fixes': [{}] * 5001}).status_code, 413)
+
+
+class RequestPositionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('client@example.com')
+        self.transport_request = self.make_request(self.customer, tracker_imei=IMEI)
+
+    def test_position_of_a_previous_trip_is_not_shown(self):
+        tracking.store_positions([(IMEI, timezone.now() - timedelta(days=2), 9.33, 2.63, 0.0, 0.0)])
+        self.assertEqual(self.get(f'demandes/{self.transport_request.slug}/position/', self.customer).status_code, 404)
+
+        tracking.store_positions([(IMEI, timezone.now(), 6.37, 2.39, 40.0, 90.0)])
+        response = self.get(f'demandes/{self.transport_request.slug}/position/', self.customer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['position']['lat'], 6.37)
+
+    def test_only_parties_of_the_request_see_the_position(self):
+        tracking.store_positions([(IMEI, timezone.now(), 6.37, 2.39, 40.0, 90.0)])
+        stranger = self.make_user('autre@example.com')
+        self.assertEqual(self.get(f'demandes/{self.transport_request.slug}/position/', stranger).status_code, 403)
+
+
+class Gt06CodecTests(SimpleTestCase):
+    def test_crc_and_login_reply_match_the_protocol_document(self):
+        self.assertEqual(gt06.crc_itu(b'123456789'), 0x906E)
+        login = bytes.fromhex('78780d01012345678901234500018cdd0d0a')
+        frame, = gt06.FrameDecoder().feed(login)
+        self.assertEqual(gt06.parse_login(frame.content), '123456789012345')
+        self.assertEqual(gt06.encode_login('123456789012345', 1), login)
+        self.assertEqual(gt06.response(frame).hex(), '787805010001d9dc0d0a')
+
+    def test_location_roundtrip(self):
+        ts = datetime(2024, 3, 1, 10, 30, 15, tzinfo=dt_timezone.utc)
+        frame, = gt06.FrameDecoder().feed(gt06.encode_location(ts, 6.3703, -2.3912, 54, 270, 7))
+        self.assertEqual((frame.protocol, frame.serial), (gt06.LOCATION, 7))
+        parsed_ts, lat, lon, speed, course = gt06.parse_location(frame.content)
+        self.assertEqual((parsed_ts, speed, course), (ts, 54.0, 270.0))
+        self.assertAlmostEqual(lat, 6.3703, places=5)
+        self.assertAlmostEqual(lon, -2.3912, places=5)
+
+    def test_decoder_handles_split_frames_noise_and_bad_crc(self):
+        decoder = gt06.FrameDecoder()
+        heartbeat = gt06.encode_heartbeat(3)
+        corrupted = bytearray(gt06.encode_heartbeat(4))
+        corrupted[-3] ^= 0xFF
+        stream = b'\x00\xff' + heartbeat + bytes(corrupted) + gt06.encode_heartbeat(5)
+        frames = decoder.feed(stream[:7]) + decoder.feed(stream[7:])
+        self.assertEqual([frame.serial for frame in frames], [3, 5])
+        self.assertEqual(decoder.errors, 1)
+
+
+class FakeReader:
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    async def read(self, size):
+        return self.chunks.pop(0) if self.chunks else b''
+
+
+class FakeWriter:
+    def __init__(self):
+        self.sent = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.sent += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TrackerServerTests(ApiTestCase):
+    def session(self, allowed, *chunks):
+        """Rejoue une connexion ; retourne (réponses, positions mises en file, serveur)."""
+        async def run():
+            server = TrackerServer(io.StringIO(), io.StringIO(), batch_size=10, queue_size=10, idle_seconds=5)
+            server.allowed = frozenset(allowed)
+            writer = FakeWriter()
+            await server.handle(FakeReader(*chunks), writer)
+            self.assertTrue(writer.closed)
+            queued = [server.queue.get_nowait() for _ in range(server.queue.qsize())]
+            server.executor.shutdown()
+            return gt06.FrameDecoder().feed(bytes(writer.sent)), queued, server
+        return asyncio.run(run())
+
+    def test_active_requests_define_the_allowlist(self):
+        customer = self.make_user('client@example.com')
+        self.make_request(customer, tracker_imei=IMEI, status='IN_PROGRESS')
+        self.make_request(customer, tracker_imei='359710049000002', status='DELIVERED')
+        self.make_request(customer, tracker_imei='')
+        self.assertEqual(tracking.active_tracker_imeis(), {IMEI})
+
+    def test_allowlisted_imei_is_acknowledged_and_positions_queued(self):
+        ts = timezone.now().replace(microsecond=0)
+        replies, queued, server = self.session(
+            {IMEI}, gt06.encode_login(IMEI, 1) + gt06.encode_location(ts, 6.37, 2.39, 40, 90, 2),
+        )
+        self.assertEqual([frame.serial for frame in replies], [1, 2])
+        self.assertEqual(queued[0][:2], (IMEI, ts))
+        self.assertEqual(server.rejected, 0)
+
+    def test_unknown_or_malformed_imei_is_disconnected_without_reply(self):
+        location = gt06.encode_location(timezone.now(), 6.37, 2.39, 40, 90, 2)
+        for login in (gt06.encode_login('359710049000009', 1), gt06.encode_frame(gt06.LOGIN, bytes.fromhex('0abcdef012345678'), 1)):
+            replies, queued, server = self.session({IMEI}, login + location)
+            self.assertEqual((replies, queued, server.rejected), ([], [], 1))
+
+    def test_frames_before_login_close_the_connection(self):
+        replies, queued, server = self.session({IMEI}, gt06.encode_heartbeat(1) + gt06.encode_login(IMEI, 2))
+        self.assertEqual((replies, queued), ([], []))
+
+
+# ==================== ZONES DE COLLECTE / LIVRAISON ====================
+
+class FenceIndexTests(SimpleTestCase):
+    def offset(self, lat, lon, meters_north):
+        return lat + meters_north / geofence.METERS_PER_DEGREE, lon
+
+    def test_consecutive_fixes_confirm_once(self):
+        index = geofence.FenceIndex({1: geofence.Fence(1, IMEI, 'ASSIGNED', 6.3703, 2.3912)})
+        inside = self.offset(6.3703, 2.3912, GEOFENCE_RADIUS_M - 50)
+        outside = self.offset(6.3703, 2.3912, GEOFENCE_RADIUS_M + 50)
+        self.assertEqual(index.evaluate(IMEI, *inside), [])
+        self.assertEqual(index.evaluate(IMEI, *outside), [])
+        self.assertEqual(index.evaluate(IMEI, *inside), [])
+        self.assertEqual([fence.request_id for fence in index.evaluate(IMEI, *inside)], [1])
+        self.assertEqual(index.evaluate(IMEI, *inside), [])
+        self.assertEqual(index.evaluate('359710049000002', *inside), [])
+
+    def test_delivery_fence_is_armed_after_leaving_it(self):
+        index = geofence.FenceIndex({1: geofence.Fence(1, IMEI, 'IN_PROGRESS', 6.3703, 2.3912)})
+        for _ in range(3):
+            self.assertEqual(index.evaluate(IMEI, 6.3703, 2.3912), [])
+        index.evaluate(IMEI, *self.offset(6.3703, 2.3912, 5000))
+        index.evaluate(IMEI, 6.3703, 2.3912)
+        self.assertEqual(len(index.evaluate(IMEI, 6.3703, 2.3912)), 1)
+
+    def test_fix_in_a_neighbouring_cell_still_matches(self):
+        # Zone au bord d'une cellule de la grille : une position dans la cellule voisine doit être évaluée
+        index = geofence.FenceIndex({1: geofence.Fence(1, IMEI, 'ASSIGNED', 6.3699, 2.3999)})
+        point = self.offset(6.3699, 2.4003, 200)
+        index.evaluate(IMEI, *point)
+        self.assertEqual(len(index.evaluate(IMEI, *point)), 1)
+
+
+class GeofenceTransitionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('client@example.com')
+        self.driver = self.make_user('transporteur@example.com', role='TRANSPORTEUR')
+        self.transport_request = self.make_request(
+            self.customer, status='ASSIGNED', assigned_transporter=self.driver, tracker_imei=IMEI,
+            pickup_coordinates='6.3703,2.3912', delivery_coordinates='9.3372,2.6303',
+        )
+        self.now = timezone.now() - timedelta(minutes=10)
+
+    def fixes(self, lat, lon, count):
+        rows = []
+        for _ in range(count):
+            self.now += timedelta(seconds=10)
+            rows.append((IMEI, self.now, lat, lon, 30.0, 0.0))
+        return tracking.store_positions(rows)
+
+    def test_pickup_then_delivery_advance_the_request(self):
+        self.assertEqual(self.fixes(6.3703, 2.3912, 2), [(self.transport_request.id, 'ASSIGNED', 'IN_PROGRESS')])
+        self.fixes(8.0, 2.5, 1)
+        self.assertEqual(self.fixes(9.3372, 2.6303, 2), [(self.transport_request.id, 'IN_PROGRESS', 'DELIVERED')])
+
+        self.transport_request.refresh_from_db()
+        self.assertEqual(self.transport_request.status, 'DELIVERED')
+        history = RequestStatusHistory.objects.filter(transport_request=self.transport_request).order_by('created_at')
+        self.assertEqual([(h.new_status, h.changed_by_id) for h in history], [('IN_PROGRESS', self.driver.id), ('DELIVERED', self.driver.id)])
+
+    def test_status_changed_meanwhile_is_not_overwritten(self):
+        self.fixes(8.0, 2.5, 1)  # index chargé avec la zone de collecte
+        TransportRequest.objects.filter(pk=self.transport_request.pk).update(status='CANCELLED')
+        self.assertEqual(self.fixes(6.3703, 2.3912, 2), [])
+        self.transport_request.refresh_from_db()
+        self.assertEqual(self.transport_request.status, 'CANCELLED')
+
+
+# ==================== TRACES DE TRAJET ====================
+
+class TrackEncodingTests(SimpleTestCase):
+    def test_encode_decode_roundtrip(self):
+        rng = random.Random(0)
+        points, ts = [], 1700000000
+        lat, lon = -6.2, 179.9
+        for _ in range(1000):
+            ts += rng.randint(0, 30)
+            lat, lon = lat + rng.uniform(-0.01, 0.01), lon + rng.uniform(-0.01, 0.01)
+            points.append((lat, lon, ts))
+        decoded = tracks.decode_track(tracks.encode_track(points))
+        self.assertEqual(len(decoded), len(points))
+        for (lat, lon, ts), (decoded_lat, decoded_lon, decoded_ts) in zip(points, decoded):
+            self.assertEqual(decoded_ts, ts)
+            self.assertAlmostEqual(decoded_lat, lat, delta=0.5 / tracks.COORDINATE_SCALE)
+            self.assertAlmostEqual(decoded_lon, lon, delta=0.5 / tracks.COORDINATE_SCALE)
+        self.assertEqual(tracks.decode_track(tracks.encode_track([])), [])
+
+    def test_simplify_keeps_ends_and_corners_only(self):
+        step = 0.0001  # ~11 m
+        line = [(6.0 + i * step, 2.0, i) for i in range(50)]
+        self.assertEqual(tracks.simplify(line, 5), [line[0], line[-1]])
+
+        corner = line + [(line[-1][0], 2.0 + i * step, 50 + i) for i in range(1, 50)]
+        self.assertEqual(tracks.simplify(corner, 5), [corner[0], line[-1], corner[-1]])
+
+        # Dérive GPS de 1 m autour d'un point : sous la tolérance, ignorée
+        noisy = [(6.0 + i * step + (0.000009 if i % 2 else 0), 2.0, i) for i in range(50)]
+        self.assertEqual(len(tracks.simplify(noisy, 5)), 2)
+        self.assertEqual(tracks.simplify(noisy, 0), noisy)
+
+
+class TripTrackTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('client@example.com')
+        self.transport_request = self.make_request(self.customer, status='DELIVERED', tracker_imei=IMEI)
+        self.started = timezone.now() - timedelta(hours=2)
+        for status, moment in (('IN_PROGRESS', self.started), ('DELIVERED', self.started + timedelta(hours=1))):
+            entry = RequestStatusHistory.objects.create(transport_request=self.transport_request, old_status='ASSIGNED', new_status=status, changed_by=self.customer)
+            RequestStatusHistory.objects.filter(pk=entry.pk).update(created_at=moment)
+
+    def test_archive_keeps_the_trip_window_only(self):
+        rows = [(IMEI, self.started + timedelta(seconds=10 * i), 6.37 + 0.001 * i, 2.39, 40.0, 0.0) for i in range(360)]
+        rows.append((IMEI, self.started - timedelta(minutes=5), 9.33, 2.63, 0.0, 0.0))  # trajet précédent
+        rows.append((IMEI, self.started + timedelta(hours=2), 9.33, 2.63, 0.0, 0.0))  # trajet suivant
+        tracking.store_positions(rows)
+
+        archive = tracks.archive_trip(self.transport_request.id)
+        self.assertEqual((archive.raw_point_count, archive.point_count), (360, 2))
+        self.assertAlmostEqual(archive.distance_km, distance_km(6.37, 2.39, 6.37 + 0.359, 2.39), places=3)
+
+        response = self.get(f'demandes/{self.transport_request.slug}/track/', self.customer).json()
+        self.assertEqual((response['source'], response['raw_count'], response['count']), ('archive', 360, 2))
+        self.assertEqual(response['points'][0], [6.37, 2.39, int(rows[0][1].timestamp())])
+
+    def test_without_positions_nothing_is_archived(self):
+        self.assertIsNone(tracks.archive_trip(self.transport_request.id))
+        self.assertFalse(TripTrack.objects.exists())
+
+
+# ==================== ESTIMATION D'ARRIVÉE ====================
+
+COTONOU = '6.3703,2.3912'
+PARAKOU = '9.3372,2.6303'
+
+
+class EtaTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = self.make_user('client@example.com')
+        self.driver = self.make_user('chauffeur@example.com', role='TRANSPORTEUR')
+
+    def history(self, transport_request, status, moment):
+        entry = RequestStatusHistory.objects.create(transport_request=transport_request, old_status='ASSIGNED', new_status=status, changed_by=self.driver)
+        RequestStatusHistory.objects.filter(pk=entry.pk).update(created_at=moment)
+
+    def delivered_trip(self, hours):
+        transport_request = self.make_request(self.customer, status='DELIVERED', assigned_transporter=self.driver, pickup_coordinates=COTONOU, delivery_coordinates=PARAKOU)
+        delivered_at = timezone.now() - timedelta(days=1)
+        self.history(transport_request, 'IN_PROGRESS', delivered_at - timedelta(hours=hours))
+        self.history(transport_request, 'DELIVERED', delivered_at)
+
+    def in_progress(self):
+        transport_request = self.make_request(self.customer, status='IN_PROGRESS', assigned_transporter=self.driver, tracker_imei=IMEI, pickup_coordinates=COTONOU, delivery_coordinates=PARAKOU)
+        self.history(transport_request, 'IN_PROGRESS', timezone.now() - timedelta(minutes=30))
+        return transport_request
+
+    def test_profiles_keep_plausible_trips_per_corridor(self):
+        for hours in (5, 6, 7, 8, 9):
+            self.delivered_trip(hours)
+        self.delivered_trip(0.01)  # livraison saisie par erreur : vitesse impossible
+        self.assertEqual(eta.compute_profiles(), 2)
+        corridor = CorridorSpeedProfile.objects.get(pickup_city_key='cotonou', delivery_city_key='parakou')
+        self.assertEqual(corridor.trip_count, 5)
+        self.assertAlmostEqual(corridor.speed_kmh, eta.distance_km(6.3703, 2.3912, 9.3372, 2.6303) / 7, places=3)
+        self.assertLess(corridor.slow_speed_kmh, corridor.speed_kmh)
+        self.assertEqual(eta.corridor_speed('kandi', 'natitingou')[3], 'global')
+
+    def test_fix_from_a_previous_trip_falls_back_to_pickup(self):
+        transport_request = self.in_progress()
+        tracking.store_positions([(IMEI, timezone.now() - timedelta(days=3), 9.3372, 2.6303, 0.0, 0.0)])
+        result = self.get(f'demandes/{transport_request.slug}/eta/', self.customer).json()
+        self.assertEqual(result['source'], 'pickup')
+        self.assertGreater(result['remaining_minutes'], 60)
+
+    def test_current_fix_gives_remaining_distance(self):
+        transport_request = self.in_progress()
+        tracking.store_positions([(IMEI, timezone.now(), 8.0, 2.5, 60.0, 0.0)])
+        result = self.get(f'demandes/{transport_request.slug}/eta/', self.customer).json()
+        self.assertEqual(result['source'], 'tracker')
+        self.assertAlmostEqual(result['remaining_km'], eta.distance_km(8.0, 2.5, 9.3372, 2.6303), places=0)
+        self.assertEqual(result['profile']['scope'], 'default')
+
+    def test_only_in_progress_requests_have_an_eta(self):
+        transport_request = self.make_request(self.customer, delivery_coordinates=PARAKOU)
+        self.assertEqual(self.get(f'demandes/{transport_request.slug}/eta/', self.customer).status_code, 400)
+
+
+# ==================== INDEX DES REQUÊTES FRÉQUENTES ====================
+
+@skipUnless(connection.vendor == 'postgresql', "Index partiels, fonctionnels et varchar_pattern_ops : PostgreSQL uniquement")
+class HotQueryIndexTests(TestCase):
+    """Les requêtes des endpoints les plus sollicités doivent pouvoir être servies par un index (migrations 0008 à 0011)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        cls.clients = User.objects.bulk_create(assign_slugs([
+            User(email=f'client-{i}@example.com', role='PME', password='x', is_approved=True) for i in range(50)
+        ]))
+        transporters = User.objects.bulk_create(assign_slugs([
+            User(email=f'transporteur-{i}@example.com', role='TRANSPORTEUR', password='x', is_approved=i % 10 != 0) for i in range(20)
+        ]))
+        cls.transporter = transporters[1]
+        cls.wallet = Wallet.objects.bulk_create(assign_slugs([Wallet(user=user) for user in cls.clients]))[0]
+        statuses = ['DELIVERED'] * 90 + ['CANCELLED'] * 5 + ['IN_PROGRESS'] * 2 + ['ASSIGNED'] + ['PENDING'] * 2
+        now = timezone.now()
+        requests = []
+        for i in range(5000):
+            status = rng.choice(statuses)
+            lat, lon = rng.uniform(6.2, 12.4), rng.uniform(0.8, 3.8)
+            requests.append(TransportRequest(
+                client=rng.choice(cls.clients), assigned_transporter=None if status == 'PENDING' else rng.choice(transporters),
+                title=f'Demande {i}', merchandise_description='Marchandise', weight=Decimal('100'), volume=Decimal('1'),
+                pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2', delivery_city='Parakou',
+                preferred_pickup_date=now + timedelta(days=1), recipient_name='Destinataire', recipient_phone='+22990000000',
+                status=status, priority=rng.choice(['LOW', 'NORMAL', 'HIGH', 'URGENT']),
+                pickup_coordinates=f'{lat:.6f},{lon:.6f}', pickup_lat=lat, pickup_lon=lon, pickup_geohash=geohash(lat, lon),
+            ))
+        TransportRequest.objects.bulk_create(assign_slugs(requests))
+        Notification.objects.bulk_create(assign_slugs([
+            Notification(user=rng.choice(cls.clients), title='Info', message='Message', is_read=rng.random() < 0.9) for _ in range(5000)
+        ]))
+        WalletTransaction.objects.bulk_create(assign_slugs([
+            WalletTransaction(wallet=cls.wallet, tx_type='CREDIT', amount=Decimal('1000')) for _ in range(1000)
+        ]))
+        with connection.cursor() as cursor:
+            for model in (User, TransportRequest, Notification, WalletTransaction):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def hot_queries(self):
+        client, transporter, wallet = self.clients[0], self.transporter, self.wallet
+        available = TransportRequest.objects.filter(assigned_transporter__isnull=True, status__in=['PENDING', 'OFFERS_RECEIVED'])
+        return [
+            ("mes demandes (client, created_at)", TransportRequest.objects.filter(client=client).order_by('-created_at', '-id')[:50]),
+            ("missions (transporteur, statut)", TransportRequest.objects.filter(assigned_transporter=transporter, status='ASSIGNED')),
+            ("statut + priorité", TransportRequest.objects.filter(status='PENDING', priority='URGENT')[:50]),
+            ("demandes disponibles", available.order_by('-created_at', '-id')[:50]),
+            ("liste admin (created_at)", TransportRequest.objects.all().order_by('-created_at', '-id')[:50]),
+            ("notifications (user, created_at)", Notification.objects.filter(user=client).order_by('-created_at')[:50]),
+            ("notifications non lues", Notification.objects.filter(user=client, is_read=False)),
+            ("transactions (wallet, created_at)", WalletTransaction.objects.filter(wallet=wallet).order_by('-created_at', '-id')[:50]),
+            ("transporteurs à approuver", User.objects.filter(role__iexact='TRANSPORTEUR', is_approved=False).order_by('-created_at')),
+            ("demandes disponibles proches (geohash)", filter_near(available, 6.3654, 2.4183, 25)[:50]),
+        ]
+
+    def test_hot_queries_use_an_index(self):
+        with connection.cursor() as cursor:
+            # Petit jeu de données : sans cela le planificateur préfère un parcours séquentiel
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for label, queryset in self.hot_queries():
+            plan = queryset.explain()
+            with self.subTest(label):
+                self.assertIn('Index', plan, plan)
+                self.assertNotIn('Seq Scan', plan, plan)
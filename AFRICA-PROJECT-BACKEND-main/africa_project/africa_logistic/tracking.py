@@ -0,0 +1,233 @@
+import re
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import TRACKER_HOT_MAX_SIZE, TRACKER_HOT_TTL_SECONDS, TRACKER_MAX_CLOCK_SKEW_SECONDS
+from africa_logistic.geofence import check as check_geofences
+from africa_logistic.models import TrackerPosition, TransportRequest
+from africa_logistic.tracks import trip_window
+
+TRACKER_TABLE = 'africa_logistic_trackerposition'
+IMEI_PATTERN = re.compile(r'^\d{8,20}$')
+# 1000 lignes x 6 colonnes : sous la limite de paramètres de SQLite et de PostgreSQL
+INSERT_BATCH_SIZE = 1000
+
+_PARTITION_PATTERN = re.compile(rf'^{TRACKER_TABLE}_(\d{{4}})(\d{{2}})$')
+
+
+# ---------- Table partitionnée (PostgreSQL) ----------
+
+def create_table(schema_editor, model):
+    """
+    PostgreSQL : table partitionnée par mois sur ts, partition par défaut et index BRIN sur ts
+    (les positions arrivent dans l'ordre du temps : quelques pages d'index suffisent par partition).
+    Autres bases : table simple, pour le développement.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(model)
+        return
+    schema_editor.execute(f"""
+        CREATE TABLE {TRACKER_TABLE} (
+            imei varchar(20) NOT NULL,
+            ts timestamp with time zone NOT NULL,
+            lat double precision NOT NULL,
+            lon double precision NOT NULL,
+            speed double precision NULL,
+            course double precision NULL,
+            PRIMARY KEY (imei, ts)
+        ) PARTITION BY RANGE (ts)
+    """)
+    schema_editor.execute(f"CREATE TABLE {TRACKER_TABLE}_default PARTITION OF {TRACKER_TABLE} DEFAULT")
+    schema_editor.execute(f"CREATE INDEX {TRACKER_TABLE}_ts_brin ON {TRACKER_TABLE} USING brin (ts)")
+
+
+def drop_table(schema_editor, model):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TRACKER_TABLE} CASCADE")
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TRACKER_TABLE}_{month:%Y%m}"
+
+
+def ensure_partitions(connection, months_ahead, today=None):
+    """
+    Crée les partitions mensuelles du mois courant et des months_ahead mois suivants (UTC).
+    À lancer avant le début de chaque mois : une partition ne peut plus être créée
+    si la partition par défaut contient déjà des positions de cette période.
+    Retourne les noms des partitions créées.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    current = (today or timezone.now().astimezone(dt_timezone.utc).date()).replace(day=1)
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(month)
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TRACKER_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+            )
+            created.append(name)
+    return created
+
+
+def drop_partitions_before(connection, month):
+    """Rétention : supprime (DROP, sans DELETE ligne à ligne) les partitions mensuelles antérieures à month."""
+    if connection.vendor != 'postgresql':
+        return []
+    dropped = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [TRACKER_TABLE],
+        )
+        for (name,) in cursor.fetchall():
+            match = _PARTITION_PATTERN.match(name)
+            if match and date(int(match.group(1)), int(match.group(2)), 1) < month:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    return sorted(dropped)
+
+
+# ---------- Ingestion ----------
+
+def parse_timestamp(value):
+    """Horodatage d'un point : secondes epoch ou ISO 8601 (UTC si sans fuseau)."""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=dt_timezone.utc)
+
+
+def parse_fix(raw, latest_allowed):
+    """
+    (ts, lat, lon, speed, course) d'une position valide, ou None
+    (coordonnées hors bornes, horodatage invalide ou trop dans le futur).
+    """
+    try:
+        lat = float(raw['lat'])
+        lon = float(raw['lon'])
+        ts = parse_timestamp(raw['ts'])
+        speed = raw.get('speed')
+        course = raw.get('course')
+        speed = float(speed) if speed is not None else None
+        course = float(course) if course is not None else None
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or ts > latest_allowed:
+        return None
+    return ts, lat, lon, speed, course
+
+
+def insert_positions(rows):
+    """
+    INSERT multi-lignes ... ON CONFLICT DO NOTHING de tuples (imei, ts, lat, lon, speed, course),
+    sans instancier de modèles (chemin chaud de l'ingestion) : les renvois d'un même point (imei, ts) sont ignorés.
+    """
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            chunk = rows[start:start + INSERT_BATCH_SIZE]
+            params = []
+            for imei, ts, lat, lon, speed, course in chunk:
+                params.extend((imei, adapt(ts), lat, lon, speed, course))
+            values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(f"INSERT INTO {TRACKER_TABLE} (imei, ts, lat, lon, speed, course) VALUES {values} ON CONFLICT DO NOTHING", params)
+
+
+def store_positions(rows):
+    """
+    Enregistre des positions de un ou plusieurs trackers, met à jour leur dernière position connue
+    et fait avancer le statut des demandes dont le tracker entre dans une zone de collecte ou de livraison.
+    Retourne les changements de statut (demande, ancien, nouveau).
+    """
+    if not rows:
+        return []
+    insert_positions(rows)
+    latest = {}
+    for row in rows:
+        current = latest.get(row[0])
+        if current is None or current[1] < row[1]:
+            latest[row[0]] = row
+    for imei, ts, lat, lon, speed, course in latest.values():
+        remember(TrackerPosition(imei=imei, ts=ts, lat=lat, lon=lon, speed=speed, course=course))
+    return check_geofences(rows)
+
+
+def ingest(imei, fixes):
+    """Enregistre un lot de positions d'un tracker. Retourne (acceptées, rejetées)."""
+    latest_allowed = timezone.now() + timedelta(seconds=TRACKER_MAX_CLOCK_SKEW_SECONDS)
+    rows = []
+    for raw in fixes:
+        fix = parse_fix(raw, latest_allowed) if isinstance(raw, dict) else None
+        if fix is not None:
+            rows.append((imei,) + fix)
+    store_positions(rows)
+    return len(rows), len(fixes) - len(rows)
+
+
+def active_tracker_imeis():
+    """IMEI associés à une demande non terminée : seuls ces terminaux sont acceptés par le serveur GT06."""
+    return set(
+        TransportRequest.objects.exclude(status__in=['DELIVERED', 'CANCELLED'])
+        .exclude(tracker_imei__isnull=True).exclude(tracker_imei='')
+        .values_list('tracker_imei', flat=True)
+    )
+
+
+# ---------- Dernière position ----------
+
+# imei -> dernière position connue de ce worker. Le TTL borne le retard quand un autre worker
+# reçoit les positions suivantes ; au-delà, la base est relue.
+_last_positions = LRUCache(max_size=TRACKER_HOT_MAX_SIZE, ttl=TRACKER_HOT_TTL_SECONDS)
+_last_positions_lock = threading.Lock()
+
+
+def remember(position):
+    with _last_positions_lock:
+        current = _last_positions.get(position.imei)
+        if current is None or current.ts <= position.ts:
+            _last_positions.set(position.imei, position)
+
+
+def last_position(imei):
+    """Dernière position d'un tracker : mémoire, sinon lecture de la clé primaire (imei, ts) en base."""
+    position = _last_positions.get(imei)
+    if position is None:
+        position = TrackerPosition.objects.filter(imei=imei).order_by('-ts').first()
+        if position is not None:
+            remember(position)
+    return position
+
+
+def trip_position(transport_request):
+    """
+    Dernière position du tracker pendant le trajet de la demande, ou None.
+    Un IMEI est réutilisé d'une demande à l'autre : une position antérieure au trajet
+    (trajet précédent) est ignorée, et une demande livrée ne montre pas le trajet suivant.
+    """
+    start, end = trip_window(transport_request)
+    position = last_position(transport_request.tracker_imei)
+    if position is None or position.ts < start:
+        return None
+    if transport_request.status == 'DELIVERED' and position.ts > end:
+        return TrackerPosition.objects.filter(imei=transport_request.tracker_imei, ts__gte=start, ts__lte=end).order_by('-ts').first()
+    return position
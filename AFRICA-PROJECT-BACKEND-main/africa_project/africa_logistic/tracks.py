@@ -0,0 +1,183 @@
+import math
+import zlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from africa_logistic.background import submit
+from africa_logistic.cache import LRUCache
+from africa_logistic.configs import TRACK_ARCHIVE_TOLERANCE_M, TRACK_CACHE_MAX_SIZE
+from africa_logistic.geo import EARTH_RADIUS_KM, distance_km
+from africa_logistic.models import RequestStatusHistory, TrackerPosition, TransportRequest, TripTrack
+
+# Une trace est une liste de points (lat, lon, ts) avec ts en secondes epoch (entier)
+COORDINATE_SCALE = 100000  # 1e-5 degré ~ 1,1 m
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM * 1000
+
+# Traces archivées décodées puis simplifiées : immuables, donc mises en cache par (trace, tolérance)
+_simplified_archives = LRUCache(max_size=TRACK_CACHE_MAX_SIZE, ttl=3600)
+
+
+# ---------- Simplification ----------
+
+def simplify(points, tolerance_m):
+    """
+    Douglas-Peucker itératif (pile, pas de récursion) : garde les points à plus de tolerance_m
+    du segment qui les encadre. Projection équirectangulaire locale, suffisante à l'échelle d'un trajet.
+    Un premier passage linéaire écarte les points à moins de tolerance_m du dernier point gardé
+    (arrêts, dérive GPS) : le Douglas-Peucker, plus coûteux, travaille sur bien moins de points.
+    """
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(points[0][0]))
+    limit = tolerance_m * tolerance_m
+    kept, xs, ys = [points[0]], [points[0][1] * scale_x], [points[0][0] * METERS_PER_DEGREE]
+    for point in points[1:-1]:
+        x, y = point[1] * scale_x, point[0] * METERS_PER_DEGREE
+        if (x - xs[-1]) ** 2 + (y - ys[-1]) ** 2 > limit:
+            kept.append(point)
+            xs.append(x)
+            ys.append(y)
+    kept.append(points[-1])
+    xs.append(points[-1][1] * scale_x)
+    ys.append(points[-1][0] * METERS_PER_DEGREE)
+    points, count = kept, len(kept)
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length = dx * dx + dy * dy
+        farthest, index = -1.0, -1
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if length:
+                t = (px * dx + py * dy) / length
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                px -= t * dx
+                py -= t * dy
+            distance = px * px + py * py
+            if distance > farthest:
+                farthest, index = distance, i
+        if farthest > limit:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def tolerance_for_zoom(zoom, lat):
+    """Tolérance d'un pixel au niveau de zoom d'une carte web (tuiles de 256 px)."""
+    return 156543.03392 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def path_length_km(points):
+    return sum(distance_km(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:]))
+
+
+# ---------- Encodage compact ----------
+
+def _write_varint(out, value):
+    # Zigzag : les petits écarts négatifs restent courts
+    value = (value << 1) ^ (value >> 63)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_track(points):
+    """
+    Écarts successifs (lat, lon au 1e-5 degré, ts en secondes) en varints zigzag, compressés par zlib :
+    quelques octets par point au lieu d'une ligne de table.
+    """
+    out = bytearray()
+    previous_lat = previous_lon = previous_ts = 0
+    for lat, lon, ts in points:
+        lat, lon = round(lat * COORDINATE_SCALE), round(lon * COORDINATE_SCALE)
+        _write_varint(out, lat - previous_lat)
+        _write_varint(out, lon - previous_lon)
+        _write_varint(out, ts - previous_ts)
+        previous_lat, previous_lon, previous_ts = lat, lon, ts
+    return zlib.compress(bytes(out), 9)
+
+
+def decode_track(data):
+    raw = zlib.decompress(bytes(data))
+    points = []
+    values = []
+    value = shift = 0
+    lat = lon = ts = 0
+    for byte in raw:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+        if len(values) == 3:
+            lat, lon, ts = lat + values[0], lon + values[1], ts + values[2]
+            points.append((lat / COORDINATE_SCALE, lon / COORDINATE_SCALE, ts))
+            values = []
+    return points
+
+
+# ---------- Traces d'une demande ----------
+
+def trip_window(transport_request):
+    """Début (IN_PROGRESS, sinon ASSIGNED, sinon création) et fin (DELIVERED, sinon maintenant) du trajet."""
+    changes = {}
+    for status, changed_at in RequestStatusHistory.objects.filter(transport_request=transport_request).order_by('created_at').values_list('new_status', 'created_at'):
+        changes.setdefault(status, changed_at)
+    start = changes.get('IN_PROGRESS') or changes.get('ASSIGNED') or transport_request.created_at
+    return start, changes.get('DELIVERED') or timezone.now()
+
+
+def live_points(imei, start, end):
+    """Positions brutes du tracker sur la période, dans l'ordre du temps (parcours de la clé (imei, ts))."""
+    rows = TrackerPosition.objects.filter(imei=imei, ts__gte=start, ts__lte=end).order_by('ts').values_list('lat', 'lon', 'ts')
+    return [(lat, lon, int(ts.timestamp())) for lat, lon, ts in rows.iterator(chunk_size=5000)]
+
+
+def archived_points(trip_track, tolerance_m):
+    key = (trip_track.pk, trip_track.updated_at, tolerance_m)
+    points = _simplified_archives.get(key)
+    if points is None:
+        points = simplify(decode_track(trip_track.data), tolerance_m)
+        _simplified_archives.set(key, points)
+    return points
+
+
+def archive_trip(transport_request_id):
+    """
+    Archive la trace d'une demande livrée en un seul blob (simplifiée à TRACK_ARCHIVE_TOLERANCE_M).
+    Retourne la TripTrack, ou None sans tracker ou sans position.
+    """
+    transport_request = TransportRequest.objects.filter(pk=transport_request_id, status='DELIVERED').first()
+    if transport_request is None or not transport_request.tracker_imei:
+        return None
+    start, end = trip_window(transport_request)
+    points = live_points(transport_request.tracker_imei, start, end)
+    if not points:
+        return None
+    stored = simplify(points, TRACK_ARCHIVE_TOLERANCE_M)
+    trip_track, _ = TripTrack.objects.update_or_create(
+        transport_request=transport_request,
+        defaults={
+            'imei': transport_request.tracker_imei,
+            'started_at': start,
+            'ended_at': end,
+            'raw_point_count': len(points),
+            'point_count': len(stored),
+            'distance_km': path_length_km(points),
+            'data': encode_track(stored),
+        },
+    )
+    return trip_track
+
+
+def schedule_archive(transport_request_id):
+    """Archive la trace dans le thread de fond, une fois la transaction en cours validée."""
+    transaction.on_commit(lambda: submit(archive_trip, transport_request_id))
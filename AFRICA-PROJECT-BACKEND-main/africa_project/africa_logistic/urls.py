@@ -24,6 +24,8 @@ urlpatterns = [
     path('wallet/me/', views.get_my_wallet, name='get_my_wallet'),
     path('wallet/transactions/', views.get_my_wallet_transactions, name='get_my_wallet_transactions'),
     path('wallet/topup/', views.topup_wallet, name='topup_wallet'),
+    path('wallet/statement/', views.get_my_wallet_statement, name='get_my_wallet_statement'),
+    path('wallet/balance-at/', views.get_my_wallet_balance_at, name='get_my_wallet_balance_at'),
 
     # Notifications
     path('notifications/', views.get_my_notifications, name='get_my_notifications'),
@@ -43,6 +45,9 @@ urlpatterns = [
     path('reports/admin/transporters.csv', views.export_transporters_report, name='export_transporters_report'),
     path('reports/admin/geographic.csv', views.export_geographic_report, name='export_geographic_report'),
     path('reports/admin/disputes.csv', views.export_disputes_report, name='export_disputes_report'),
+    path('reports/jobs/create/', views.create_report_job, name='create_report_job'),
+    path('reports/jobs/<str:job_slug>/', views.get_report_job, name='get_report_job'),
+    path('reports/jobs/<str:job_slug>/download/', views.download_report_job, name='download_report_job'),
     
     path('data-admin/users/', views.get_users_by_data_admin, name='get_users_by_data_admin'),
     path('data-admin/user/<str:user_slug>/alter/', views.alter_user_by_data_admin, name='alter_user_by_data_admin'),
@@ -86,6 +91,7 @@ urlpatterns = [
     path('demandes/mes-demandes/', views.get_my_requests, name='mes_demandes'),
     path('demandes/mes-demandes-assignees/', views.get_my_assigned_requests, name='mes_demandes_assignees'),
     path('demandes/disponibles/', views.get_available_requests, name='demandes_disponibles'),
+    path('demandes/disponibles/matching/', views.get_matching_requests, name='demandes_disponibles_matching'),
     path('demandes/', views.get_transport_requests, name='liste_demandes'),
     
     # Détails, modification, annulation, suppression
@@ -93,6 +99,9 @@ urlpatterns = [
     path('demandes/<str:request_slug>/update/', views.update_transport_request, name='update_demande'),
     path('demandes/<str:request_slug>/annuler/', views.cancel_request, name='annuler_demande'),
     path('demandes/<str:request_slug>/delete/', views.delete_transport_request, name='delete_demande'),
+    path('demandes/<str:request_slug>/position/', views.get_request_position, name='position_demande'),
+    path('demandes/<str:request_slug>/track/', views.get_request_track, name='trace_demande'),
+    path('demandes/<str:request_slug>/eta/', views.get_request_eta, name='eta_demande'),
     path('demandes/<str:request_slug>/documents/', views.get_request_documents, name='get_request_documents'),
     path('demandes/<str:request_slug>/documents/upload/', views.upload_request_document, name='upload_request_document'),
     path('demandes/documents/<str:document_slug>/delete/', views.delete_document, name='delete_request_document'),
@@ -138,4 +147,8 @@ urlpatterns = [
     path('admin/transporters/<str:transporter_slug>/approve/', views.approve_transporter, name='approve_transporter'),
     path('admin/transporters/<str:transporter_slug>/reject/', views.reject_transporter, name='reject_transporter'),
     path('admin/transporters/<str:transporter_slug>/', views.get_transporter_details, name='get_transporter_details'),
+    
+    # ==================== SUIVI GPS ====================
+    
+    path('tracking/positions/', views.ingest_tracker_positions, name='ingest_tracker_positions'),
 ]
\ No newline at end of file
@@ -1,9 +1,12 @@
+import hmac
 from django.http import JsonResponse
 from africa_logistic.models import User, UserConnect
-from africa_logistic.configs import CODE_VALIDITY_MINUTES, PRIVATE_ROLES
+from africa_logistic.configs import CODE_VALIDITY_MINUTES, IDEMPOTENCY_KEY_MAX_LENGTH, PRIVATE_ROLES
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
+from africa_logistic.session_cache import get_session_user
+from africa_logistic import idempotency
 
 def is_logged_in(view_func):
     def wrapper(request, *args, **kwargs):
@@ -11,8 +14,7 @@ def is_logged_in(view_func):
         token = token.split(' ')[1] if token and ' ' in token else token
         if token:
             try:
-                user_connect = UserConnect.objects.get(slug=token)
-                request.user = user_connect.user
+                request.user = get_session_user(token)
                 return view_func(request, *args, **kwargs)
             except UserConnect.DoesNotExist:
                 return JsonResponse({'error': 'Invalid token'}, status=401)
@@ -20,6 +22,34 @@ def is_logged_in(view_func):
             return JsonResponse({'error': 'Authorization header missing'}, status=401)
     return wrapper
 
+def idempotent(view_func):
+    """
+    En-tête Idempotency-Key : la première réponse est enregistrée puis rejouée à l'identique
+    pour les renvois de la même requête (à placer après is_logged_in).
+    """
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return JsonResponse({'error': 'Idempotency-Key trop longue.'}, status=400)
+        try:
+            record, stored = idempotency.begin(request.user, key, request)
+        except idempotency.KeyReused:
+            return JsonResponse({'error': "Cette Idempotency-Key a déjà été utilisée pour une requête différente."}, status=422)
+        except idempotency.RequestInProgress:
+            return JsonResponse({'error': "La requête originale est encore en cours de traitement. Réessayez plus tard."}, status=409)
+        if stored:
+            return idempotency.replay(stored)
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            idempotency.release(record)
+            raise
+        idempotency.complete(record, response)
+        return response
+    return wrapper
+
 def is_admin(view_func):
     def wrapper(request, *args, **kwargs):
         if hasattr(request, 'user') and request.user.role.upper() == 'ADMIN':
@@ -98,6 +128,18 @@ def is_private_role(view_func):
             return JsonResponse({'error': 'Private role access required'}, status=403)
     return wrapper
 
+def is_tracker_device(view_func):
+    """
+    Authentifie un tracker GPS par le jeton partagé settings.TRACKER_INGEST_TOKEN (en-tête X-Tracker-Token).
+    """
+    def wrapper(request, *args, **kwargs):
+        expected = getattr(settings, 'TRACKER_INGEST_TOKEN', '')
+        token = request.headers.get('X-Tracker-Token', '')
+        if expected and hmac.compare_digest(token.encode(), expected.encode()):
+            return view_func(request, *args, **kwargs)
+        return JsonResponse({'error': 'Invalid tracker token'}, status=401)
+    return wrapper
+
 def is_moderator(view_func):
     def wrapper(request, *args, **kwargs):
         if hasattr(request, 'user') and request.user.role.upper() == 'MODERATOR':
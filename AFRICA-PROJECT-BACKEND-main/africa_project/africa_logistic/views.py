@@ -5,15 +5,32 @@ import base64
 import mimetypes
 from datetime import datetime
 from django.core.files.base import ContentFile
-from django.http import JsonResponse
-from africa_logistic.models import User, VerificationCode, User2FA, PasswordResetToken, UserConnect, TypeDocumentLegal, DocumentLegal, TransportRequest, RequestDocument, RequestStatusHistory, Vehicle, VehicleDocument, Wallet, WalletTransaction, Notification, Rating, NotificationPreference
-from africa_logistic.utils import is_logged_in, is_moderator, send_verify_account_mail, is_admin, is_data_admin, is_pme, is_agriculteur, is_particulier, is_transporteur, send_2FA_mail_with_template, send_reset_password_mail_with_template, is_private_role, is_client, is_transporteur, is_transporteur_or_admin, send_transporter_approval_mail, send_transporter_rejection_mail
+from django.http import FileResponse, JsonResponse
+from africa_logistic.models import User, VerificationCode, User2FA, PasswordResetToken, UserConnect, TypeDocumentLegal, DocumentLegal, TransportRequest, RequestDocument, RequestStatusHistory, Vehicle, VehicleDocument, Wallet, WalletTransaction, Notification, Rating, NotificationPreference, ReportJob, KpiSnapshot, TripTrack
+from africa_logistic.configs import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEAR_DEFAULT_RADIUS_KM, NEAR_MAX_RADIUS_KM, TRACKER_MAX_BATCH, TRACK_DEFAULT_TOLERANCE_M, TRACK_MAX_TOLERANCE_M
+from africa_logistic.eta import estimate as estimate_arrival
+from africa_logistic.geo import filter_near, parse_coordinates
+from africa_logistic.idempotency import reference as idempotency_reference
+from africa_logistic.kpis import record_request_change, record_role_change, request_state
+from africa_logistic.matching import invalidate_capability, rank_requests
+from africa_logistic.ledger import REFERENCE_MAX_LENGTH, InsufficientFunds, balance_at, month_start, statement as ledger_statement, statement_line, credit as ledger_credit, debit as ledger_debit
+from africa_logistic.notifications import fan_out_admins
+from africa_logistic.pagination import list_response
+from africa_logistic.reports import REPORTS, clean_params, request_report
+from africa_logistic.projections import project
+from africa_logistic.search import filter_city, ranked_response, search_requests
+from africa_logistic.session_cache import invalidate_token, invalidate_user
+from africa_logistic.tracking import IMEI_PATTERN, ingest as ingest_positions, trip_position
+from africa_logistic.tracks import archived_points, live_points, path_length_km, schedule_archive, simplify, tolerance_for_zoom, trip_window
+from africa_logistic.stats import choice_breakdown, choice_counts, compute, count_if, sum_if
+from africa_logistic.utils import is_logged_in, is_moderator, send_verify_account_mail, is_admin, is_data_admin, is_pme, is_agriculteur, is_particulier, is_transporteur, send_2FA_mail_with_template, send_reset_password_mail_with_template, is_private_role, is_client, is_transporteur, is_transporteur_or_admin, send_transporter_approval_mail, send_transporter_rejection_mail, idempotent, is_tracker_device
 from django.http import HttpResponseRedirect
 from django.conf import settings
 import urllib.parse
 import requests
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from datetime import datetime
 from django.core.files.base import ContentFile
 from decimal import Decimal
@@ -354,6 +371,7 @@ def logout_user(request):
     try:
         user_connect = UserConnect.objects.get(user=request.user)
         user_connect.delete()
+        invalidate_token(user_connect.slug)
         return JsonResponse({'message': 'Déconnexion réussie.'}, status=200)
     except UserConnect.DoesNotExist:
         return JsonResponse({'error': 'Utilisateur non connecté.'}, status=400)
@@ -550,6 +568,7 @@ def reset_password(request):
             user = reset_token.user
             user.set_password(new_password)
             user.save()
+            invalidate_user(user)
             
             # Marquer le code comme utilisé
             reset_token.is_used = True
@@ -588,25 +607,80 @@ def get_my_wallet(request):
 @is_logged_in
 def get_my_wallet_transactions(request):
     wallet, _ = Wallet.objects.get_or_create(user=request.user)
-    txs = wallet.transactions.all().order_by("-created_at")[:100]
+    # Sans paramètre : les 100 dernières (historique) ; ?limit / ?cursor pour parcourir tout l'historique
+    txs = wallet.transactions.all().select_related("wallet")
+    return list_response(
+        request, txs, "transactions", "Transactions récupérées avec succès.",
+        serialize=lambda tx: tx.as_dict(include_related=True), default_limit=100
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+def get_my_wallet_statement(request):
+    """
+    Relevé mensuel du portefeuille : ?month=AAAA-MM (mois courant par défaut)
+    Soldes d'ouverture/clôture lus depuis le relevé précalculé, mouvements du mois avec solde courant.
+    """
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    month = request.GET.get("month")
+    try:
+        period = datetime.strptime(month, "%Y-%m").date() if month else month_start(timezone.localdate())
+    except ValueError:
+        return JsonResponse({"error": "Format de mois invalide (AAAA-MM)."}, status=400)
+    summary, txs = ledger_statement(wallet, period)
+    return list_response(
+        request, txs, "transactions", "Relevé récupéré avec succès.",
+        serialize=statement_line, extra={"statement": summary}
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+def get_my_wallet_balance_at(request):
+    """
+    Solde du portefeuille à une date : ?date=AAAA-MM-JJ (fin de journée) ou date-heure ISO
+    """
+    wallet, _ = Wallet.objects.get_or_create(user=request.user)
+    value = request.GET.get("date")
+    if not value:
+        return JsonResponse({"error": "Le paramètre date est requis."}, status=400)
+    try:
+        if len(value) == 10:
+            moment = timezone.make_aware(datetime.combine(datetime.strptime(value, "%Y-%m-%d").date(), datetime.max.time()))
+        else:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+    except ValueError:
+        return JsonResponse({"error": "Format de date invalide."}, status=400)
     return JsonResponse({
-        "message": "Transactions récupérées avec succès.",
-        "transactions": [tx.as_dict(include_related=True) for tx in txs]
+        "message": "Solde récupéré avec succès.",
+        "date": moment.isoformat(),
+        "balance": float(balance_at(wallet, moment))
     }, status=200)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
 @is_logged_in
+@idempotent
 def topup_wallet(request):
     """
     Rechargement portefeuille (simulation de paiement côté backend, mais données réelles en DB).
     """
-    wallet, _ = Wallet.objects.get_or_create(user=request.user)
     data = json.loads(request.body)
     amount = data.get("amount")
     description = data.get("description", "Rechargement")
+    # À défaut de référence, l'Idempotency-Key (sous forme d'empreinte de longueur fixe) sert de référence
+    # au mouvement : idempotence aussi au niveau du grand livre
     reference = data.get("reference")
+    if reference is None and request.headers.get("Idempotency-Key"):
+        reference = idempotency_reference(request.headers["Idempotency-Key"])
+    if reference is not None and (not isinstance(reference, str) or len(reference) > REFERENCE_MAX_LENGTH):
+        return JsonResponse({"error": f"La référence doit être une chaîne d'au plus {REFERENCE_MAX_LENGTH} caractères."}, status=400)
     
     try:
         amount_dec = Decimal(str(amount))
@@ -616,15 +690,8 @@ def topup_wallet(request):
     if amount_dec <= 0:
         return JsonResponse({"error": "Le montant doit être supérieur à 0."}, status=400)
     
-    wallet.balance = (wallet.balance or Decimal("0.00")) + amount_dec
-    wallet.save()
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        tx_type="CREDIT",
-        amount=amount_dec,
-        description=description,
-        reference=reference
-    )
+    # Crédit atomique sous verrou ; une référence déjà utilisée ne crédite pas une seconde fois
+    wallet, _, _ = ledger_credit(request.user, amount_dec, description=description, reference=reference)
     
     return JsonResponse({
         "message": "Portefeuille rechargé avec succès.",
@@ -641,7 +708,7 @@ def get_my_notifications(request):
   notifications = Notification.objects.filter(user=request.user).order_by("-created_at")[:50]
   return JsonResponse({
       "message": "Notifications récupérées avec succès.",
-      "notifications": [n.as_dict() for n in notifications]
+      "notifications": project(notifications)
   }, status=200)
 
 
@@ -670,10 +737,10 @@ def mark_all_notifications_read(request):
 @is_logged_in
 @is_data_admin
 def get_users_by_data_admin(request):
-    users = User.objects.all().order_by('id')
+    users = project(User.objects.all().order_by('id'))
     return JsonResponse({
-        "nb": users.count(),
-        "users": [u.as_dict() for u in users]
+        "nb": len(users),
+        "users": users
     })
 
 @csrf_exempt
@@ -711,6 +778,8 @@ def alter_user_by_data_admin(request, user_slug):
         user_pk.lastname = lastname
     if telephone:
         user_pk.telephone = telephone
+    old_role = user_pk.role
+    role_changed = bool(role) and role != old_role
     if role:
         user_pk.role = role
     if address:
@@ -718,7 +787,13 @@ def alter_user_by_data_admin(request, user_slug):
     if photo:
         user_pk.photo = photo
     try:
-        user_pk.save()
+        with transaction.atomic():
+            user_pk.save()
+            if role_changed:
+                # Solde et demandes passent au seau KPI du nouveau rôle
+                record_role_change(user_pk, old_role)
+        if role_changed:
+            invalidate_user(user_pk)
         return JsonResponse({
             'message': "Utilisateur modifié avec succès",
             'user': user_pk.as_dict()
@@ -743,6 +818,7 @@ def desactivate_user_by_data_admin(request, user_slug):
         }, status=400)
     user_pk.is_blocked = True
     user_pk.save()
+    invalidate_user(user_pk)
     return JsonResponse({
         "message": "Utilisateur blocké avec succès"
     }, status=200)
@@ -764,6 +840,7 @@ def activate_user_by_data_admin(request, user_slug):
         }, status=400)
     user_pk.is_blocked = False
     user_pk.save()
+    invalidate_user(user_pk)
     return JsonResponse({
         "message": "Utilisateur blocké avec succès"
     }, status=200)
@@ -780,6 +857,7 @@ def delete_user_by_data_admin(request, user_slug):
             'error': 'Utilisateur non retrouvé'
         }, status=400)
     user_pk.delete()
+    invalidate_user(user_pk)
     return JsonResponse({
         "message": "Utilisateur supprimé avec  succès"
     })
@@ -798,6 +876,7 @@ def restore_deleted_user_by_data_admin(request, user_slug):
     user_pk.is_active = True
     user_pk.deleted_at = None
     user_pk.save()
+    invalidate_user(user_pk)
     return JsonResponse({
         "message": "Utilisateur restauré avec  succès"
     }, status=200)
@@ -857,6 +936,7 @@ def update_infos(request):
         user.photo = photo
     try:
         user.save()
+        invalidate_user(user)
         return JsonResponse({
             'message': "Informations modifiées avec succès",
             'user': user.as_dict()
@@ -879,6 +959,7 @@ def change_password(request):
     if user.check_password(old_password):
         user.set_password(new_password)
         user.save()
+        invalidate_user(user)
         return JsonResponse({'message': 'Mot de passe modifié avec succès.'}, status=200)
     else:
         return JsonResponse({'error': 'Ancien mot de passe incorrect.'}, status=400)
@@ -963,6 +1044,162 @@ def associate_tracker(request, request_slug):
     except TransportRequest.DoesNotExist:
         return JsonResponse({'error': 'Demande non trouvée.'}, status=404)
 
+# ==================== SUIVI GPS ====================
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@is_tracker_device
+def ingest_tracker_positions(request):
+    """
+    Réception d'un lot de positions GPS d'un tracker
+    Corps : {"imei": "...", "fixes": [{"ts": ISO 8601 ou epoch, "lat": ..., "lon": ..., "speed": ..., "course": ...}]}
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Corps JSON invalide.'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Le corps doit être un objet JSON.'}, status=400)
+    
+    imei = str(data.get('imei') or '')
+    fixes = data.get('fixes')
+    if not IMEI_PATTERN.match(imei) or not isinstance(fixes, list):
+        return JsonResponse({'error': 'imei (chiffres) et fixes (liste) sont requis.'}, status=400)
+    if len(fixes) > TRACKER_MAX_BATCH:
+        return JsonResponse({'error': f'Lot trop volumineux (max {TRACKER_MAX_BATCH} positions).'}, status=413)
+    
+    accepted, rejected = ingest_positions(imei, fixes)
+    return JsonResponse({
+        'message': 'Positions enregistrées.',
+        'accepted': accepted,
+        'rejected': rejected,
+    }, status=200)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+def get_request_position(request, request_slug):
+    """
+    Dernière position connue du tracker associé à une demande
+    Accessible au client, au transporteur assigné et aux admins
+    """
+    try:
+        transport_request = TransportRequest.objects.get(slug=request_slug)
+    except TransportRequest.DoesNotExist:
+        return JsonResponse({'error': 'Demande non trouvée.'}, status=404)
+    
+    user = request.user
+    if user.role.upper() not in ['ADMIN', 'DATA ADMIN']:
+        if transport_request.client_id != user.id and transport_request.assigned_transporter_id != user.id:
+            return JsonResponse({'error': 'Accès non autorisé.'}, status=403)
+    
+    if not transport_request.tracker_imei:
+        return JsonResponse({'error': 'Aucun tracker associé à cette demande.'}, status=404)
+    
+    position = trip_position(transport_request)
+    if position is None:
+        return JsonResponse({'error': 'Aucune position reçue pour ce trajet.'}, status=404)
+    
+    return JsonResponse({
+        'message': 'Dernière position récupérée avec succès.',
+        'position': position.as_dict()
+    }, status=200)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+def get_request_track(request, request_slug):
+    """
+    Trace GPS d'une demande, simplifiée (Douglas-Peucker) pour l'affichage
+    - ?tolerance=<mètres> ou ?zoom=<0-22> (un pixel de carte au niveau de zoom)
+    - trajet livré : lu depuis l'archive compressée, sinon depuis les positions brutes
+    Accessible au client, au transporteur assigné et aux admins
+    """
+    try:
+        transport_request = TransportRequest.objects.get(slug=request_slug)
+    except TransportRequest.DoesNotExist:
+        return JsonResponse({'error': 'Demande non trouvée.'}, status=404)
+    
+    user = request.user
+    if user.role.upper() not in ['ADMIN', 'DATA ADMIN']:
+        if transport_request.client_id != user.id and transport_request.assigned_transporter_id != user.id:
+            return JsonResponse({'error': 'Accès non autorisé.'}, status=403)
+    
+    if not transport_request.tracker_imei:
+        return JsonResponse({'error': 'Aucun tracker associé à cette demande.'}, status=404)
+    
+    tolerance = request.GET.get('tolerance')
+    zoom = request.GET.get('zoom')
+    try:
+        tolerance = float(tolerance) if tolerance else None
+        zoom = int(zoom) if zoom else None
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres tolerance ou zoom invalides.'}, status=400)
+    if (tolerance is not None and not 0 <= tolerance <= TRACK_MAX_TOLERANCE_M) or (zoom is not None and not 0 <= zoom <= 22):
+        return JsonResponse({'error': f'tolerance doit être entre 0 et {TRACK_MAX_TOLERANCE_M} m, zoom entre 0 et 22.'}, status=400)
+    
+    archive = TripTrack.objects.filter(transport_request=transport_request).first()
+    if archive is not None:
+        reference_lat = transport_request.pickup_lat or 0
+        if zoom is not None:
+            tolerance = tolerance_for_zoom(zoom, reference_lat)
+        tolerance = round(TRACK_DEFAULT_TOLERANCE_M if tolerance is None else tolerance, 1)
+        points = archived_points(archive, tolerance)
+        raw_count, distance = archive.raw_point_count, archive.distance_km
+    else:
+        start, end = trip_window(transport_request)
+        raw = live_points(transport_request.tracker_imei, start, end)
+        if zoom is not None:
+            tolerance = tolerance_for_zoom(zoom, raw[0][0] if raw else transport_request.pickup_lat or 0)
+        tolerance = round(TRACK_DEFAULT_TOLERANCE_M if tolerance is None else tolerance, 1)
+        points = simplify(raw, tolerance)
+        raw_count, distance = len(raw), path_length_km(raw)
+    
+    return JsonResponse({
+        'message': 'Trace récupérée avec succès.',
+        'source': 'archive' if archive is not None else 'live',
+        'tolerance_m': tolerance,
+        'raw_count': raw_count,
+        'count': len(points),
+        'distance_km': round(distance, 3),
+        'points': points,
+    }, status=200)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+def get_request_eta(request, request_slug):
+    """
+    Heure d'arrivée estimée d'une demande en cours de livraison (IN_PROGRESS)
+    Accessible au client, au transporteur assigné et aux admins
+    """
+    try:
+        transport_request = TransportRequest.objects.get(slug=request_slug)
+    except TransportRequest.DoesNotExist:
+        return JsonResponse({'error': 'Demande non trouvée.'}, status=404)
+    
+    user = request.user
+    if user.role.upper() not in ['ADMIN', 'DATA ADMIN']:
+        if transport_request.client_id != user.id and transport_request.assigned_transporter_id != user.id:
+            return JsonResponse({'error': 'Accès non autorisé.'}, status=403)
+    
+    if transport_request.status != 'IN_PROGRESS':
+        return JsonResponse({'error': "L'estimation n'est disponible que pour une demande en cours de livraison."}, status=400)
+    if transport_request.delivery_lat is None:
+        return JsonResponse({'error': 'Coordonnées de livraison manquantes.'}, status=404)
+    
+    result = estimate_arrival(transport_request)
+    if result is None:
+        return JsonResponse({'error': 'Aucune position ni coordonnées de collecte pour estimer l\'arrivée.'}, status=404)
+    
+    return JsonResponse({
+        'message': 'Estimation récupérée avec succès.',
+        **result
+    }, status=200)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @is_data_admin
@@ -1235,34 +1472,18 @@ def get_my_legal_documents(request):
         'documents': [doc.as_dict() for doc in documents]
     }, status = 200)
 
-import csv
-from django.http import HttpResponse
+from africa_logistic.exports import (
+    stream_csv, CLIENT_REQUESTS_COLUMNS, TRANSPORTER_MISSIONS_COLUMNS, ADMIN_REQUESTS_COLUMNS, REVENUE_COLUMNS,
+    TRANSPORTERS_COLUMNS, GEOGRAPHIC_COLUMNS, DISPUTES_COLUMNS, USERS_COLUMNS,
+)
 
 @csrf_exempt
 @require_http_methods(["GET"])
 @is_logged_in
 def export_client_requests(request):
     """Export client requests to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="my-requests.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Titre', 'Type', 'Poids', 'Statut', 'Date Collecte', 'Lieu Collecte', 'Lieu Livraison'])
-    
     requests = TransportRequest.objects.filter(client=request.user)
-    for r in requests:
-        writer.writerow([
-            r.slug, 
-            r.title, 
-            r.merchandise_type, 
-            r.weight, 
-            r.status, 
-            r.preferred_pickup_date, 
-            r.pickup_address, 
-            r.delivery_address
-        ])
-    
-    return response
+    return stream_csv(requests, CLIENT_REQUESTS_COLUMNS, "my-requests.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1270,25 +1491,8 @@ def export_client_requests(request):
 @is_transporteur
 def export_transporter_missions(request):
     """Export transporter missions to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="my-missions.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Titre', 'Client', 'Statut', 'Date Collecte', 'Lieu Collecte', 'Lieu Livraison'])
-    
-    missions = TransportRequest.objects.filter(assigned_transporter=request.user)
-    for m in missions:
-        writer.writerow([
-            m.slug, 
-            m.title, 
-            m.client.presentation(), 
-            m.status, 
-            m.preferred_pickup_date, 
-            m.pickup_address, 
-            m.delivery_address
-        ])
-    
-    return response
+    missions = TransportRequest.objects.filter(assigned_transporter=request.user).select_related('client')
+    return stream_csv(missions, TRANSPORTER_MISSIONS_COLUMNS, "my-missions.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1296,26 +1500,8 @@ def export_transporter_missions(request):
 @is_admin
 def export_admin_report(request):
     """Export all requests report for admin"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="all-requests-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Client', 'Transporteur', 'Titre', 'Statut', 'Date Création', 'Prix Estimé'])
-    
-    requests = TransportRequest.objects.all_with_deleted()
-    for r in requests:
-        transporter = r.assigned_transporter.presentation() if r.assigned_transporter else "N/A"
-        writer.writerow([
-            r.slug, 
-            r.client.presentation(), 
-            transporter, 
-            r.title, 
-            r.status, 
-            r.created_at, 
-            r.estimated_price
-        ])
-    
-    return response
+    requests = TransportRequest.objects.all_with_deleted().select_related('client', 'assigned_transporter')
+    return stream_csv(requests, ADMIN_REQUESTS_COLUMNS, "all-requests-report.csv")
     
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1323,25 +1509,8 @@ def export_admin_report(request):
 @is_admin
 def export_revenue_report(request):
     """Export revenue report for admin"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="revenue-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Utilisateur', 'Type', 'Montant', 'Description', 'Référence', 'Date'])
-    
-    transactions = WalletTransaction.objects.all().order_by('-created_at')
-    for tx in transactions:
-        writer.writerow([
-            tx.slug,
-            tx.wallet.user.presentation(),
-            tx.tx_type,
-            tx.amount,
-            tx.description,
-            tx.reference,
-            tx.created_at
-        ])
-    
-    return response
+    transactions = WalletTransaction.objects.all().select_related('wallet__user').order_by('-created_at')
+    return stream_csv(transactions, REVENUE_COLUMNS, "revenue-report.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1349,26 +1518,8 @@ def export_revenue_report(request):
 @is_admin
 def export_transporters_report(request):
     """Export transporters report for admin"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="transporters-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Nom Complet', 'Email', 'Téléphone', 'Vérifié', 'Approuvé', 'Statut', 'Date Création'])
-    
     transporters = User.objects.filter(role__iexact='TRANSPORTEUR')
-    for t in transporters:
-        writer.writerow([
-            t.slug,
-            t.presentation(),
-            t.email,
-            t.telephone,
-            "Oui" if t.is_verified else "Non",
-            "Oui" if t.is_approved else "Non",
-            "Actif" if t.is_active else "Inactif",
-            t.created_at
-        ])
-    
-    return response
+    return stream_csv(transporters, TRANSPORTERS_COLUMNS, "transporters-report.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1376,24 +1527,8 @@ def export_transporters_report(request):
 @is_admin
 def export_geographic_report(request):
     """Export geographic distribution report for admin"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="geographic-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Ville Collecte', 'Ville Livraison', 'Client', 'Statut', 'Date Création'])
-    
-    requests = TransportRequest.objects.all()
-    for r in requests:
-        writer.writerow([
-            r.slug,
-            r.pickup_city,
-            r.delivery_city,
-            r.client.presentation(),
-            r.status,
-            r.created_at
-        ])
-    
-    return response
+    requests = TransportRequest.objects.all().select_related('client')
+    return stream_csv(requests, GEOGRAPHIC_COLUMNS, "geographic-report.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1401,14 +1536,8 @@ def export_geographic_report(request):
 @is_admin
 def export_disputes_report(request):
     """Export disputes report for admin (Placeholder)"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="disputes-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Demandeur', 'Sujet', 'Statut', 'Date Création'])
     # No Dispute model yet, returning empty report with headers
-    
-    return response
+    return stream_csv([], DISPUTES_COLUMNS, "disputes-report.csv")
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1416,26 +1545,60 @@ def export_disputes_report(request):
 @is_admin
 def export_users_report(request):
     """Export all users report for admin"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="all-users-report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Nom Complet', 'Email', 'Téléphone', 'Rôle', 'Vérifié', 'Statut', 'Date Création'])
-    
     users = User.objects.all_with_deleted()
-    for u in users:
-        writer.writerow([
-            u.slug, 
-            u.presentation(), 
-            u.email, 
-            u.telephone, 
-            u.role, 
-            "Oui" if u.is_verified else "Non",
-            "Actif" if u.is_active else "Inactif", 
-            u.created_at
-        ])
-    
-    return response
+    return stream_csv(users, USERS_COLUMNS, "all-users-report.csv")
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@is_logged_in
+@is_admin
+def create_report_job(request):
+    """
+    Mettre en file la génération d'un rapport admin volumineux.
+    Un rapport identique récent (ou déjà en cours) est réutilisé.
+    """
+    try:
+        data = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Format JSON invalide.'}, status=400)
+
+    report_type = data.get('report_type')
+    if report_type not in REPORTS:
+        return JsonResponse({'error': f"Type de rapport invalide. Valeurs possibles : {', '.join(REPORTS)}"}, status=400)
+    try:
+        params = clean_params(data.get('params'))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': f"Paramètres invalides : {e}"}, status=400)
+
+    job, reused = request_report(report_type, params, request.user)
+    return JsonResponse({
+        'message': 'Rapport existant réutilisé.' if reused else 'Rapport mis en file de génération.',
+        'job': job.as_dict(),
+    }, status=200 if reused else 202)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+@is_admin
+def get_report_job(request, job_slug):
+    """Statut d'un rapport"""
+    job = ReportJob.objects.filter(slug=job_slug).first()
+    if not job:
+        return JsonResponse({'error': 'Rapport non trouvé.'}, status=404)
+    return JsonResponse({'message': 'Statut du rapport récupéré avec succès.', 'job': job.as_dict()}, status=200)
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+@is_admin
+def download_report_job(request, job_slug):
+    """Télécharger le fichier CSV d'un rapport terminé"""
+    job = ReportJob.objects.filter(slug=job_slug).first()
+    if not job:
+        return JsonResponse({'error': 'Rapport non trouvé.'}, status=404)
+    if job.status != 'DONE' or not job.file:
+        return JsonResponse({'error': "Le rapport n'est pas encore disponible.", 'status': job.status}, status=409)
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=f"{REPORTS[job.report_type][2]}.csv", content_type='text/csv')
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1487,6 +1650,7 @@ def validate_document(request, doc_slug):
 @require_http_methods(["POST"])
 @is_logged_in
 @is_client
+@idempotent
 def create_transport_request(request):
     """
     Créer une nouvelle demande de transport
@@ -1570,34 +1734,33 @@ def create_transport_request(request):
             recipient_email=recipient_email,
         )
         transport_request.full_clean()
-        transport_request.save()
-
-        # Créer notification pour tous les admins
-        admins = User.objects.filter(role__in=["ADMIN", "DATA ADMIN"])
-        for admin in admins:
-            Notification.objects.create(
-                user=admin,
-                title="Nouvelle demande de transport",
-                message=f"{request.user.presentation()} a créé une nouvelle demande: {transport_request.title}",
-                type="NEW_REQUEST"
-            )
+        with transaction.atomic():
+            transport_request.save()
+            record_request_change(None, transport_request)
+
+            # Débiter le wallet si estimated_price est fourni (un prix nul ne crée pas de mouvement)
+            # (solde revérifié sous verrou : deux demandes simultanées ne peuvent pas dépenser le même solde)
+            if estimated_price is not None and price_dec > 0:
+                ledger_debit(
+                    request.user,
+                    price_dec,
+                    description=f"Paiement demande {transport_request.slug}",
+                    reference=transport_request.slug
+                )
 
-        # Débiter le wallet si estimated_price est fourni
-        if estimated_price is not None:
-            wallet.balance = (wallet.balance or Decimal("0.00")) - price_dec
-            wallet.save()
-            WalletTransaction.objects.create(
-                wallet=wallet,
-                tx_type="DEBIT",
-                amount=price_dec,
-                description=f"Paiement demande {transport_request.slug}",
-                reference=transport_request.slug
-            )
+        # Créer notification pour tous les admins (insertion groupée, hors du chemin de la requête)
+        fan_out_admins(
+            title="Nouvelle demande de transport",
+            message=f"{request.user.presentation()} a créé une nouvelle demande: {transport_request.title}",
+            type="NEW_REQUEST"
+        )
         
         return JsonResponse({
             'message': 'Demande de transport créée avec succès.',
             'transport_request': transport_request.as_dict()
         }, status=201)
+    except InsufficientFunds:
+        return JsonResponse({'error': 'Solde insuffisant. Veuillez recharger votre portefeuille.'}, status=402)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
@@ -1637,20 +1800,23 @@ def get_transport_requests(request):
     city_filter = request.GET.get('city')
     priority_filter = request.GET.get('priority')
     
+    search_text = request.GET.get('q')
+    
     if status_filter:
         requests = requests.filter(status=status_filter)
     if city_filter:
-        requests = requests.filter(Q(pickup_city__icontains=city_filter) | Q(delivery_city__icontains=city_filter))
+        requests = filter_city(requests, city_filter)
     if priority_filter:
         requests = requests.filter(priority=priority_filter)
     
+    # Recherche plein texte : résultats triés par pertinence
+    if search_text:
+        return ranked_response(request, search_requests(requests, search_text), 'transport_requests', 'Liste des demandes récupérée avec succès.')
+    
     # Tri
     requests = requests.order_by('-created_at')
     
-    return JsonResponse({
-        'message': 'Liste des demandes récupérée avec succès.',
-        'transport_requests': [req.as_dict() for req in requests]
-    }, status=200)
+    return list_response(request, requests, 'transport_requests', 'Liste des demandes récupérée avec succès.')
 
 
 # ==================== DÉTAILS D'UNE DEMANDE ====================
@@ -1718,6 +1884,7 @@ def update_transport_request(request, request_slug):
         return JsonResponse({'error': 'Impossible de modifier une demande terminée.'}, status=400)
     
     data = json.loads(request.body)
+    kpi_before = request_state(transport_request)
     
     # Champs modifiables
     if 'title' in data:
@@ -1745,7 +1912,9 @@ def update_transport_request(request, request_slug):
     
     try:
         transport_request.full_clean()
-        transport_request.save()
+        with transaction.atomic():
+            transport_request.save()
+            record_request_change(kpi_before, transport_request)
         
         return JsonResponse({
             'message': 'Demande modifiée avec succès.',
@@ -1780,7 +1949,10 @@ def delete_transport_request(request, request_slug):
     if transport_request.status == 'IN_PROGRESS':
         return JsonResponse({'error': 'Impossible de supprimer une demande en cours de livraison.'}, status=400)
     
-    transport_request.delete()  # Soft delete
+    kpi_before = request_state(transport_request)
+    with transaction.atomic():
+        transport_request.delete()  # Soft delete
+        record_request_change(kpi_before, transport_request)
     
     return JsonResponse({
         'message': 'Demande supprimée avec succès.'
@@ -1827,31 +1999,46 @@ def assign_transporter(request, request_slug):
         return JsonResponse({'error': 'Seul un admin ou un transporteur peut assigner.'}, status=403)
     
     # Vérifier si pas déjà assigné
-    if transport_request.assigned_transporter:
+    if transport_request.assigned_transporter_id:
         return JsonResponse({'error': 'Un transporteur est déjà assigné à cette demande.'}, status=400)
     
-    # Assigner
+    # Assigner : UPDATE conditionnel, une seule requête concurrente peut l'emporter.
+    # La condition sur le statut lu garantit que l'historique et les KPI partent du bon état.
     old_status = transport_request.status
-    transport_request.assigned_transporter = transporter
-    transport_request.status = 'ASSIGNED'
-    transport_request.save()
-    
-    # Créer historique
-    RequestStatusHistory.objects.create(
-        transport_request=transport_request,
-        old_status=old_status,
-        new_status='ASSIGNED',
-        changed_by=user,
-        comment=f"Transporteur assigné: {transporter.presentation()}"
-    )
-    
-    # Notification pour le transporteur assigné
-    Notification.objects.create(
-        user=transporter,
-        title="Nouvelle mission assignée",
-        message=f"Une nouvelle mission vous a été assignée: {transport_request.title}",
-        type="ASSIGNED_MISSION"
-    )
+    kpi_before = request_state(transport_request)
+    now = timezone.now()
+    with transaction.atomic():
+        won = TransportRequest.objects.filter(
+            pk=transport_request.pk,
+            assigned_transporter__isnull=True,
+            status=old_status,
+        ).update(assigned_transporter=transporter, status='ASSIGNED', updated_at=now)
+        if not won:
+            if TransportRequest.objects.filter(pk=transport_request.pk, assigned_transporter__isnull=False).exists():
+                return JsonResponse({'error': 'Un transporteur est déjà assigné à cette demande.'}, status=400)
+            return JsonResponse({'error': 'La demande a été modifiée entre-temps, veuillez réessayer.'}, status=409)
+        
+        transport_request.assigned_transporter = transporter
+        transport_request.status = 'ASSIGNED'
+        transport_request.updated_at = now
+        record_request_change(kpi_before, transport_request)
+        
+        # Créer historique
+        RequestStatusHistory.objects.create(
+            transport_request=transport_request,
+            old_status=old_status,
+            new_status='ASSIGNED',
+            changed_by=user,
+            comment=f"Transporteur assigné: {transporter.presentation()}"
+        )
+        
+        # Notification pour le transporteur assigné
+        Notification.objects.create(
+            user=transporter,
+            title="Nouvelle mission assignée",
+            message=f"Une nouvelle mission vous a été assignée: {transport_request.title}",
+            type="ASSIGNED_MISSION"
+        )
 
     return JsonResponse({
         'message': 'Transporteur assigné avec succès.',
@@ -1916,17 +2103,27 @@ def update_status(request, request_slug):
     
     # Mettre à jour le statut
     old_status = transport_request.status
+    kpi_before = request_state(transport_request)
     transport_request.status = new_status
-    transport_request.save()
-    
-    # Créer historique
-    RequestStatusHistory.objects.create(
-        transport_request=transport_request,
-        old_status=old_status,
-        new_status=new_status,
-        changed_by=user,
-        comment=comment
-    )
+    # Statut, rollup KPI et historique écrits ensemble : un échec n'en laisse aucun à moitié
+    with transaction.atomic():
+        transport_request.save()
+        record_request_change(kpi_before, transport_request)
+        
+        # Créer historique
+        RequestStatusHistory.objects.create(
+            transport_request=transport_request,
+            old_status=old_status,
+            new_status=new_status,
+            changed_by=user,
+            comment=comment
+        )
+        if new_status == 'DELIVERED' and transport_request.assigned_transporter_id:
+            # La dernière livraison sert de point de départ au matching
+            invalidate_capability(transport_request.assigned_transporter_id)
+        if new_status == 'DELIVERED' and transport_request.tracker_imei:
+            # Trajet terminé : la trace est archivée en un blob compressé
+            schedule_archive(transport_request.pk)
     
     return JsonResponse({
         'message': 'Statut mis à jour avec succès.',
@@ -2040,10 +2237,7 @@ def get_my_requests(request):
     user = request.user
     requests = TransportRequest.objects.filter(client=user).order_by('-created_at')
     
-    return JsonResponse({
-        'message': 'Vos demandes récupérées avec succès.',
-        'transport_requests': [req.as_dict() for req in requests]
-    }, status=200)
+    return list_response(request, requests, 'transport_requests', 'Vos demandes récupérées avec succès.')
 
 
 # ==================== DEMANDES ASSIGNÉES (TRANSPORTEUR) ====================
@@ -2064,10 +2258,7 @@ def get_my_assigned_requests(request):
     
     requests = TransportRequest.objects.filter(assigned_transporter=user).order_by('-created_at')
     
-    return JsonResponse({
-        'message': 'Vos demandes assignées récupérées avec succès.',
-        'transport_requests': [req.as_dict() for req in requests]
-    }, status=200)
+    return list_response(request, requests, 'transport_requests', 'Vos demandes assignées récupérées avec succès.')
 
 
 # ==================== DEMANDES DISPONIBLES (TRANSPORTEUR) ====================
@@ -2094,20 +2285,91 @@ def get_available_requests(request):
     # Filtres optionnels
     city_filter = request.GET.get('city')
     priority_filter = request.GET.get('priority')
+    search_text = request.GET.get('q')
+    near = request.GET.get('near')
     
     if city_filter:
-        requests = requests.filter(
-            Q(pickup_city__icontains=city_filter) | Q(delivery_city__icontains=city_filter)
-        )
+        requests = filter_city(requests, city_filter)
     if priority_filter:
         requests = requests.filter(priority=priority_filter)
     
+    # Demandes proches d'un point : ?near=lat,lon&radius_km=
+    if near:
+        point = parse_coordinates(near)
+        try:
+            radius_km = float(request.GET.get('radius_km', NEAR_DEFAULT_RADIUS_KM))
+        except ValueError:
+            radius_km = -1
+        if point is None or not 0 < radius_km <= NEAR_MAX_RADIUS_KM:
+            return JsonResponse({'error': f'Paramètres invalides : near=lat,lon et 0 < radius_km <= {NEAR_MAX_RADIUS_KM}.'}, status=400)
+        requests = filter_near(requests, point[0], point[1], radius_km)
+    
+    if search_text:
+        return ranked_response(request, search_requests(requests, search_text), 'transport_requests', 'Demandes disponibles récupérées avec succès.')
+    if near:
+        return ranked_response(request, requests, 'transport_requests', 'Demandes disponibles récupérées avec succès.', score='distance_km')
+    
+    return list_response(request, requests, 'transport_requests', 'Demandes disponibles récupérées avec succès.')
+
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@is_logged_in
+@is_transporteur
+def get_matching_requests(request):
+    """
+    Demandes disponibles que le transporteur peut prendre en charge avec ses véhicules actifs,
+    triées par score de correspondance (capacité, conformité, proximité de sa dernière livraison, priorité)
+    Pagination : ?limit (défaut DEFAULT_PAGE_SIZE) et ?offset
+    """
+    user = request.user
+    
+    if not user.is_approved:
+        return JsonResponse({'error': 'Vous devez être approuvé par un administrateur.'}, status=403)
+    
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.GET.get('offset', 0))
+        if limit <= 0 or offset < 0:
+            raise ValueError(limit)
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres de pagination invalides (limit ou offset).'}, status=400)
+    
+    requests = TransportRequest.objects.filter(
+        assigned_transporter__isnull=True,
+        status__in=['PENDING', 'OFFERS_RECEIVED']
+    )
+    city_filter = request.GET.get('city')
+    priority_filter = request.GET.get('priority')
+    if city_filter:
+        requests = filter_city(requests, city_filter)
+    if priority_filter:
+        requests = requests.filter(priority=priority_filter)
+    
+    ranked = rank_requests(user.id, requests)
+    page = ranked[offset:offset + limit]
+    objects = TransportRequest.objects.in_bulk([row[0] for row in page])
+    results = []
+    for pk, match_score, capacity, compliant, distance in page:
+        if pk not in objects:
+            continue
+        data = objects[pk].as_dict()
+        data['match_score'] = round(match_score, 4)
+        data['match'] = {
+            'vehicle_capacity_kg': capacity,
+            'vehicle_compliant': compliant,
+            'distance_km': round(distance, 2) if distance is not None else None,
+        }
+        results.append(data)
+    
     return JsonResponse({
-        'message': 'Demandes disponibles récupérées avec succès.',
-        'transport_requests': [req.as_dict() for req in requests]
+        'message': 'Demandes correspondant à vos véhicules récupérées avec succès.',
+        'transport_requests': results,
+        'total': len(ranked),
+        'next_offset': offset + limit if len(ranked) > offset + limit else None,
     }, status=200)
 
-
 # ==================== STATISTIQUES (ADMIN) ====================
 
 @csrf_exempt
@@ -2119,42 +2381,21 @@ def get_statistics(request):
     Récupérer les statistiques des demandes de transport
     Réservé aux admins
     """
-    total_requests = TransportRequest.objects.count()
-    
-    # Statistiques par statut
-    stats_by_status = {}
-    for status_code, status_label in TransportRequest.STATUS_CHOICES:
-        count = TransportRequest.objects.filter(status=status_code).count()
-        stats_by_status[status_code] = {
-            'label': status_label,
-            'count': count
-        }
-    
-    # Statistiques par priorité
-    stats_by_priority = {}
-    for priority_code, priority_label in TransportRequest.PRIORITY_LEVELS:
-        count = TransportRequest.objects.filter(priority=priority_code).count()
-        stats_by_priority[priority_code] = {
-            'label': priority_label,
-            'count': count
-        }
-    
-    # Statistiques par type de marchandise
-    stats_by_merchandise = {}
-    for merch_code, merch_label in TransportRequest.MERCHANDISE_TYPES:
-        count = TransportRequest.objects.filter(merchandise_type=merch_code).count()
-        stats_by_merchandise[merch_code] = {
-            'label': merch_label,
-            'count': count
-        }
-    
-    # Demandes ce mois
-    from datetime import date
+    # Toutes les répartitions en une seule requête (COUNT ... FILTER)
     now = timezone.now()
-    this_month = TransportRequest.objects.filter(
-        created_at__year=now.year,
-        created_at__month=now.month
-    ).count()
+    row = compute(
+        TransportRequest.objects.all(),
+        total=Count('pk'),
+        this_month=count_if(created_at__year=now.year, created_at__month=now.month),
+        **choice_counts('status', TransportRequest.STATUS_CHOICES),
+        **choice_counts('priority', TransportRequest.PRIORITY_LEVELS),
+        **choice_counts('merchandise_type', TransportRequest.MERCHANDISE_TYPES),
+    )
+    total_requests = row['total']
+    this_month = row['this_month']
+    stats_by_status = choice_breakdown(row, 'status', TransportRequest.STATUS_CHOICES)
+    stats_by_priority = choice_breakdown(row, 'priority', TransportRequest.PRIORITY_LEVELS)
+    stats_by_merchandise = choice_breakdown(row, 'merchandise_type', TransportRequest.MERCHANDISE_TYPES)
     
     return JsonResponse({
         'message': 'Statistiques récupérées avec succès.',
@@ -2176,36 +2417,49 @@ def get_admin_kpis(request):
     """
     Récupérer les KPIs globaux pour le dashboard admin
     """
-    from africa_logistic.models import User, TransportRequest
-    from django.db.models import Sum
-    
-    # Counts by role
-    total_clients = User.objects.filter(role__in=['PME', 'PARTICULIER', 'AGRICULTEUR', 'CLIENT']).count()
-    total_transporters = User.objects.filter(role__iexact='TRANSPORTEUR').count()
-    total_moderators = User.objects.filter(role__iexact='MODERATOR').count()
+    client_roles = ['PME', 'PARTICULIER', 'AGRICULTEUR', 'CLIENT']
+    today = timezone.localdate()
     
-    # Request stats
-    total_requests = TransportRequest.objects.count()
-    completed_requests = TransportRequest.objects.filter(status__iexact='DELIVERED').count()
-    pending_requests = TransportRequest.objects.filter(status__iexact='PENDING').count()
-    in_progress_requests = TransportRequest.objects.filter(status__in=['ASSIGNED', 'IN_PROGRESS', 'assigned', 'in_progress']).count()
+    # Counts by role (1 requête)
+    users = compute(
+        User.objects.all(),
+        clients=count_if(role__in=client_roles),
+        transporters=count_if(role__iexact='TRANSPORTEUR'),
+        moderators=count_if(role__iexact='MODERATOR'),
+    )
+    total_clients = users['clients']
+    total_transporters = users['transporters']
+    total_moderators = users['moderators']
     
+    # Request stats et soldes : somme du rollup KpiSnapshot (1 requête, indépendante de l'historique)
     # Revenue (using estimated_price as fallback since no platform_commission field yet)
     # In a real app, you'd have a commission field
-    total_revenue = TransportRequest.objects.filter(status__iexact='DELIVERED').aggregate(total=Sum('estimated_price'))['total'] or 0
+    rollup = compute(
+        KpiSnapshot.objects.all(),
+        total=Sum('request_count'),
+        completed=sum_if('request_count', Q(status__iexact='DELIVERED')),
+        pending=sum_if('request_count', Q(status__iexact='PENDING')),
+        in_progress=sum_if('request_count', Q(status__in=['ASSIGNED', 'IN_PROGRESS', 'assigned', 'in_progress'])),
+        revenue=Sum('revenue'),
+        today=sum_if('created_count', Q(day=today)),
+        client_balance=sum_if('balance', Q(role__in=client_roles)),
+        transporter_balance=sum_if('balance', Q(role__iexact='TRANSPORTEUR')),
+    )
+    total_requests = rollup['total']
+    completed_requests = rollup['completed']
+    pending_requests = rollup['pending']
+    in_progress_requests = rollup['in_progress']
+    total_revenue = rollup['revenue']
+    today_requests = rollup['today']
     
     # Delivery rate
     delivery_rate = 0
     if total_requests > 0:
         delivery_rate = (completed_requests / total_requests) * 100
     
-    # Today's new requests
-    today = timezone.now().date()
-    today_requests = TransportRequest.objects.filter(created_at__date=today).count()
-    
     # Wallets info
-    total_client_balance = Wallet.objects.filter(user__role__in=['PME', 'PARTICULIER', 'AGRICULTEUR', 'CLIENT']).aggregate(total=Sum('balance'))['total'] or 0
-    total_transporter_balance = Wallet.objects.filter(user__role__iexact='TRANSPORTEUR').aggregate(total=Sum('balance'))['total'] or 0
+    total_client_balance = rollup['client_balance']
+    total_transporter_balance = rollup['transporter_balance']
     
     return JsonResponse({
         'total_clients': total_clients,
@@ -2248,7 +2502,9 @@ def restore_deleted_request(request, request_slug):
     
     transport_request.is_active = True
     transport_request.deleted_at = None
-    transport_request.save()
+    with transaction.atomic():
+        transport_request.save()
+        record_request_change(None, transport_request)
     
     return JsonResponse({
         'message': 'Demande restaurée avec succès.',
@@ -2290,10 +2546,7 @@ def get_all_requests_by_admin(request):
     if transporter_slug:
         requests = requests.filter(assigned_transporter__slug=transporter_slug)
     
-    return JsonResponse({
-        'message': 'Toutes les demandes récupérées avec succès.',
-        'transport_requests': [req.as_dict() for req in requests]
-    }, status=200)
+    return list_response(request, requests, 'transport_requests', 'Toutes les demandes récupérées avec succès.')
 
 
 # ==================== ANNULER UNE DEMANDE ====================
@@ -2330,17 +2583,20 @@ def cancel_request(request, request_slug):
     
     # Changer le statut
     old_status = transport_request.status
+    kpi_before = request_state(transport_request)
     transport_request.status = 'CANCELLED'
-    transport_request.save()
-    
-    # Créer historique
-    RequestStatusHistory.objects.create(
-        transport_request=transport_request,
-        old_status=old_status,
-        new_status='CANCELLED',
-        changed_by=user,
-        comment=reason
-    )
+    with transaction.atomic():
+        transport_request.save()
+        record_request_change(kpi_before, transport_request)
+        
+        # Créer historique
+        RequestStatusHistory.objects.create(
+            transport_request=transport_request,
+            old_status=old_status,
+            new_status='CANCELLED',
+            changed_by=user,
+            comment=reason
+        )
     
     return JsonResponse({
         'message': 'Demande annulée avec succès.',
@@ -2505,6 +2761,7 @@ def create_vehicle(request):
         )
         vehicle.full_clean()
         vehicle.save()
+        invalidate_capability(vehicle.owner_id)
         
         return JsonResponse({
             'message': 'Véhicule créé avec succès.',
@@ -2536,7 +2793,7 @@ def get_vehicles(request):
     
     return JsonResponse({
         'message': 'Liste des véhicules récupérée avec succès.',
-        'vehicles': [v.as_dict() for v in vehicles]
+        'vehicles': project(vehicles)
     }, status=200)
 
 
@@ -2630,6 +2887,7 @@ def update_vehicle(request, vehicle_slug):
     try:
         vehicle.full_clean()
         vehicle.save()
+        invalidate_capability(vehicle.owner_id)
         
         return JsonResponse({
             'message': 'Véhicule modifié avec succès.',
@@ -2659,6 +2917,7 @@ def delete_vehicle(request, vehicle_slug):
             return JsonResponse({'error': 'Vous ne pouvez supprimer que vos propres véhicules.'}, status=403)
     
     vehicle.delete()  # Soft delete
+    invalidate_capability(vehicle.owner_id)
     
     return JsonResponse({
         'message': 'Véhicule supprimé avec succès.'
@@ -2947,6 +3206,7 @@ def approve_transporter(request, transporter_slug):
     transporter.approved_by = user
     transporter.approved_at = timezone.now()
     transporter.save()
+    invalidate_user(transporter)
     
     # Envoyer un email de confirmation
     try:
@@ -3044,7 +3304,7 @@ def get_all_wallets_by_admin(request):
     
     return JsonResponse({
         'message': 'Liste des portefeuilles récupérée avec succès.',
-        'wallets': [w.as_dict(include_related=True) for w in wallets]
+        'wallets': project(wallets, include_related=True)
     }, status=200)
 
 @csrf_exempt
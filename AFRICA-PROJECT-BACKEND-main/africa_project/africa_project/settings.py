@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     
     'africa_logistic.apps.AfricaLogisticConfig',
@@ -151,6 +152,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -167,3 +169,11 @@ EMAIL_HOST_PASSWORD = 'fvqn wkqa ftvk lexs'  # Utiliser un mot de passe d'applic
 DEFAULT_FROM_EMAIL = "AFRICA PROJECT"
 # EMAIL_USE_SSL = False
 # EMAIL_TIMEOUT = 5
+
+# Cache partagé (alias de CACHES) pour la résolution des sessions, ex : "default" avec Redis.
+# None : seul le cache mémoire de chaque worker est utilisé.
+SESSION_CACHE_ALIAS = None
+
+# Jeton partagé des trackers GPS pour l'endpoint d'ingestion des positions (en-tête X-Tracker-Token).
+# Vide : ingestion désactivée.
+TRACKER_INGEST_TOKEN = ''
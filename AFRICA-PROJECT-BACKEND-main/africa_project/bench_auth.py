@@ -0,0 +1,71 @@
+"""
+Micro-benchmark de la résolution des tokens (is_logged_in).
+Usage : python bench_auth.py [10000 100000 1000000]
+Crée les sessions de test dans la base configurée puis les supprime à la fin.
+"""
+import os
+import random
+import sys
+import time
+import uuid
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from africa_logistic.models import User, UserConnect
+from africa_logistic.session_cache import get_session_user, _local_sessions
+
+SIZES = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+SAMPLES = 2000
+BATCH = 10_000
+PREFIX = 'bench-auth-'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def fill_sessions(user, target):
+    current = UserConnect.objects.filter(slug__startswith=PREFIX).count()
+    while current < target:
+        size = min(BATCH, target - current)
+        UserConnect.objects.bulk_create(
+            [UserConnect(user=user, slug=f"{PREFIX}{uuid.uuid4().hex}") for _ in range(size)]
+        )
+        current += size
+
+
+def measure(func, tokens):
+    timings = []
+    for token in tokens:
+        start = time.perf_counter()
+        func(token)
+        timings.append((time.perf_counter() - start) * 1000)
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def main():
+    user, created = User.objects.get_or_create(email='bench-auth@example.com', defaults={'role': 'PME', 'password': 'Bench@1234'})
+    try:
+        for size in SIZES:
+            fill_sessions(user, size)
+            tokens = random.sample(list(UserConnect.objects.filter(slug__startswith=PREFIX).values_list('slug', flat=True)), SAMPLES)
+
+            db_p50, db_p99 = measure(UserConnect.objects.get_user_for_token, tokens)
+
+            _local_sessions.clear()
+            for token in tokens:
+                get_session_user(token)
+            cache_p50, cache_p99 = measure(get_session_user, tokens)
+
+            print(f"{size:>9} sessions | DB (1 requête) p50={db_p50:.3f}ms p99={db_p99:.3f}ms | cache p50={cache_p50:.4f}ms p99={cache_p99:.4f}ms")
+    finally:
+        UserConnect.objects.all_with_deleted().filter(slug__startswith=PREFIX).hard_delete()
+        if created:
+            user.hard_delete()
+
+
+if __name__ == '__main__':
+    main()
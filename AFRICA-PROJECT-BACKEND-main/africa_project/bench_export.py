@@ -0,0 +1,74 @@
+"""
+Benchmark du moteur d'export CSV en flux (exports.py) : mémoire maximale (RSS) et débit.
+Usage : python bench_export.py [nombre_de_demandes]
+Crée des demandes synthétiques dans la base configurée puis les supprime à la fin.
+"""
+import os
+import resource
+import sys
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.utils import timezone
+from africa_logistic.exports import csv_rows, ADMIN_REQUESTS_COLUMNS
+from africa_logistic.models import TransportRequest, User
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 10_000
+PREFIX = 'bench-export-'
+
+
+def peak_rss_mb():
+    # ru_maxrss est exprimé en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(client):
+    pickup = timezone.now() + timedelta(days=1)
+    created = 0
+    while created < ROWS:
+        size = min(BATCH, ROWS - created)
+        TransportRequest.objects.bulk_create([
+            TransportRequest(
+                slug=f"{PREFIX}{uuid.uuid4().hex}", client=client, title=f"Demande {created + i}",
+                merchandise_description='Marchandise', weight=Decimal('100'), volume=Decimal('1'),
+                pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2', delivery_city='Parakou',
+                preferred_pickup_date=pickup, recipient_name='Destinataire', recipient_phone='+22990000000',
+                estimated_price=Decimal('15000'),
+            )
+            for i in range(size)
+        ])
+        created += size
+
+
+def main():
+    client, created = User.objects.get_or_create(email='bench-export@example.com', defaults={'role': 'PME', 'password': 'Bench@1234'})
+    try:
+        seed(client)
+        queryset = TransportRequest.objects.all_with_deleted().filter(slug__startswith=PREFIX).select_related('client', 'assigned_transporter')
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        size = 0
+        lines = 0
+        for line in csv_rows(queryset, ADMIN_REQUESTS_COLUMNS):
+            size += len(line)
+            lines += 1
+        elapsed = time.perf_counter() - start
+
+        print(f"{lines - 1} lignes, {size / 1024 / 1024:.1f} Mo de CSV en {elapsed:.1f}s ({(lines - 1) / elapsed:.0f} lignes/s)")
+        print(f"RSS max avant export : {rss_before:.1f} Mo | après export : {peak_rss_mb():.1f} Mo")
+    finally:
+        TransportRequest.objects.all_with_deleted().filter(slug__startswith=PREFIX).hard_delete()
+        if created:
+            client.hard_delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark de l'évaluation des zones de collecte / livraison (geofence.py) : positions évaluées par seconde.
+Usage : python bench_geofence.py [nombre_de_zones] [nombre_de_positions]
+Les zones et les positions sont construites en mémoire : aucune base de données n'est nécessaire.
+"""
+import os
+import random
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from africa_logistic.geofence import Fence, FenceIndex
+
+FENCES = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+FIXES = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+
+def main():
+    random.seed(1)
+    # Zones réparties sur le Bénin, un tracker par demande ; la moitié des positions viennent de trackers sans zone
+    fences = {}
+    for i in range(FENCES):
+        fences[(i, 'ASSIGNED')] = Fence(i, f'86{i:013d}', 'ASSIGNED', random.uniform(6.2, 12.0), random.uniform(1.0, 3.8))
+    start = time.perf_counter()
+    index = FenceIndex(fences)
+    print(f"{FENCES} zones indexées en {(time.perf_counter() - start) * 1000:.0f}ms ({len(index.grid)} cellules)")
+
+    fixes = []
+    for _ in range(FIXES):
+        fence = fences[(random.randrange(FENCES), 'ASSIGNED')]
+        if random.random() < 0.5:
+            fixes.append((f'35{random.randrange(FENCES):013d}', 0, fence.lat, fence.lon))
+        elif random.random() < 0.02:
+            fixes.append((fence.imei, 0, fence.lat + random.gauss(0, 0.002), fence.lon + random.gauss(0, 0.002)))
+        else:
+            fixes.append((fence.imei, 0, random.uniform(6.2, 12.0), random.uniform(1.0, 3.8)))
+
+    start = time.perf_counter()
+    confirmed = 0
+    imeis = index.imeis
+    for imei, _, lat, lon in fixes:
+        if imei in imeis:
+            confirmed += len(index.evaluate(imei, lat, lon))
+    elapsed = time.perf_counter() - start
+    print(f"{FIXES} positions évaluées en {elapsed * 1000:.0f}ms ({FIXES / elapsed:,.0f} positions/s), {confirmed} entrées confirmées")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark du moteur de matching transporteur / demande (matching.py) : temps de classement des demandes
+disponibles avec un profil de capacité en cache.
+Usage : python bench_matching.py [nombre_de_demandes]   (5 000 par défaut)
+Crée des demandes et un transporteur synthétiques dans la base configurée puis les supprime à la fin.
+"""
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.utils import timezone
+from africa_logistic.geo import geohash
+from africa_logistic.matching import build_capability, invalidate_capability, rank_requests
+from africa_logistic.models import TransportRequest, User, Vehicle, assign_slugs
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+BATCH = 10_000
+REPEAT = 20
+PREFIX = 'bench-matching-'
+
+
+def seed(client, transporter):
+    today = timezone.localdate()
+    Vehicle.objects.bulk_create(assign_slugs([
+        Vehicle(owner=transporter, type='TRUCK', brand='B', model='M', plate_number=f'{PREFIX}1', capacity_kg=Decimal('10000'),
+                insurance_expiry=today + timedelta(days=90), inspection_expiry=today + timedelta(days=90)),
+        Vehicle(owner=transporter, type='VAN', brand='B', model='M', plate_number=f'{PREFIX}2', capacity_kg=Decimal('1500'),
+                insurance_expiry=today - timedelta(days=1), inspection_expiry=today + timedelta(days=90)),
+        Vehicle(owner=transporter, type='MOTORBIKE', brand='B', model='M', plate_number=f'{PREFIX}3', capacity_kg=Decimal('150')),
+    ]))
+    pickup = timezone.now() + timedelta(days=1)
+    types = [value for value, _ in TransportRequest.MERCHANDISE_TYPES]
+    for start in range(0, ROWS, BATCH):
+        requests = []
+        for i in range(start, min(start + BATCH, ROWS)):
+            lat, lon = random.uniform(6.2, 12.4), random.uniform(0.8, 3.8)
+            requests.append(TransportRequest(
+                client=client, title=f'Demande {i}', merchandise_description='Marchandise',
+                weight=Decimal(random.choice([20, 80, 400, 1200, 5000, 15000])), volume=Decimal('1'),
+                merchandise_type=random.choice(types), priority=random.choice(['LOW', 'NORMAL', 'HIGH', 'URGENT']),
+                pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2', delivery_city='Parakou',
+                pickup_lat=lat, pickup_lon=lon, pickup_geohash=geohash(lat, lon),
+                preferred_pickup_date=pickup, recipient_name='Destinataire', recipient_phone='+22990000000',
+            ))
+        TransportRequest.objects.bulk_create(assign_slugs(requests))
+    # Dernière livraison du transporteur (point de départ du score de proximité)
+    TransportRequest.objects.bulk_create(assign_slugs([TransportRequest(
+        client=client, assigned_transporter=transporter, status='DELIVERED', title='Livrée', merchandise_description='M',
+        weight=Decimal('100'), volume=Decimal('1'), pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2',
+        delivery_city='Parakou', delivery_lat=9.3372, delivery_lon=2.6303, delivery_city_key='parakou',
+        preferred_pickup_date=pickup, recipient_name='Destinataire', recipient_phone='+22990000000',
+    )]))
+
+
+def main():
+    client, client_created = User.objects.get_or_create(email=f'{PREFIX}client@example.com', defaults={'role': 'PME', 'password': 'Bench@1234'})
+    transporter, transporter_created = User.objects.get_or_create(email=f'{PREFIX}transporteur@example.com', defaults={'role': 'TRANSPORTEUR', 'password': 'Bench@1234'})
+    try:
+        seed(client, transporter)
+        available = TransportRequest.objects.filter(client=client, assigned_transporter__isnull=True, status__in=['PENDING', 'OFFERS_RECEIVED'])
+
+        start = time.perf_counter()
+        build_capability(transporter.id)
+        print(f"Profil de capacité calculé en {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        invalidate_capability(transporter.id)
+        ranked = rank_requests(transporter.id, available)
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            ranked = rank_requests(transporter.id, available)
+        elapsed = (time.perf_counter() - start) / REPEAT * 1000
+        print(f"{ROWS} demandes disponibles, {len(ranked)} transportables classées en {elapsed:.2f} ms (profil en cache)")
+        print("Meilleures correspondances :", [(pk, round(value, 3)) for pk, value, *_ in ranked[:5]])
+    finally:
+        TransportRequest.objects.all_with_deleted().filter(client=client).hard_delete()
+        Vehicle.objects.all_with_deleted().filter(owner=transporter).hard_delete()
+        if client_created:
+            client.hard_delete()
+        if transporter_created:
+            transporter.hard_delete()
+
+
+if __name__ == '__main__':
+    main()
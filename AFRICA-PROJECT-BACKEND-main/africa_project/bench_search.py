@@ -0,0 +1,92 @@
+"""
+Benchmark de la recherche de demandes (search.py) : filtre ?city= historique (icontains), clés de ville normalisées
+et recherche plein texte ?q= classée par pertinence.
+Usage : python bench_search.py [nombre_de_demandes]   (1 000 000 par défaut, PostgreSQL)
+Crée des demandes synthétiques dans la base configurée puis les supprime à la fin.
+"""
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from africa_logistic.configs import BENIN_CITIES
+from africa_logistic.models import TransportRequest, User, assign_slugs
+from africa_logistic.search import filter_city, normalize_city, search_requests
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 10_000
+REPEAT = 20
+WORDS = ['maïs', 'ciment', 'riz', 'coton', 'ananas', 'tôles', 'igname', 'huile', 'sable', 'meubles', 'carburant', 'poisson']
+
+
+def city_variants():
+    # Écritures réelles d'une même ville : casse, accents, alias
+    variants = []
+    for canonical, aliases in BENIN_CITIES.items():
+        variants.extend([canonical, canonical.upper(), canonical.lower()] + list(aliases))
+    return variants
+
+
+def seed(client):
+    cities = city_variants()
+    pickup = timezone.now() + timedelta(days=1)
+    for start in range(0, ROWS, BATCH):
+        requests = []
+        for i in range(start, min(start + BATCH, ROWS)):
+            pickup_city, delivery_city = random.choice(cities), random.choice(cities)
+            words = random.sample(WORDS, 3)
+            requests.append(TransportRequest(
+                client=client, title=f"Transport de {words[0]} {i}",
+                merchandise_description=f"Sacs de {words[1]} et {words[2]}", weight=Decimal('100'), volume=Decimal('1'),
+                pickup_address=f"Quartier {i % 500}", pickup_city=pickup_city, delivery_address=f"Marché {i % 300}", delivery_city=delivery_city,
+                # bulk_create ne passe pas par save() : les clés sont calculées ici
+                pickup_city_key=normalize_city(pickup_city), delivery_city_key=normalize_city(delivery_city),
+                preferred_pickup_date=pickup, recipient_name='Destinataire', recipient_phone='+22990000000',
+            ))
+        TransportRequest.objects.bulk_create(assign_slugs(requests))
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {TransportRequest._meta.db_table}')
+
+
+def timed(label, build):
+    queryset = build()[:50]
+    list(queryset)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        rows = list(build()[:50])
+    elapsed = (time.perf_counter() - start) / REPEAT * 1000
+    plan = queryset.explain().splitlines()
+    print(f"{label:<45} {elapsed:8.2f} ms  {len(rows):3d} lignes | {plan[0].strip()[:70]}")
+
+
+def main():
+    client, created = User.objects.get_or_create(email='bench-search@example.com', defaults={'role': 'PME', 'password': 'Bench@1234'})
+    base = lambda: TransportRequest.objects.filter(client=client).order_by('-created_at')
+    try:
+        start = time.perf_counter()
+        seed(client)
+        print(f"{ROWS} demandes créées en {time.perf_counter() - start:.0f}s")
+
+        timed("city=porto novo (icontains historique)", lambda: base().filter(Q(pickup_city__icontains='porto novo') | Q(delivery_city__icontains='porto novo')))
+        timed("city=porto novo (clés normalisées)", lambda: filter_city(base(), 'porto novo'))
+        timed("city=bossito (icontains, index trigram)", lambda: filter_city(base(), 'bossito'))
+        if connection.vendor == 'postgresql':
+            timed("q=maïs cotonou (plein texte classé)", lambda: search_requests(TransportRequest.objects.filter(client=client), 'maïs cotonou'))
+            timed("q=\"huile\" -sable (plein texte classé)", lambda: search_requests(TransportRequest.objects.filter(client=client), '"huile" -sable'))
+    finally:
+        TransportRequest.objects.all_with_deleted().filter(client=client).hard_delete()
+        if created:
+            client.hard_delete()
+
+
+if __name__ == '__main__':
+    main()
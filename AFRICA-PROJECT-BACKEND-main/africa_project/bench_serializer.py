@@ -0,0 +1,101 @@
+"""
+Benchmark du sérialiseur précompilé (serializers.py) contre l'ancien as_dict réflexif.
+Usage : python bench_serializer.py [nombre_de_lignes]
+Les objets sont construits en mémoire : aucune base de données n'est nécessaire.
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from africa_logistic.models import TransportRequest, User, Vehicle
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+
+def legacy_as_dict(self, include_related=False, exclude=None):
+    # Copie de l'implémentation réflexive historique de BaseModel.as_dict
+    data = {}
+    exclude = exclude or []
+
+    for field in self._meta.get_fields():
+        field_name = field.name
+
+        if field_name in exclude:
+            continue
+
+        if hasattr(field, "attname"):
+            value = getattr(self, field_name, None)
+
+            if isinstance(value, (datetime, date)):
+                data[field_name] = value.isoformat() if value else None
+            elif field.is_relation and not field.many_to_many and not field.one_to_many:
+                if include_related and hasattr(value, "as_dict"):
+                    data[field_name] = value.as_dict()
+                else:
+                    data[field_name] = value.pk if value else None
+            elif isinstance(field, (models.FileField, models.ImageField)):
+                if value and hasattr(value, "url"):
+                    request = getattr(self, '_request', None)
+                    if request:
+                        data[field_name] = request.build_absolute_uri(value.url)
+                    else:
+                        media_url = value.url if value.url.startswith('http') else f"http://localhost:8000/{settings.MEDIA_URL}{value.name}"
+                        data[field_name] = media_url if value and value.name else None
+                else:
+                    data[field_name] = None
+            elif isinstance(value, (str, int, float, bool)):
+                data[field_name] = value
+            else:
+                data[field_name] = None
+
+    return data
+
+
+def build_rows(n):
+    now = timezone.now()
+    client = User(id=1, slug='obj-client', firstname='Awa', email='awa@example.com', role='PME', created_at=now, updated_at=now)
+    rows = []
+    for i in range(n):
+        rows.append(TransportRequest(
+            id=i + 1, slug=f'obj-{i:012d}', client=client, title=f'Demande {i}',
+            merchandise_description='Sacs de maïs', weight=Decimal('120.50'), volume=Decimal('2.00'),
+            pickup_address='Rue 12', pickup_city='Cotonou', delivery_address='Rue 4', delivery_city='Parakou',
+            preferred_pickup_date=now + timedelta(days=1), recipient_name='Koffi', recipient_phone='+22990000000',
+            estimated_price=Decimal('25000') if i % 2 else None, created_at=now, updated_at=now,
+        ))
+    return rows
+
+
+def timed(func, rows):
+    start = time.perf_counter()
+    out = [func(r) for r in rows]
+    return time.perf_counter() - start, out
+
+
+def main():
+    rows = build_rows(ROWS)
+
+    # Parité sur d'autres formes de modèles (fichier, exclusions, FK imbriquées)
+    vehicle = Vehicle(id=1, slug='obj-v', owner=rows[0].client, plate_number='AB-123', capacity_kg=Decimal('3000'), photo='vehicles/v.jpg', insurance_expiry=date(2030, 1, 1))
+    for obj, kwargs in [(vehicle, {}), (vehicle, {'include_related': True}), (rows[0].client, {'exclude': ['password']}), (rows[0], {'include_related': True})]:
+        assert json.dumps(obj.as_dict(**kwargs)) == json.dumps(legacy_as_dict(obj, **kwargs)), obj
+
+    legacy_time, legacy_out = timed(legacy_as_dict, rows)
+    compiled_time, compiled_out = timed(lambda r: r.as_dict(), rows)
+    assert json.dumps(legacy_out) == json.dumps(compiled_out), "Sorties différentes"
+
+    print(f"{ROWS} TransportRequest : réflexif {legacy_time * 1000:.1f}ms | précompilé {compiled_time * 1000:.1f}ms | x{legacy_time / compiled_time:.2f}")
+
+
+if __name__ == '__main__':
+    main()
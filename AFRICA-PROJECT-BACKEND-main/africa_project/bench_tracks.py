@@ -0,0 +1,69 @@
+"""
+Benchmark des traces de trajet (tracks.py) : simplification par niveau de zoom et taille de l'archive.
+Usage : python bench_tracks.py [nombre_de_positions]
+La trace (un camion toutes les 5 s avec dérive GPS et arrêts) est construite en mémoire :
+aucune base de données n'est nécessaire.
+"""
+import math
+import os
+import random
+import sys
+import time
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from africa_logistic.configs import TRACK_ARCHIVE_TOLERANCE_M
+from africa_logistic.tracks import decode_track, encode_track, simplify, tolerance_for_zoom
+
+POINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+# Taille approximative d'une ligne de position en base (clé, coordonnées, vitesse, cap, en-tête de ligne)
+ROW_BYTES = 60
+
+
+def build_track(n):
+    random.seed(1)
+    lat, lon, heading, ts = 6.37, 2.39, 0.3, 1_700_000_000
+    points = []
+    for i in range(n):
+        stopped = (i // 500) % 6 == 5
+        if not stopped:
+            heading += random.uniform(-0.05, 0.05)
+            lat += math.cos(heading) * 1.2e-4
+            lon += math.sin(heading) * 1.2e-4
+        points.append((lat + random.gauss(0, 2e-5), lon + random.gauss(0, 2e-5), ts))
+        ts += 5
+    return points
+
+
+def main():
+    points = build_track(POINTS)
+
+    start = time.perf_counter()
+    stored = simplify(points, TRACK_ARCHIVE_TOLERANCE_M)
+    blob = encode_track(stored)
+    archive_time = time.perf_counter() - start
+    print(f"{POINTS} positions -> {len(stored)} points archivés, {len(blob) / 1024:.1f} Ko "
+          f"(~{POINTS * ROW_BYTES / 1024 / 1024:.1f} Mo en lignes) en {archive_time * 1000:.0f}ms")
+
+    start = time.perf_counter()
+    decoded = decode_track(blob)
+    print(f"Décodage : {(time.perf_counter() - start) * 1000:.1f}ms")
+    assert len(decoded) == len(stored)
+    assert all(abs(a[0] - b[0]) < 1e-5 and abs(a[1] - b[1]) < 1e-5 and a[2] == b[2] for a, b in zip(decoded, stored))
+
+    for zoom in (8, 12, 15, 18):
+        tolerance = tolerance_for_zoom(zoom, points[0][0])
+        start = time.perf_counter()
+        from_raw = simplify(points, tolerance)
+        raw_time = time.perf_counter() - start
+        start = time.perf_counter()
+        from_archive = simplify(decoded, tolerance)
+        archive_time = time.perf_counter() - start
+        print(f"zoom {zoom:2d} ({tolerance:7.1f} m) : brut {len(from_raw):5d} pts en {raw_time * 1000:6.1f}ms | "
+              f"archive {len(from_archive):5d} pts en {archive_time * 1000:6.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
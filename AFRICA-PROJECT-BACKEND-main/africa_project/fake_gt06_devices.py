@@ -0,0 +1,158 @@
+"""
+Générateur de charge GT06 : des terminaux fictifs se connectent au serveur run_tracker_server,
+s'identifient puis envoient positions et battements de cœur en attendant chaque accusé de réception.
+Usage : python fake_gt06_devices.py [--host 127.0.0.1] [--port 5023] [--devices 2000] [--interval 1] [--seconds 30]
+Le serveur n'accepte que les IMEI associés à une demande en cours : des demandes synthétiques liées aux IMEI
+simulés sont créées, puis on attend le rechargement de la liste par le serveur avant de se connecter.
+Affiche les connexions tenues, le débit de paquets et la latence des accusés ; les demandes sont supprimées
+à la fin et --cleanup supprime aussi les positions simulées de la base configurée.
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.db import connection
+from django.utils import timezone
+from africa_logistic import gt06
+from africa_logistic.configs import TRACKER_SERVER_ALLOWLIST_REFRESH_SECONDS, TRACKER_SERVER_PORT
+from africa_logistic.models import TransportRequest, User, assign_slugs
+from africa_logistic.tracking import TRACKER_TABLE
+
+IMEI_PREFIX = '990001'
+HEARTBEAT_EVERY = 30
+BATCH = 5000
+
+
+def device_imei(index):
+    return f'{IMEI_PREFIX}{index:09d}'
+
+
+def register_devices(client, count):
+    # Une demande en cours par terminal simulé : condition d'acceptation par le serveur
+    pickup = timezone.now()
+    for start in range(0, count, BATCH):
+        requests = [
+            TransportRequest(
+                client=client, title=f"Test GT06 {index}", merchandise_description='Charge simulée',
+                weight=Decimal('100'), volume=Decimal('1'), pickup_address='Zone portuaire', pickup_city='Cotonou',
+                delivery_address='Marché central', delivery_city='Parakou', preferred_pickup_date=pickup,
+                recipient_name='Destinataire', recipient_phone='+22990000000', status='IN_PROGRESS',
+                tracker_imei=device_imei(index),
+            )
+            for index in range(start, min(start + BATCH, count))
+        ]
+        TransportRequest.objects.bulk_create(assign_slugs(requests))
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.sent = 0
+        self.acked = 0
+        self.latencies = []
+
+
+async def device(index, options, stats, deadline):
+    imei = device_imei(index)
+    try:
+        reader, writer = await asyncio.open_connection(options.host, options.port)
+    except OSError:
+        stats.failed += 1
+        return
+    decoder = gt06.FrameDecoder()
+
+    async def exchange(packet):
+        started = time.perf_counter()
+        writer.write(packet)
+        await writer.drain()
+        while not decoder.feed(await reader.read(64)):
+            pass
+        stats.sent += 1
+        stats.acked += 1
+        stats.latencies.append(time.perf_counter() - started)
+
+    try:
+        await exchange(gt06.encode_login(imei, 1))
+        stats.connected += 1
+        serial = 1
+        ts = datetime.now(dt_timezone.utc) - timedelta(hours=1)
+        lat, lon = 6.3654 + random.uniform(-0.2, 0.2), 2.4183 + random.uniform(-0.2, 0.2)
+        # Départs étalés pour ne pas synchroniser tous les terminaux
+        await asyncio.sleep(random.uniform(0, options.interval))
+        while time.perf_counter() < deadline:
+            serial += 1
+            if serial % HEARTBEAT_EVERY == 0:
+                await exchange(gt06.encode_heartbeat(serial))
+            else:
+                ts += timedelta(seconds=1)
+                lat += random.uniform(-0.0003, 0.0003)
+                lon += random.uniform(-0.0003, 0.0003)
+                await exchange(gt06.encode_location(ts, lat, lon, random.uniform(0, 90), random.randint(0, 359), serial))
+            await asyncio.sleep(options.interval)
+    except (ConnectionError, OSError):
+        stats.failed += 1
+    finally:
+        writer.close()
+
+
+async def run(options):
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + options.seconds
+    tasks = []
+    for index in range(options.devices):
+        tasks.append(asyncio.create_task(device(index, options, stats, deadline)))
+        if index % 200 == 199:
+            # Connexions ouvertes par vagues pour ne pas saturer la file d'attente d'écoute
+            await asyncio.sleep(0.05)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    latencies = sorted(stats.latencies) or [0.0]
+    print(f"{stats.connected}/{options.devices} terminaux connectés ({stats.failed} échecs), {stats.sent} paquets en {elapsed:.1f}s "
+          f"({stats.sent / elapsed:.0f} paquets/s), {stats.acked} accusés")
+    print(f"Latence des accusés : p50 {latencies[len(latencies) // 2] * 1000:.1f} ms | p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=TRACKER_SERVER_PORT)
+    parser.add_argument('--devices', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=1.0, help="Secondes entre deux paquets d'un terminal")
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--wait', type=float, default=TRACKER_SERVER_ALLOWLIST_REFRESH_SECONDS + 1,
+                        help="Secondes d'attente pour que le serveur recharge les IMEI autorisés")
+    parser.add_argument('--cleanup', action='store_true', help="Supprimer les positions simulées après le test")
+    options = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    client, created = User.objects.get_or_create(email='bench-gt06@example.com', defaults={'role': 'PME', 'password': 'Bench@1234'})
+    try:
+        register_devices(client, options.devices)
+        print(f"{options.devices} demandes créées, attente de {options.wait:.0f}s (rechargement de la liste du serveur)")
+        time.sleep(options.wait)
+        asyncio.run(run(options))
+    finally:
+        TransportRequest.objects.all_with_deleted().filter(client=client).hard_delete()
+        if created:
+            client.hard_delete()
+    if options.cleanup:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TRACKER_TABLE} WHERE imei LIKE %s", [IMEI_PREFIX + '%'])
+            print(f"{cursor.rowcount} positions simulées supprimées")
+
+
+if __name__ == '__main__':
+    main()
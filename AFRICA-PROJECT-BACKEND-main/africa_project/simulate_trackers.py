@@ -0,0 +1,123 @@
+"""
+Simulateur de trackers GPS : des appareils fictifs envoient des lots de positions à l'endpoint d'ingestion
+(tracking/positions/) et le débit soutenu est mesuré.
+Usage : python simulate_trackers.py [--url http://localhost:8000] [--devices 2000] [--batch 500] [--threads 8] [--seconds 30]
+Sans --url, les requêtes passent par le client de test Django dans ce processus (pas de serveur nécessaire).
+Les positions simulées sont supprimées à la fin (--keep pour les conserver).
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from africa_logistic.tracking import TRACKER_TABLE
+
+ENDPOINT = '/api/africa_logistic/tracking/positions/'
+IMEI_PREFIX = '990000'
+
+logging.getLogger('django.request').setLevel(logging.ERROR)
+
+
+class Device:
+    """Tracker fictif : marche aléatoire autour de Cotonou, un point par seconde de temps simulé."""
+
+    def __init__(self, imei, start):
+        self.imei = imei
+        self.ts = start
+        self.lat = 6.3654 + random.uniform(-0.2, 0.2)
+        self.lon = 2.4183 + random.uniform(-0.2, 0.2)
+
+    def fixes(self, count):
+        batch = []
+        for _ in range(count):
+            self.ts += timedelta(seconds=1)
+            self.lat += random.uniform(-0.0003, 0.0003)
+            self.lon += random.uniform(-0.0003, 0.0003)
+            batch.append({'ts': self.ts.isoformat(), 'lat': round(self.lat, 6), 'lon': round(self.lon, 6), 'speed': round(random.uniform(0, 90), 1), 'course': random.randint(0, 359)})
+        return batch
+
+
+def make_sender(url, token):
+    headers = {'X-Tracker-Token': token, 'Content-Type': 'application/json'}
+    if url:
+        session = requests.Session()
+        return lambda body: session.post(url.rstrip('/') + ENDPOINT, data=body, headers=headers).json()
+    client = Client(HTTP_HOST='localhost')
+    return lambda body: client.post(ENDPOINT, body, content_type='application/json', HTTP_X_TRACKER_TOKEN=token).json()
+
+
+def worker(devices, options, token, deadline, totals, index):
+    send = make_sender(options.url, token)
+    accepted = rejected = posts = 0
+    try:
+        while time.perf_counter() < deadline:
+            for device in devices:
+                if time.perf_counter() >= deadline:
+                    break
+                result = send(json.dumps({'imei': device.imei, 'fixes': device.fixes(options.batch)}))
+                accepted += result.get('accepted', 0)
+                rejected += result.get('rejected', 0)
+                posts += 1
+    finally:
+        connection.close()
+    totals[index] = (accepted, rejected, posts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help="Serveur cible ; sans --url : client de test Django en processus")
+    parser.add_argument('--token', help="X-Tracker-Token (défaut : settings.TRACKER_INGEST_TOKEN)")
+    parser.add_argument('--devices', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=500, help="Positions par envoi")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--keep', action='store_true', help="Ne pas supprimer les positions simulées")
+    options = parser.parse_args()
+
+    token = options.token or settings.TRACKER_INGEST_TOKEN
+    if not token:
+        if options.url:
+            parser.error("--token requis : TRACKER_INGEST_TOKEN est vide")
+        # En processus, un jeton temporaire active l'ingestion
+        token = settings.TRACKER_INGEST_TOKEN = secrets.token_hex(16)
+
+    start = datetime.now(dt_timezone.utc) - timedelta(days=2)
+    devices = [Device(f'{IMEI_PREFIX}{n:09d}', start) for n in range(options.devices)]
+    groups = [devices[n::options.threads] for n in range(options.threads)]
+    totals = [None] * options.threads
+    began = time.perf_counter()
+    deadline = began + options.seconds
+    threads = [threading.Thread(target=worker, args=(groups[n], options, token, deadline, totals, n)) for n in range(options.threads)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        accepted = sum(t[0] for t in totals)
+        rejected = sum(t[1] for t in totals)
+        posts = sum(t[2] for t in totals)
+        print(f"{options.devices} trackers, {options.threads} threads, lots de {options.batch} ({connection.vendor}) : "
+              f"{accepted} positions en {elapsed:.1f}s -> {accepted / elapsed:.0f} positions/s soutenues "
+              f"({posts / elapsed:.1f} envois/s, {rejected} rejetées)")
+    finally:
+        if not options.keep:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {TRACKER_TABLE} WHERE imei LIKE %s", [IMEI_PREFIX + '%'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Test de contention de l'assignation (assign_transporter) : pour chaque demande, plusieurs transporteurs
+s'auto-assignent au même instant via l'API.
+Usage : python stress_assign.py [transporteurs] [demandes]
+Vérifie qu'il y a exactement un gagnant par demande (une assignation, un historique, une notification)
+et mesure le débit. Les données de test sont supprimées à la fin.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from africa_logistic.kpis import record_request_change, request_state
+from africa_logistic.models import Notification, RequestStatusHistory, TransportRequest, User, UserConnect
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+PREFIX = 'stress-assign-'
+
+# Les refus attendus (400) des perdants ne sont pas journalisés
+logging.getLogger('django.request').setLevel(logging.ERROR)
+
+
+def worker(token, slugs, barrier, results, index):
+    client = Client(HTTP_HOST='localhost')
+    statuses = []
+    try:
+        for slug in slugs:
+            # Tous les threads attaquent la même demande en même temps
+            barrier.wait()
+            response = client.patch(
+                f'/api/africa_logistic/admin/demandes/{slug}/assign/', json.dumps({}),
+                content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+            )
+            statuses.append((slug, response.status_code))
+    finally:
+        connection.close()
+    results[index] = statuses
+
+
+def main():
+    client_user = User.objects.create(email=f'{PREFIX}client@example.com', role='PME', password='Stress@1234')
+    transporters = [
+        User.objects.create(email=f'{PREFIX}{n}@example.com', role='TRANSPORTEUR', password='Stress@1234', is_approved=True)
+        for n in range(THREADS)
+    ]
+    tokens = [UserConnect.objects.create(user=transporter).slug for transporter in transporters]
+    pickup = timezone.now() + timedelta(days=1)
+    requests = []
+    for i in range(REQUESTS):
+        transport_request = TransportRequest.objects.create(
+            client=client_user, title=f'Charge {i}', merchandise_description='Marchandise', weight=Decimal('100'), volume=Decimal('1'),
+            pickup_address='Rue 1', pickup_city='Cotonou', delivery_address='Rue 2', delivery_city='Parakou',
+            preferred_pickup_date=pickup, recipient_name='Destinataire', recipient_phone='+22990000000',
+        )
+        record_request_change(None, transport_request)
+        requests.append(transport_request)
+    slugs = [transport_request.slug for transport_request in requests]
+    try:
+        barrier = threading.Barrier(THREADS)
+        results = [None] * THREADS
+        threads = [threading.Thread(target=worker, args=(tokens[n], slugs, barrier, results, n)) for n in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        codes = Counter(code for statuses in results for _, code in statuses)
+        winners = Counter(slug for statuses in results for slug, code in statuses if code == 200)
+        attempts = THREADS * REQUESTS
+        print(f"{THREADS} transporteurs x {REQUESTS} demandes : {attempts} tentatives en {elapsed:.1f}s ({attempts / elapsed:.0f}/s, {REQUESTS / elapsed:.1f} assignations/s)")
+        print(f"Codes HTTP : {dict(codes)}")
+
+        assert all(winners[slug] == 1 for slug in slugs), "Demande sans gagnant ou avec plusieurs gagnants"
+        history = Counter(RequestStatusHistory.objects.filter(transport_request__in=requests, new_status='ASSIGNED').values_list('transport_request_id', flat=True))
+        assert all(history[r.pk] == 1 for r in requests), "Historique d'assignation manquant ou dupliqué"
+        notified = Notification.objects.filter(user__in=transporters, type='ASSIGNED_MISSION').count()
+        assert notified == REQUESTS, f"{notified} notifications pour {REQUESTS} assignations"
+        for transport_request in TransportRequest.objects.filter(pk__in=[r.pk for r in requests]):
+            assert transport_request.status == 'ASSIGNED' and transport_request.assigned_transporter_id, transport_request.slug
+        print("OK : exactement un gagnant par demande")
+    finally:
+        # Retire les demandes du rollup KPI avant suppression
+        for transport_request in TransportRequest.objects.all_with_deleted().filter(client=client_user).select_related('client'):
+            before = request_state(transport_request)
+            transport_request.is_active = False
+            record_request_change(before, transport_request)
+        RequestStatusHistory.objects.all_with_deleted().filter(transport_request__client=client_user).hard_delete()
+        Notification.objects.all_with_deleted().filter(user__in=transporters).hard_delete()
+        TransportRequest.objects.all_with_deleted().filter(client=client_user).hard_delete()
+        UserConnect.objects.all_with_deleted().filter(user__in=transporters).hard_delete()
+        for user in transporters + [client_user]:
+            user.hard_delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Test de charge du grand livre (ledger.py) : de nombreux threads créditent et débitent le même portefeuille.
+Usage : python stress_wallet.py [threads] [opérations_par_thread]
+Vérifie qu'aucune mise à jour n'est perdue (solde final attendu) et l'invariant solde == crédits - débits.
+Les données de test sont supprimées à la fin.
+"""
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'africa_project.settings')
+django.setup()
+
+from django.db import connection
+from africa_logistic.kpis import record_wallet_movement
+from africa_logistic.ledger import InsufficientFunds, credit, debit, ledger_balance
+from africa_logistic.models import User, Wallet
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+OPERATIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+EMAIL = 'stress-wallet@example.com'
+
+
+def worker(user, index, results):
+    credited = debited = refused = 0
+    try:
+        for i in range(OPERATIONS):
+            credit(user, Decimal('10.00'), description='Stress crédit')
+            credited += 1
+            try:
+                debit(user, Decimal('7.00'), description='Stress débit')
+                debited += 1
+            except InsufficientFunds:
+                refused += 1
+            # Rejeu d'une même référence : ne doit créditer qu'une fois au total
+            credit(user, Decimal('1.00'), description='Stress rejeu', reference=f'stress-replay-{i}')
+    finally:
+        connection.close()
+    results[index] = (credited, debited, refused)
+
+
+def main():
+    user, created = User.objects.get_or_create(email=EMAIL, defaults={'role': 'PME', 'password': 'Stress@1234'})
+    Wallet.objects.all_with_deleted().filter(user=user).hard_delete()
+    try:
+        results = [None] * THREADS
+        threads = [threading.Thread(target=worker, args=(user, n, results)) for n in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        credited = sum(r[0] for r in results)
+        debited = sum(r[1] for r in results)
+        refused = sum(r[2] for r in results)
+        expected = Decimal('10.00') * credited - Decimal('7.00') * debited + Decimal('1.00') * OPERATIONS
+        wallet = Wallet.objects.get(user=user)
+        operations = credited + debited + THREADS * OPERATIONS
+
+        print(f"{THREADS} threads x {OPERATIONS} : {operations} mouvements en {elapsed:.1f}s ({operations / elapsed:.0f}/s), {refused} débits refusés")
+        print(f"Solde final {wallet.balance} | attendu {expected} | grand livre {ledger_balance(wallet)}")
+        assert wallet.balance == expected, "Mise à jour perdue"
+        assert wallet.balance == ledger_balance(wallet), "Invariant solde == crédits - débits violé"
+        assert wallet.balance >= 0, "Solde négatif"
+        print("OK")
+    finally:
+        # Annule l'effet du test sur le rollup KPI avant de supprimer le portefeuille
+        for wallet in Wallet.objects.all_with_deleted().filter(user=user):
+            record_wallet_movement(wallet, -wallet.balance)
+        Wallet.objects.all_with_deleted().filter(user=user).hard_delete()
+        if created:
+            user.hard_delete()
+
+
+if __name__ == '__main__':
+    main()